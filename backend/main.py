@@ -1,12 +1,16 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query
+from fastapi import Request as FastAPIRequest
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, field_validator
 from typing import Optional, List, Dict
 import firebase_admin
 from firebase_admin import credentials, firestore, auth, storage
 import vertexai
-from vertexai.generative_models import GenerativeModel, Part
-from datetime import datetime, timedelta
+from vertexai.generative_models import GenerativeModel, GenerationConfig, Part
+from vertexai.preview import caching
+from vertexai.preview.generative_models import GenerativeModel as PreviewGenerativeModel
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 from google.oauth2 import service_account
@@ -14,11 +18,34 @@ from difflib import get_close_matches
 import mimetypes
 import json
 import re
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient import discovery_cache
 from googleapiclient.errors import HttpError
+import google_auth_httplib2
+import httplib2
+from google.api_core import exceptions as google_exceptions
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
+try:
+    # Optional: used for local PDF text extraction in chunked parsing
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
 import pickle
+import asyncio
+import functools
+import itertools
+import math
+import time
+import hashlib
+import threading
+import copy
+import contextlib
+from collections import OrderedDict
+import io
+import zipfile
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Load environment variables
@@ -127,6 +154,278 @@ except Exception as e:
     bucket = None
 
 
+# Firestore and Storage clients are blocking, so route handlers push their calls onto this pool.
+# It is kept separate from the LLM pool so slow model calls never starve quick database reads.
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "32"))
+io_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="io")
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Run a blocking Firestore/Storage call on the I/O thread pool.
+    Usage: await run_io(doc_ref.set, data)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        io_executor,
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+async def fetch_docs(query) -> list:
+    """Stream a Firestore query to a list of snapshots on the I/O pool."""
+    return await run_io(lambda: list(query.stream()))
+
+
+async def fetch_doc(doc_ref):
+    """Get a single Firestore document snapshot on the I/O pool."""
+    return await run_io(doc_ref.get)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire ttl_seconds after they were set.
+    Holds at most max_entries, evicting the least recently used first.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+    
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def invalidate(self, key) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+    
+    def items(self) -> list:
+        """(key, value) pairs of the live entries, without touching their LRU order."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._entries.items() if expires_at > now]
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+# Syllabus file byte cache - avoids downloading the same file from Storage on every chat message
+# Entries are keyed by (file_path, blob generation), so an overwritten file never serves stale bytes
+FILE_CACHE_MAX_MB = int(os.getenv("FILE_CACHE_MAX_MB", "64"))
+FILE_CACHE_DISK_DIR = os.getenv("FILE_CACHE_DISK_DIR")  # Optional spill directory, disabled if unset
+FILE_CACHE_DISK_MAX_MB = int(os.getenv("FILE_CACHE_DISK_MAX_MB", "512"))
+
+
+class FileBytesCache:
+    """
+    Size-bounded LRU cache of file bytes.
+    Entries evicted from memory spill to an optional disk tier. Disk reads and writes happen
+    outside the lock, which only guards the in-memory index.
+    """
+    
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes if disk_dir else 0
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()  # key -> (path, size)
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "spills": 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+    
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+            
+            if key not in self._disk:
+                self.stats["misses"] += 1
+                return None
+            # Taking the entry out of the index means no other thread reads or removes the file
+            path, size = self._disk.pop(key)
+            self._disk_bytes -= size
+        
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠️  File cache disk read failed: {e}")
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            # Promote back to memory, which may spill a colder entry
+            spilled = self._put_memory(key, data) if key not in self._memory else []
+        self._spill(spilled)
+        return data
+    
+    def put(self, key: tuple, data: bytes) -> None:
+        with self._lock:
+            if key in self._memory or key in self._disk:
+                return
+            spilled = self._put_memory(key, data)
+        self._spill(spilled)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_limit_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_limit_bytes": self.disk_max_bytes
+            }
+    
+    def _put_memory(self, key: tuple, data: bytes) -> List[tuple]:
+        """Add an entry to the memory tier (lock held). Returns the (key, data) pairs pushed out of it."""
+        if len(data) > self.max_bytes:
+            return [(key, data)]
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        spilled = []
+        while self._memory_bytes > self.max_bytes:
+            old_key, old_data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_data)
+            spilled.append((old_key, old_data))
+        return spilled
+    
+    def _spill(self, entries: List[tuple]) -> None:
+        """Write entries pushed out of memory to the disk tier (lock not held), or drop them."""
+        for key, data in entries:
+            if not self.disk_dir or len(data) > self.disk_max_bytes:
+                with self._lock:
+                    self.stats["evictions"] += 1
+                continue
+            path = os.path.join(
+                self.disk_dir,
+                hashlib.sha256(f"{key[0]}#{key[1]}".encode("utf-8")).hexdigest()
+            )
+            try:
+                with open(path, "wb") as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"⚠️  File cache disk write failed: {e}")
+                with self._lock:
+                    self.stats["evictions"] += 1
+                continue
+            
+            removed = []
+            with self._lock:
+                if key in self._disk:
+                    continue  # Spilled by another thread, to the same path
+                if key in self._memory:
+                    # Cached again while the file was being written
+                    removed.append(path)
+                else:
+                    self._disk[key] = (path, len(data))
+                    self._disk_bytes += len(data)
+                    self.stats["spills"] += 1
+                while self._disk_bytes > self.disk_max_bytes:
+                    _, (old_path, old_size) = self._disk.popitem(last=False)
+                    self._disk_bytes -= old_size
+                    self.stats["evictions"] += 1
+                    removed.append(old_path)
+            for old_path in removed:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+
+file_cache = FileBytesCache(
+    max_bytes=FILE_CACHE_MAX_MB * 1024 * 1024,
+    disk_dir=FILE_CACHE_DISK_DIR,
+    disk_max_bytes=FILE_CACHE_DISK_MAX_MB * 1024 * 1024
+)
+
+
+async def load_syllabus_file(file_path: str) -> bytes:
+    """
+    Get a syllabus file's bytes, using the file cache when the stored generation matches.
+    Costs one Storage metadata request on a hit, instead of exists() plus a full download.
+    Raises HTTPException if Storage is unavailable or the file is missing.
+    """
+    if bucket is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Firebase Storage is not enabled. Please enable Storage in Firebase Console."
+        )
+    
+    # get_blob returns None for a missing file and loads the current generation
+    blob = await run_io(bucket.get_blob, file_path)
+    if blob is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Syllabus file not found in storage"
+        )
+    
+    key = (file_path, blob.generation)
+    file_bytes = await run_io(file_cache.get, key)
+    if file_bytes is None:
+        file_bytes = await run_io(blob.download_as_bytes)
+        await run_io(file_cache.put, key, file_bytes)
+    return file_bytes
+
+
+# Syllabus metadata cache - chat, calendar and reparse requests all start by reading the same syllabus
+# document, so it's kept for a short TTL and invalidated whenever this process writes the document.
+# Writes from other instances are only seen after the TTL; a Firestore on_snapshot listener could
+# invalidate them too if that ever matters.
+SYLLABUS_CACHE_TTL_SECONDS = float(os.getenv("SYLLABUS_CACHE_TTL_SECONDS", "30"))
+SYLLABUS_CACHE_MAX_ENTRIES = int(os.getenv("SYLLABUS_CACHE_MAX_ENTRIES", "1024"))
+syllabus_cache = TTLCache(SYLLABUS_CACHE_MAX_ENTRIES, SYLLABUS_CACHE_TTL_SECONDS)
+
+
+async def get_syllabus(syllabus_id: str) -> Optional[Dict]:
+    """
+    Read-through lookup of a syllabus document's data. Returns None if it doesn't exist.
+    Callers get their own deep copy, so changing it (nested values included) doesn't change the cached entry.
+    """
+    data = syllabus_cache.get(syllabus_id)
+    if data is None:
+        syllabus_doc = await fetch_doc(db.collection("syllabi").document(syllabus_id))
+        if not syllabus_doc.exists:
+            return None
+        data = syllabus_doc.to_dict()
+        syllabus_cache.set(syllabus_id, data)
+    return copy.deepcopy(data)
+
+
 # Initialize Vertex AI with explicit credentials
 # Reusing the Firebase service account for Vertix AI, just using one service account with both Firebase and Vertex AI enabled
 if FIREBASE_CREDENTIALS_JSON:
@@ -145,6 +444,263 @@ vertexai.init(
 model = GenerativeModel(MODEL_NAME)
 
 
+# Gemini calls are blocking, so they run on a dedicated thread pool instead of the event loop.
+# The pool size is the per-process cap on concurrent model calls; extra calls wait in the pool's queue.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+
+async def run_llm(func, *args, **kwargs):
+    """Run a blocking model call on the LLM thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        llm_executor,
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+async def generate_content_async(contents, **kwargs):
+    """
+    Run model.generate_content on the LLM thread pool without blocking the event loop.
+    Accepts the same arguments as GenerativeModel.generate_content.
+    """
+    return await run_llm(model.generate_content, contents, **kwargs)
+
+
+def extract_response_text(response) -> str:
+    """Get the text out of a Gemini response, whatever shape it came back in."""
+    if hasattr(response, 'text'):
+        return response.text
+    elif hasattr(response, 'candidates') and response.candidates:
+        return response.candidates[0].content.parts[0].text
+    else:
+        print(f"⚠️  Unexpected response format: {response}")
+        return str(response)
+
+
+def chunk_text(chunk) -> str:
+    """Text of a streamed response chunk, or "" for chunks without text (e.g. the final finish-reason chunk)."""
+    try:
+        return extract_response_text(chunk)
+    except ValueError:
+        return ""
+
+
+async def iterate_stream(response_stream):
+    """
+    Iterate a blocking streamed model response from async code.
+    Chunks are pulled on the LLM pool and handed to the event loop through a queue.
+    Closing this async generator stops the pulling thread at the next chunk.
+    """
+    cancelled = threading.Event()
+    queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    
+    def put(message):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    def pump():
+        try:
+            for chunk in response_stream:
+                if cancelled.is_set():
+                    break
+                put(("chunk", chunk))
+        except Exception as e:
+            put(("error", e))
+        finally:
+            put(("end", None))
+    
+    loop.run_in_executor(llm_executor, pump)
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        cancelled.set()
+
+
+# Syllabus context handles - the syllabus document is sent to the model once and referenced afterwards
+# Handles are stored on the syllabi document as context_handle and reused by /chat and parsing
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+CONTEXT_CACHE_TTL_MINUTES = int(os.getenv("CONTEXT_CACHE_TTL_MINUTES", "60"))
+# After an unexpected creation failure (permissions, quota) handles aren't retried for this long
+CONTEXT_CACHE_RETRY_MINUTES = int(os.getenv("CONTEXT_CACHE_RETRY_MINUTES", "5"))
+
+
+class ContextHandleExpired(Exception):
+    """Raised when a stored context handle no longer exists on the model side."""
+
+
+class ContextHandleUnsupported(Exception):
+    """Raised when the model refuses to create a handle (e.g. the document is below the caching minimum)."""
+
+
+class SyllabusContextBackend:
+    """
+    Model interface for syllabus context handles.
+    A local fake model can implement these three methods to test handle reuse offline.
+    """
+    
+    def create_handle(self, file_bytes: bytes, mime_type: str, display_name: str, ttl: timedelta) -> str:
+        """Upload the document once and return a handle name that later calls can reference."""
+        raise NotImplementedError
+    
+    def generate_with_handle(self, handle: str, contents: list, **kwargs):
+        """
+        Generate with the handle's document as context. Raises ContextHandleExpired if it is gone.
+        With stream=True it returns an iterator of chunks, and an expired handle must still raise here.
+        """
+        raise NotImplementedError
+    
+    def generate_inline(self, file_bytes: bytes, mime_type: str, contents: list, **kwargs):
+        """Generate with the document sent inline alongside contents."""
+        raise NotImplementedError
+
+
+class VertexContextBackend(SyllabusContextBackend):
+    """Vertex AI implementation backed by cached content."""
+    
+    def __init__(self):
+        # Models bound to cached content, reused so each call doesn't re-fetch the cache resource
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def create_handle(self, file_bytes: bytes, mime_type: str, display_name: str, ttl: timedelta) -> str:
+        try:
+            cached_content = caching.CachedContent.create(
+                model_name=MODEL_NAME,
+                contents=[Part.from_data(data=file_bytes, mime_type=mime_type)],
+                ttl=ttl,
+                display_name=display_name[:128]
+            )
+        except (google_exceptions.InvalidArgument, google_exceptions.FailedPrecondition) as e:
+            raise ContextHandleUnsupported(str(e))
+        return cached_content.resource_name
+    
+    def generate_with_handle(self, handle: str, contents: list, **kwargs):
+        try:
+            response = self._model_for(handle).generate_content(contents, **kwargs)
+            if kwargs.get("stream"):
+                # Streams are lazy, so pull the first chunk here to surface an expired handle
+                # while the caller can still fall back to inline data
+                first_chunk = next(response, None)
+                if first_chunk is not None:
+                    response = itertools.chain([first_chunk], response)
+            return response
+        except (google_exceptions.NotFound, google_exceptions.FailedPrecondition) as e:
+            with self._lock:
+                self._models.pop(handle, None)
+            raise ContextHandleExpired(str(e))
+    
+    def generate_inline(self, file_bytes: bytes, mime_type: str, contents: list, **kwargs):
+        file_part = Part.from_data(data=file_bytes, mime_type=mime_type)
+        return model.generate_content([file_part] + contents, **kwargs)
+    
+    def _model_for(self, handle: str):
+        with self._lock:
+            if handle in self._models:
+                self._models.move_to_end(handle)
+                return self._models[handle]
+        try:
+            cached_content = caching.CachedContent(cached_content_name=handle)
+        except google_exceptions.NotFound as e:
+            raise ContextHandleExpired(str(e))
+        handle_model = PreviewGenerativeModel.from_cached_content(cached_content=cached_content)
+        with self._lock:
+            self._models[handle] = handle_model
+            while len(self._models) > 128:
+                self._models.popitem(last=False)
+        return handle_model
+
+
+context_backend = VertexContextBackend()
+context_handle_stats = {"reused": 0, "created": 0, "expired": 0, "unsupported": 0, "failed": 0, "inline": 0}
+
+
+def context_handle_is_valid(context_handle: Optional[Dict]) -> bool:
+    """True if a stored handle (or a stored "don't retry yet" marker) has not expired yet."""
+    if not context_handle or not context_handle.get("expire_at"):
+        return False
+    # Leave a minute of margin so a handle doesn't expire mid-request
+    return context_handle["expire_at"] > datetime.now(timezone.utc) + timedelta(minutes=1)
+
+
+async def generate_with_syllabus_context(
+    syllabus_id: str,
+    syllabus_data: Dict,
+    mime_type: str,
+    contents: list,
+    load_file_bytes,
+    **kwargs
+):
+    """
+    Generate with the syllabus document as context, reusing its model-side handle when one is live.
+    Creates and stores a new handle when there is none, and falls back to sending the file inline
+    when the handle has expired or the model won't cache the document.
+    load_file_bytes is an async callable, only awaited when the file bytes are actually needed.
+    """
+    context_handle = syllabus_data.get("context_handle")
+    
+    if CONTEXT_CACHE_ENABLED and context_handle_is_valid(context_handle) and context_handle.get("name"):
+        try:
+            response = await run_llm(context_backend.generate_with_handle, context_handle["name"], contents, **kwargs)
+            context_handle_stats["reused"] += 1
+            return response
+        except ContextHandleExpired:
+            print(f"⌛ Context handle expired for syllabus {syllabus_id}, falling back to inline file")
+            context_handle_stats["expired"] += 1
+            context_handle = None
+    
+    file_bytes = await load_file_bytes()
+    
+    if CONTEXT_CACHE_ENABLED and not context_handle_is_valid(context_handle):
+        ttl = timedelta(minutes=CONTEXT_CACHE_TTL_MINUTES)
+        try:
+            handle_name = await run_llm(
+                context_backend.create_handle,
+                file_bytes,
+                mime_type,
+                syllabus_data.get("name", syllabus_id),
+                ttl
+            )
+            context_handle_stats["created"] += 1
+        except ContextHandleUnsupported as e:
+            # Remember the refusal for one TTL so every chat message doesn't retry it
+            print(f"ℹ️  Model won't cache syllabus {syllabus_id}: {e}")
+            context_handle_stats["unsupported"] += 1
+            handle_name = None
+        except Exception as e:
+            # Back off briefly too, or every message would upload the file for another failed attempt
+            print(f"⚠️  Context handle creation failed, retrying in {CONTEXT_CACHE_RETRY_MINUTES} min: {e}")
+            context_handle_stats["failed"] += 1
+            handle_name = None
+            ttl = timedelta(minutes=CONTEXT_CACHE_RETRY_MINUTES)
+        
+        context_handle = {"name": handle_name, "expire_at": datetime.now(timezone.utc) + ttl}
+        syllabus_data["context_handle"] = context_handle
+        try:
+            await run_io(db.collection("syllabi").document(syllabus_id).update, {"context_handle": context_handle})
+            syllabus_cache.invalidate(syllabus_id)
+        except Exception as e:
+            print(f"⚠️  Could not store context handle: {e}")
+        
+        if handle_name:
+            try:
+                return await run_llm(context_backend.generate_with_handle, handle_name, contents, **kwargs)
+            except ContextHandleExpired:
+                context_handle_stats["expired"] += 1
+    
+    context_handle_stats["inline"] += 1
+    return await run_llm(context_backend.generate_inline, file_bytes, mime_type, contents, **kwargs)
+
+
 # Valid categories for syllabus items
 VALID_CATEGORIES = ["Exams", "Assignments", "Homework", "Projects", "Tests", "Quizzes", "Essays", "Other"]
 
@@ -164,6 +720,14 @@ CATEGORY_MAPPING = {
 # File upload configuration
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
+CONTENT_TYPE_MAP = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.txt': 'text/plain'
+}
+# Batch uploads - files per request, and how many go to Storage at once
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "10"))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))
 
 
 def validate_syllabus_file(file: UploadFile) -> tuple[bool, str]:
@@ -196,56 +760,156 @@ def validate_syllabus_file(file: UploadFile) -> tuple[bool, str]:
     return True, ""
 
 
-def detect_category(item_name: str) -> str:
-    # docstring explaining the function
-   """
-   Detect category of an item based on its name using predefined mapping.
-   Returns category name (capitalized) or "Other" if no match found.
-   """
-   if not item_name:
-       return "Other"
-
+# Uploads are read in chunks of this size while hashing and size-checking
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Storage uploads larger than this go through a chunked resumable upload (must be a multiple of 256KB)
+STORAGE_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB
 
-   item_lower = item_name.lower().strip()
-   
-   #handle plural words
-   if item_lower.endswith('es'):
-        item_lower = item_lower[:-2]
-   elif item_lower.endswith('s'):
-        item_lower = item_lower[:-1]
 
+async def scan_upload(file: UploadFile) -> tuple[int, str]:
+    """
+    Read an uploaded file in chunks, enforcing MAX_FILE_SIZE and computing its SHA-256.
+    Only one chunk is held in memory at a time. Leaves the file rewound.
+    Returns (file_size, sha256_hex).
+    """
+    digest = hashlib.sha256()
+    file_size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(UPLOAD_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        file_size += len(chunk)
+        if file_size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
+            )
+        digest.update(chunk)
+    await file.seek(0)
+    
+    if file_size == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    
+    return file_size, digest.hexdigest()
 
-   # Check each category's keywords
-   for category, keywords in CATEGORY_MAPPING.items():
-       for keyword in keywords:
-           if keyword in item_lower:
-               # Capitalize first letter of category
-               return category.capitalize()
-           # Fuzzy match (handles typos like "strawbery" -> "strawberry")
-           close = get_close_matches(item_lower, keywords, n=1, cutoff=0.8)
-           if close:
-                return category.capitalize() 
-   
 
-   return "Other"
+async def upload_blob_from_file(blob, file_obj, file_size: int, content_type: str) -> None:
+    """
+    Upload a file object to Storage without reading it into memory first.
+    Files over STORAGE_UPLOAD_CHUNK_SIZE use a resumable upload sent in chunks.
+    """
+    if file_size > STORAGE_UPLOAD_CHUNK_SIZE:
+        blob.chunk_size = STORAGE_UPLOAD_CHUNK_SIZE
+    await run_io(
+        blob.upload_from_file,
+        file_obj,
+        size=file_size,
+        content_type=content_type,
+        rewind=True
+    )
 
 
-async def parse_syllabus_with_ai(syllabus_id: str, file_bytes: bytes, mime_type: str, syllabus_name: str) -> List[Dict]:
+class CategoryClassifier:
     """
-    Parse syllabus using Gemini AI to extract structured items with dates.
-    Returns list of items with category, name, and due_date.
+    Compiled form of the CATEGORY_MAPPING lookup, with the same results as checking each
+    category's keywords in order.
+    Exact keywords are found in one pass of a combined regex. Fuzzy matching (difflib, cutoff 0.8)
+    only runs for categories that come before the exact match and whose keyword lengths make a
+    0.8 ratio possible for the name's length, since most names can't fuzzy-match any keyword.
     """
-    try:
-        print(f"🔍 Parsing syllabus: {syllabus_name}")
+    
+    FUZZY_CUTOFF = 0.8
+    
+    def __init__(self, mapping: Dict[str, List[str]]):
+        self.labels = [category.capitalize() for category in mapping]
+        self.keyword_lists = [list(keywords) for keywords in mapping.values()]
         
-        # Create Part object for Gemini
-        file_part = Part.from_data(
-            data=file_bytes,
-            mime_type=mime_type
+        # A hit on a keyword also means every shorter keyword inside it matched, so each keyword
+        # maps to the first category owning any keyword that is a substring of it
+        keywords = sorted({k for ks in self.keyword_lists for k in ks}, key=len, reverse=True)
+        self._first_category = {
+            keyword: min(
+                i for i, category_keywords in enumerate(self.keyword_lists)
+                if any(k in keyword for k in category_keywords)
+            )
+            for keyword in keywords
+        }
+        # Zero-width lookahead so overlapping keywords are all seen, longest first at each position
+        self._pattern = (
+            re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))") if keywords else None
         )
         
-        # Strict prompt for structured extraction
-        parsing_prompt = """You are a syllabus parser. Analyze this course syllabus document and extract ALL assignments, exams, projects, homework, tests, quizzes, essays, and other assessments.
+        # difflib rejects a candidate when 2*min(len)/total_len is below the cutoff, so fuzzy matching
+        # can only succeed for name lengths in a window around each keyword's length
+        max_length = max((len(k) for k in keywords), default=0) * 2 + 1
+        self._fuzzy_lengths = [
+            frozenset(
+                length for length in range(1, max_length + 1)
+                if any(2.0 * min(length, len(k)) / (length + len(k)) >= self.FUZZY_CUTOFF for k in category_keywords)
+            )
+            for category_keywords in self.keyword_lists
+        ]
+        self.classify = functools.lru_cache(maxsize=8192)(self._classify)
+    
+    def _classify(self, item_lower: str) -> str:
+        exact = len(self.labels)
+        if self._pattern is not None:
+            for match in self._pattern.finditer(item_lower):
+                exact = min(exact, self._first_category[match.group(1)])
+        
+        # Earlier categories still win through a fuzzy match, as in the original keyword-by-keyword loop
+        length = len(item_lower)
+        for i in range(exact):
+            if length in self._fuzzy_lengths[i] and get_close_matches(
+                item_lower, self.keyword_lists[i], n=1, cutoff=self.FUZZY_CUTOFF
+            ):
+                return self.labels[i]
+        
+        return self.labels[exact] if exact < len(self.labels) else "Other"
+
+
+category_classifier = CategoryClassifier(CATEGORY_MAPPING)
+
+
+def normalize_item_name(item_name: str) -> str:
+    """Lowercase and strip a plural ending, the way category keywords are matched."""
+    item_lower = item_name.lower().strip()
+    
+    #handle plural words
+    if item_lower.endswith('es'):
+        item_lower = item_lower[:-2]
+    elif item_lower.endswith('s'):
+        item_lower = item_lower[:-1]
+    return item_lower
+
+
+def detect_category(item_name: str) -> str:
+    """
+    Detect category of an item based on its name using predefined mapping.
+    Returns category name (capitalized) or "Other" if no match found.
+    """
+    if not item_name:
+        return "Other"
+    return category_classifier.classify(normalize_item_name(item_name))
+
+
+def detect_categories(item_names: List[str]) -> List[str]:
+    """
+    Batch version of detect_category - classifies each distinct name once.
+    Returns categories in the same order as item_names.
+    """
+    results = {}
+    for name in item_names:
+        if name not in results:
+            results[name] = detect_category(name)
+    return [results[name] for name in item_names]
+
+
+# Strict prompt for structured syllabus extraction
+# Bump PARSING_PROMPT_VERSION whenever the prompt changes so cached parse results are not reused
+PARSING_PROMPT_VERSION = "1"
+SYLLABUS_PARSING_PROMPT = """You are a syllabus parser. Analyze this course syllabus document and extract ALL assignments, exams, projects, homework, tests, quizzes, essays, and other assessments.
 
 CRITICAL INSTRUCTIONS:
 1. Extract EVERY item that has a due date or deadline
@@ -279,123 +943,1499 @@ RULES:
 
 Now analyze the syllabus and return the JSON:"""
 
-        # Call Gemini with file and parsing prompt
-        print(f"📤 Sending to Gemini for parsing...")
-        response = model.generate_content([file_part, parsing_prompt])
-        
-        # Extract response text
-        if hasattr(response, 'text'):
-            response_text = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            response_text = response.candidates[0].content.parts[0].text
-        else:
-            response_text = str(response)
-        
-        print(f"📥 Received response from Gemini")
-        print(f"   Response preview: {response_text[:200]}...")
-        
-        # Parse JSON from response
-        # Try to extract JSON from markdown code blocks if present
-        json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', response_text, re.DOTALL)
-        if json_match:
-            json_text = json_match.group(1)
-        else:
-            # Try to find JSON object directly
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(0)
-            else:
-                json_text = response_text
-        
-        # Parse the JSON
-        parsed_data = json.loads(json_text)
-        items = parsed_data.get("items", [])
-        
-        print(f"✅ Parsed {len(items)} items from syllabus")
-        
-        # Store items in Firestore
-        stored_items = []
-        for item in items:
-            # Validate required fields
-            if not all(key in item for key in ["category", "name", "due_date"]):
-                print(f"⚠️  Skipping invalid item: {item}")
-                continue
-            
-            # Validate category
-            if item["category"] not in VALID_CATEGORIES:
-                print(f"⚠️  Invalid category '{item['category']}', defaulting to 'Other'")
-                item["category"] = "Other"
-            
-            # Create item in Firestore
-            doc_ref = db.collection("syllabus_items").document()
-            item_data = {
-                "syllabus_id": syllabus_id,
-                "category": item["category"],
-                "name": item["name"],
-                "due_date": item["due_date"],
-                "selected": False,
-                "created_at": datetime.now()
+# Structured output - Gemini is constrained to this schema, so responses are always JSON in the
+# expected shape and categories can only be VALID_CATEGORIES. Set to false to use free-text output.
+STRUCTURED_OUTPUT_ENABLED = os.getenv("STRUCTURED_OUTPUT_ENABLED", "true").lower() == "true"
+SYLLABUS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string", "enum": VALID_CATEGORIES},
+                    "name": {"type": "string"},
+                    "due_date": {"type": "string", "description": "YYYY-MM-DD, or TBD if unknown"}
+                },
+                "required": ["category", "name", "due_date"]
             }
-            doc_ref.set(item_data)
-            
-            # Add ID for return
-            item_data["id"] = doc_ref.id
-            stored_items.append(item_data)
-        
-        print(f"💾 Stored {len(stored_items)} items in Firestore")
-        return stored_items
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {str(e)}")
-        print(f"   Response text: {response_text}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to parse AI response as JSON: {str(e)}"
-        )
-    except Exception as e:
-        print(f"❌ Error parsing syllabus: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error parsing syllabus: {str(e)}"
-        )
+        }
+    },
+    "required": ["items"]
+}
+PARSE_OUTPUT_MODE = "structured" if STRUCTURED_OUTPUT_ENABLED else "text"
 
+# Per output mode, so structured and free-text parsing can be compared on /metrics
+parse_output_stats = {
+    mode: {"calls": 0, "failures": 0, "invalid_items": 0, "model_ms_total": 0.0}
+    for mode in ("structured", "text")
+}
 
-# The 3 models use pydantic to validate data requests for each endpoint
-# FastAPI is used to automatically checks data requests and matches it to the right model
 
+def parsing_generation_kwargs() -> Dict:
+    """Extra generate_content arguments for parsing calls (the response schema, when enabled)."""
+    if not STRUCTURED_OUTPUT_ENABLED:
+        return {}
+    # GenerationConfig converts the JSON-schema dict to the proto Schema; a plain dict would be
+    # passed to the proto as-is and fail on the lowercase type names
+    return {
+        "generation_config": GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=SYLLABUS_RESPONSE_SCHEMA
+        )
+    }
 
 
-# base model means json file, with the category field below
-class AuthRequest(BaseModel):
-   email: str
-   password: str
+def record_parse_output(model_ms: float, failed: bool = False, invalid_items: int = 0) -> None:
+    """Count one parsing model call against the current output mode."""
+    stats = parse_output_stats[PARSE_OUTPUT_MODE]
+    stats["calls"] += 1
+    stats["model_ms_total"] += model_ms
+    stats["invalid_items"] += invalid_items
+    if failed:
+        stats["failures"] += 1
 
 
+# Parse result cache - keyed by file content so re-uploads and reparses of the same file skip Gemini
+PARSE_CACHE_BACKEND = os.getenv("PARSE_CACHE_BACKEND", "memory")  # "memory", "firestore" or "none"
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "256"))
 
 
-class InventoryItem(BaseModel):
-   user_id: str
-   name: str
-   quantity: int
-   expiration_date: Optional[str] = None
-   category: Optional[str] = None
+class ParseCacheBackend:
+    """Storage interface for cached parse results (lists of raw item dicts)."""
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        raise NotImplementedError
+    
+    def set(self, key: str, items: List[Dict]) -> None:
+        raise NotImplementedError
 
 
+class InMemoryParseCache(ParseCacheBackend):
+    """Per-process LRU cache."""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(self._entries[key])
+    
+    def set(self, key: str, items: List[Dict]) -> None:
+        with self._lock:
+            self._entries[key] = copy.deepcopy(items)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
 
 
-class ChatRequest(BaseModel):
-   user_id: str
-   message: str
-   syllabus_id: Optional[str] = None
+class FirestoreParseCache(ParseCacheBackend):
+    """Cache stored in a Firestore collection, shared by every backend instance."""
+    
+    def __init__(self, collection: str = "parse_cache"):
+        self.collection = collection
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        doc = db.collection(self.collection).document(key).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict().get("items")
+    
+    def set(self, key: str, items: List[Dict]) -> None:
+        db.collection(self.collection).document(key).set({
+            "items": items,
+            "model": MODEL_NAME,
+            "prompt_version": PARSING_PROMPT_VERSION,
+            "created_at": datetime.now()
+        })
 
 
-class CalendarItem(BaseModel):
-   id: str
-   category: str
-   name: str
-   due_date: str
+if PARSE_CACHE_BACKEND == "firestore":
+    parse_cache = FirestoreParseCache()
+elif PARSE_CACHE_BACKEND == "memory":
+    parse_cache = InMemoryParseCache(PARSE_CACHE_MAX_ENTRIES)
+else:
+    parse_cache = None
+
+parse_cache_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def parse_cache_key(file_sha256: str, mime_type: str) -> str:
+    """
+    SHA-256 over everything a parse result depends on: file bytes, MIME type, prompt version, output mode,
+    model, parse mode and rule parser settings (defined further down, read at call time).
+    """
+    key_source = (
+        f"{file_sha256}|{mime_type}|{PARSING_PROMPT_VERSION}|{PARSE_OUTPUT_MODE}|{MODEL_NAME}"
+        f"|{PARSE_MODE}|{RULE_PARSER_ENABLED}|{RULE_PARSER_MIN_CONFIDENCE}"
+    )
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+async def get_cached_parse(key: str) -> Optional[List[Dict]]:
+    """Look up a cached parse result. Cache failures count as misses and never fail the parse."""
+    if parse_cache is None:
+        return None
+    try:
+        items = await run_io(parse_cache.get, key)
+    except Exception as e:
+        print(f"⚠️  Parse cache read failed: {e}")
+        parse_cache_stats["errors"] += 1
+        items = None
+    if items is None:
+        parse_cache_stats["misses"] += 1
+    else:
+        parse_cache_stats["hits"] += 1
+    return items
+
+
+async def set_cached_parse(key: str, items: List[Dict]) -> None:
+    """Store a parse result in the cache, ignoring cache failures."""
+    if parse_cache is None:
+        return
+    try:
+        await run_io(parse_cache.set, key, items)
+    except Exception as e:
+        print(f"⚠️  Parse cache write failed: {e}")
+        parse_cache_stats["errors"] += 1
+
+
+# Firestore rejects write batches with more than 500 operations
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def items_version_bump() -> Dict:
+    """Syllabus fields marking that its items changed. items_version feeds the items endpoint's ETag."""
+    return {"items_version": firestore.Increment(1), "items_updated_at": datetime.now()}
+
+
+def syllabi_version_op(user_id: str) -> tuple:
+    """
+    Batch operation bumping a user's syllabi_version (in users/{user_id}), which feeds the ETag of
+    the user's syllabus list. Part of every write that changes what GET /syllabi/{user_id} returns.
+    """
+    return ("merge", db.collection("users").document(user_id), {
+        "syllabi_version": firestore.Increment(1),
+        "syllabi_updated_at": datetime.now()
+    })
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as for GET requests)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+
+# Conditional GET counters per endpoint - each 304 is a full collection read and response body saved
+conditional_get_stats = {
+    endpoint: {"not_modified": 0, "full_responses": 0}
+    for endpoint in ("syllabi", "items")
+}
+
+
+def conditional_response(endpoint: str, request: FastAPIRequest, response: Response, etag: str) -> Optional[Response]:
+    """
+    Answer a GET conditionally: returns a 304 response if If-None-Match matches etag, otherwise
+    sets the ETag on the full response and returns None so the handler carries on.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        conditional_get_stats[endpoint]["not_modified"] += 1
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    conditional_get_stats[endpoint]["full_responses"] += 1
+    response.headers["ETag"] = etag
+    # Browsers revalidate on every request instead of reusing a possibly stale list
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+
+def commit_in_batches(operations: List[tuple]) -> int:
+    """
+    Commit write operations through Firestore WriteBatch, chunked at the 500-operation limit.
+    Each operation is ("set", doc_ref, data), ("merge", doc_ref, data) (a set that keeps other fields),
+    ("update", doc_ref, data) or ("delete", doc_ref, None).
+    Up to 500 operations commit atomically; larger lists commit one chunk at a time, in order.
+    Returns the number of batch commits made.
+    """
+    commits = 0
+    for start in range(0, len(operations), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for op, doc_ref, data in operations[start:start + FIRESTORE_BATCH_LIMIT]:
+            if op == "set":
+                batch.set(doc_ref, data)
+            elif op == "merge":
+                batch.set(doc_ref, data, merge=True)
+            elif op == "update":
+                batch.update(doc_ref, data)
+            elif op == "delete":
+                batch.delete(doc_ref)
+            else:
+                raise ValueError(f"Unknown batch operation: {op}")
+        batch.commit()
+        commits += 1
+    return commits
+
+
+# Item change notifications - the /syllabi/{id}/items/wait long poll sleeps on these instead of
+# clients polling. "inprocess" only sees parses that commit in this process; "firestore" also listens
+# for writes from external workers and other instances.
+ITEMS_NOTIFIER = os.getenv("ITEMS_NOTIFIER", "inprocess")  # "inprocess" or "firestore"
+
+
+class InProcessItemsNotifier:
+    """
+    In-process pub/sub: each waiter gets an asyncio.Event that is set when its syllabus is published.
+    subscribe/unsubscribe are async so subclasses can do blocking work on the I/O pool.
+    """
+    
+    def __init__(self):
+        self._waiters = {}  # syllabus_id -> set of events
+    
+    async def subscribe(self, syllabus_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._waiters.setdefault(syllabus_id, set()).add(event)
+        return event
+    
+    async def unsubscribe(self, syllabus_id: str, event: asyncio.Event) -> None:
+        waiters = self._waiters.get(syllabus_id)
+        if waiters is not None:
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[syllabus_id]
+    
+    def publish(self, syllabus_id: str) -> None:
+        """Wake everyone waiting on a syllabus. Must be called on the event loop."""
+        for event in self._waiters.get(syllabus_id, ()):
+            event.set()
+    
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+
+class FirestoreItemsNotifier(InProcessItemsNotifier):
+    """
+    Also wakes waiters on Firestore writes made elsewhere, by listening to the syllabus and
+    parse job documents with on_snapshot while anyone in this process is waiting on them.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        # syllabus_id -> future of its snapshot watches. Starting and stopping watches blocks, so it
+        # runs on the I/O pool; the future is stored first so concurrent waiters share one start.
+        self._watches = {}
+    
+    async def subscribe(self, syllabus_id: str) -> asyncio.Event:
+        event = await super().subscribe(syllabus_id)
+        if syllabus_id not in self._watches:
+            loop = asyncio.get_running_loop()
+            
+            def on_change(docs, changes, read_time):
+                # Snapshot callbacks run on a listener thread. The first one (the current state)
+                # also wakes waiters, which just makes them re-check once.
+                loop.call_soon_threadsafe(self.publish, syllabus_id)
+            
+            def start_watches():
+                return [
+                    db.collection(collection).document(syllabus_id).on_snapshot(on_change)
+                    for collection in ("syllabi", "parse_jobs")
+                ]
+            
+            self._watches[syllabus_id] = asyncio.ensure_future(run_io(start_watches))
+        try:
+            # Shielded so one cancelled request doesn't cancel the start other waiters share
+            await asyncio.shield(self._watches[syllabus_id])
+        except Exception:
+            await self.unsubscribe(syllabus_id, event)
+            raise
+        return event
+    
+    async def unsubscribe(self, syllabus_id: str, event: asyncio.Event) -> None:
+        await super().unsubscribe(syllabus_id, event)
+        if syllabus_id in self._waiters:
+            return
+        started = self._watches.pop(syllabus_id, None)
+        if started is None:
+            return
+        
+        async def stop_watches():
+            try:
+                watches = await started
+            except Exception:
+                return  # Never started, nothing to stop
+            await run_io(lambda: [watch.unsubscribe() for watch in watches])
+        
+        # Shielded so the watches are still stopped when the waiting request is cancelled
+        await asyncio.shield(stop_watches())
+
+
+items_notifier = FirestoreItemsNotifier() if ITEMS_NOTIFIER == "firestore" else InProcessItemsNotifier()
+
+
+def parse_due_date(due_date) -> Optional[datetime]:
+    """
+    Typed form of a YYYY-MM-DD due date (midnight UTC), stored as due_at so items can be
+    range-queried and sorted. Returns None for "TBD" and anything else that isn't a date.
+    """
+    try:
+        return datetime.strptime(str(due_date).strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def normalize_due_date(due_date, academic_start_year: Optional[int] = None) -> tuple:
+    """
+    Normalize a due date from any parser (or an old stored item) to what syllabus_items stores.
+    Dates the rule parser can read ("March 10, 2025", "3/10") become YYYY-MM-DD; anything else,
+    including "TBD", becomes "TBD". Dates without a year ("3/10") only resolve when
+    academic_start_year is given. Returns (due_date, due_at), with due_at None when there's no date.
+    Callers keep the original text (as due_date_raw), since "TBD" loses it.
+    """
+    text = str(due_date or "").strip()
+    due_at = parse_due_date(text)
+    if due_at is None and text:
+        found = find_date(text, academic_start_year)
+        if found is not None:
+            due_at = parse_due_date(found[0])
+    if due_at is None:
+        return "TBD", None
+    return due_at.strftime("%Y-%m-%d"), due_at
+
+
+async def store_syllabus_items(
+    syllabus_id: str,
+    items: List[Dict],
+    replace_existing: bool = False,
+    user_id: Optional[str] = None,
+    academic_start_year: Optional[int] = None
+) -> tuple[List[Dict], float]:
+    """
+    Validate parsed items and write them to the syllabus_items collection in batched commits.
+    With replace_existing=True the syllabus's current items are deleted in the same batches,
+    so the old item set is swapped for the new one without a window where it has no items.
+    user_id (the syllabus owner) is copied onto each item for the cross-syllabus deadlines query.
+    academic_start_year places due dates given without a year (DEFAULT_ACADEMIC_START_YEAR if unset).
+    Returns (stored_items, write_ms) where write_ms is the time spent committing.
+    """
+    operations = []
+    stored_items = []
+    for item in items:
+        # Validate required fields
+        if not all(key in item for key in ["category", "name", "due_date"]):
+            print(f"⚠️  Skipping invalid item: {item}")
+            continue
+        
+        # Validate category
+        if item["category"] not in VALID_CATEGORIES:
+            print(f"⚠️  Invalid category '{item['category']}', defaulting to 'Other'")
+            item["category"] = "Other"
+        
+        # Store one date format, plus a typed copy for range queries and sorting
+        due_date, due_at = normalize_due_date(item["due_date"], academic_start_year or DEFAULT_ACADEMIC_START_YEAR)
+        
+        # Document IDs are generated client-side, so they are known before the commit
+        doc_ref = db.collection("syllabus_items").document()
+        item_data = {
+            "syllabus_id": syllabus_id,
+            "user_id": user_id,
+            "category": item["category"],
+            "name": item["name"],
+            "due_date": due_date,
+            "due_date_raw": str(item["due_date"]),
+            "due_at": due_at,
+            "has_date": due_at is not None,
+            "selected": False,
+            "created_at": datetime.now()
+        }
+        operations.append(("set", doc_ref, item_data))
+        stored_items.append({**item_data, "id": doc_ref.id})
+    
+    if replace_existing:
+        # Deletes go after the new writes, so if the swap spans several chunks
+        # the syllabus briefly has both sets rather than neither
+        existing_items = await fetch_docs(
+            db.collection("syllabus_items").where("syllabus_id", "==", syllabus_id)
+        )
+        operations.extend(("delete", item_doc.reference, None) for item_doc in existing_items)
+        print(f"🗑️  Replacing {len(existing_items)} existing items for syllabus {syllabus_id}")
+    
+    if operations:
+        # Bumped in the last batch, so a new version always means the item set is complete
+        operations.append(("update", db.collection("syllabi").document(syllabus_id), items_version_bump()))
+    
+    start = time.perf_counter()
+    commits = await run_io(commit_in_batches, operations) if operations else 0
+    write_ms = (time.perf_counter() - start) * 1000
+    syllabus_cache.invalidate(syllabus_id)
+    items_notifier.publish(syllabus_id)
+    print(f"   Committed {len(operations)} write(s) in {commits} batch commit(s)")
+    return stored_items, write_ms
+
+
+def parse_items_from_response(response_text: str) -> List[Dict]:
+    """
+    Pull the items list out of a model response.
+    Raises json.JSONDecodeError if the response has no valid JSON.
+    """
+    # Try to extract JSON from markdown code blocks if present
+    json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', response_text, re.DOTALL)
+    if json_match:
+        json_text = json_match.group(1)
+    else:
+        # Try to find JSON object directly
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            json_text = json_match.group(0)
+        else:
+            json_text = response_text
+    
+    try:
+        parsed_data = json.loads(json_text)
+    except json.JSONDecodeError:
+        print(f"   Response text: {response_text}")
+        raise
+    return parsed_data.get("items", [])
+
+
+class ParsedSyllabusItem(BaseModel):
+    """One item from the model's items[] list, checked before it is stored."""
+    category: str
+    name: str
+    due_date: str
+    
+    @field_validator("name")
+    @classmethod
+    def name_not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("name is empty")
+        return value
+    
+    @field_validator("category")
+    @classmethod
+    def known_category(cls, value: str) -> str:
+        return value if value in VALID_CATEGORIES else "Other"
+
+
+# Counters for the item extractor, exposed on /metrics
+item_extraction_stats = {
+    "items": 0,
+    "invalid_items": 0,
+    "malformed_objects": 0,
+    "fallbacks": 0
+}
+
+ITEMS_ARRAY_RE = re.compile(r'"items"\s*:\s*\[')
+# Outside a string only brackets and quotes matter; inside one only quotes and escapes do
+STRUCTURAL_RE = re.compile(r'[{}\[\]"]')
+STRING_SPECIAL_RE = re.compile(r'["\\]')
+
+
+class IncrementalItemExtractor:
+    """
+    Pull items out of a model response as it streams in.
+    Text is fed in chunk by chunk, and each object in the "items" array is decoded and validated
+    as soon as its closing brace arrives. A malformed or invalid object is skipped without losing
+    the rest, and anything after the array (code fences, trailing prose) is ignored.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._object_start = None
+        self.items = []
+        self.invalid = 0
+    
+    def feed(self, text: str) -> List[Dict]:
+        """Add the next piece of the response. Returns the items completed by it."""
+        if not text:
+            return []
+        self._chunks.append(text)
+        if self._done:
+            return []
+        self._buffer += text
+        
+        if not self._in_array:
+            match = ITEMS_ARRAY_RE.search(self._buffer)
+            if not match:
+                # Keep a tail in case the "items" key is split across chunks
+                self._buffer = self._buffer[-32:]
+                return []
+            self._in_array = True
+            self._buffer = self._buffer[match.end():]
+            self._pos = 0
+        
+        return self._scan()
+    
+    def finish(self) -> List[Dict]:
+        """
+        Call once the response is complete. Returns any items not yet returned by feed().
+        Falls back to parsing the whole response when it had no "items" array to stream
+        (raises json.JSONDecodeError if it isn't JSON at all).
+        """
+        if self._in_array:
+            if not self._done and self._object_start is not None:
+                print(f"⚠️  Response ended inside an item, dropping it")
+                item_extraction_stats["malformed_objects"] += 1
+            return []
+        
+        item_extraction_stats["fallbacks"] += 1
+        return self._accept_all(parse_items_from_response("".join(self._chunks)))
+    
+    def _scan(self) -> List[Dict]:
+        buffer = self._buffer
+        pos = self._pos
+        completed = []
+        
+        while pos < len(buffer):
+            if self._in_string:
+                match = STRING_SPECIAL_RE.search(buffer, pos)
+                if not match:
+                    pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # The escaped character hasn't arrived yet
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+            
+            match = STRUCTURAL_RE.search(buffer, pos)
+            if not match:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+            
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    if char == "[":
+                        continue  # Stray bracket between items
+                    self._object_start = match.start()
+                self._depth += 1
+            elif self._depth == 0:
+                if char == "]":
+                    self._done = True
+                    break
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._accept_object(buffer[self._object_start:pos]))
+                    self._object_start = None
+                    # Drop the consumed text so the buffer only ever holds one item
+                    buffer = buffer[pos:]
+                    pos = 0
+        
+        self._buffer = buffer
+        self._pos = pos
+        return completed
+    
+    def _accept_object(self, object_text: str) -> List[Dict]:
+        try:
+            data = json.loads(object_text)
+        except json.JSONDecodeError as e:
+            print(f"⚠️  Skipping malformed item JSON: {e}")
+            item_extraction_stats["malformed_objects"] += 1
+            return []
+        return self._accept_all([data])
+    
+    def _accept_all(self, raw_items: list) -> List[Dict]:
+        accepted = []
+        for raw_item in raw_items:
+            try:
+                item = ParsedSyllabusItem.model_validate(raw_item).model_dump()
+            except ValidationError as e:
+                print(f"⚠️  Skipping invalid item {raw_item!r}: {e.error_count()} error(s)")
+                self.invalid += 1
+                item_extraction_stats["invalid_items"] += 1
+                continue
+            accepted.append(item)
+        self.items.extend(accepted)
+        item_extraction_stats["items"] += len(accepted)
+        return accepted
+
+
+def extract_items(response_text: str) -> List[Dict]:
+    """Run a complete (non-streamed) response through the item extractor."""
+    extractor = IncrementalItemExtractor()
+    extractor.feed(response_text)
+    extractor.finish()
+    return extractor.items
+
+
+def record_token_usage(response, timings: Optional[Dict]) -> None:
+    """Add a response's prompt/output token counts to a timings dict, if the SDK reported them."""
+    usage = getattr(response, "usage_metadata", None)
+    if timings is None or usage is None:
+        return
+    timings["prompt_tokens"] = timings.get("prompt_tokens", 0) + (usage.prompt_token_count or 0)
+    timings["output_tokens"] = timings.get("output_tokens", 0) + (usage.candidates_token_count or 0)
+
+
+# Local text extraction and chunked parsing - long course packets are split and parsed in parallel
+PARSE_MODE = os.getenv("PARSE_MODE", "auto")  # "single", "chunked" or "auto" (chunked only for long documents)
+PARSE_CHUNK_CHARS = int(os.getenv("PARSE_CHUNK_CHARS", "12000"))
+PARSE_CHUNKED_MIN_CHARS = int(os.getenv("PARSE_CHUNKED_MIN_CHARS", "30000"))
+PARSE_CHUNK_CONCURRENCY = int(os.getenv("PARSE_CHUNK_CONCURRENCY", "4"))
+# PDFs with less extractable text than this are probably scanned, so Gemini reads the file itself
+MIN_EXTRACTED_CHARS = 200
+
+
+def extract_syllabus_text(file_bytes: bytes, mime_type: str) -> Optional[List[str]]:
+    """
+    Extract text from a PDF, DOCX or TXT syllabus as a list of units (pages for PDF, paragraphs otherwise).
+    Returns None when there is no usable text, so the caller can fall back to sending the file to Gemini.
+    """
+    try:
+        if mime_type == 'text/plain':
+            text = file_bytes.decode("utf-8", errors="replace")
+            units = [block.strip() for block in re.split(r'\n\s*\n', text)]
+        
+        elif mime_type == 'application/pdf':
+            if PdfReader is None:
+                return None
+            reader = PdfReader(io.BytesIO(file_bytes))
+            units = [(page.extract_text() or "").strip() for page in reader.pages]
+        
+        elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+            with zipfile.ZipFile(io.BytesIO(file_bytes)) as docx:
+                document = ElementTree.fromstring(docx.read("word/document.xml"))
+            namespace = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+            units = [
+                "".join(node.text or "" for node in paragraph.iter(f"{namespace}t")).strip()
+                for paragraph in document.iter(f"{namespace}p")
+            ]
+        
+        else:
+            return None
+    except Exception as e:
+        print(f"⚠️  Local text extraction failed, using the whole file: {e}")
+        return None
+    
+    units = [unit for unit in units if unit]
+    if sum(len(unit) for unit in units) < MIN_EXTRACTED_CHARS:
+        return None
+    return units
+
+
+def split_into_chunks(units: List[str], max_chars: int) -> List[str]:
+    """
+    Pack pages/paragraphs into chunks of at most max_chars, never splitting a unit that fits.
+    Units that are too long on their own are split on line boundaries.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    
+    def flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append("\n\n".join(current))
+        current = []
+        current_len = 0
+    
+    for unit in units:
+        pieces = [unit]
+        if len(unit) > max_chars:
+            pieces = []
+            piece = ""
+            for line in unit.splitlines():
+                if piece and len(piece) + len(line) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                pieces.append(piece)
+        
+        for piece in pieces:
+            if current_len + len(piece) > max_chars:
+                flush()
+            current.append(piece)
+            current_len += len(piece) + 2
+    flush()
+    return chunks
+
+
+def merge_parsed_items(item_lists: List[List[Dict]]) -> List[Dict]:
+    """Merge items parsed from separate chunks, dropping duplicates of the same name and date."""
+    merged = []
+    seen = set()
+    for items in item_lists:
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            key = (
+                " ".join(str(item.get("name", "")).lower().split()),
+                str(item.get("due_date", "")).strip()
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(item)
+    return merged
+
+
+async def parse_text_in_chunks(text_units: List[str], timings: Optional[Dict] = None) -> tuple[List[Dict], int]:
+    """
+    Parse extracted syllabus text chunk by chunk, with at most PARSE_CHUNK_CONCURRENCY model calls at once.
+    A chunk whose response can't be parsed is skipped rather than failing the whole syllabus,
+    unless every chunk fails (raises json.JSONDecodeError, like a failed single-call parse).
+    Returns (items, failed_chunks) - a result with failed chunks is incomplete and shouldn't be cached.
+    """
+    chunks = split_into_chunks(text_units, PARSE_CHUNK_CHARS)
+    semaphore = asyncio.Semaphore(PARSE_CHUNK_CONCURRENCY)
+    print(f"📤 Sending {len(chunks)} chunks to Gemini for parsing...")
+    
+    async def parse_chunk(index: int, chunk: str) -> Optional[List[Dict]]:
+        async with semaphore:
+            chunk_start = time.perf_counter()
+            response = await generate_content_async([
+                f"SYLLABUS TEXT (part {index + 1} of {len(chunks)}):\n\n{chunk}",
+                SYLLABUS_PARSING_PROMPT
+            ], **parsing_generation_kwargs())
+            chunk_ms = (time.perf_counter() - chunk_start) * 1000
+        record_token_usage(response, timings)
+        extractor = IncrementalItemExtractor()
+        try:
+            extractor.feed(extract_response_text(response))
+            extractor.finish()
+        except json.JSONDecodeError as e:
+            record_parse_output(chunk_ms, failed=True)
+            print(f"⚠️  Skipping chunk {index + 1}, response was not valid JSON: {e}")
+            return None
+        record_parse_output(chunk_ms, invalid_items=extractor.invalid)
+        return extractor.items
+    
+    results = await asyncio.gather(*(parse_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+    item_lists = [chunk_items for chunk_items in results if chunk_items is not None]
+    failed_chunks = len(results) - len(item_lists)
+    if timings is not None:
+        timings["chunks"] = len(chunks)
+        timings["failed_chunks"] = failed_chunks
+    if not item_lists:
+        raise json.JSONDecodeError(f"None of the {len(chunks)} chunk responses were valid JSON", "", 0)
+    
+    items = merge_parsed_items(item_lists)
+    print(f"📥 Merged {sum(len(chunk_items) for chunk_items in item_lists)} chunk items into {len(items)}")
+    return items, failed_chunks
+
+
+# Rule-based pre-parser - well-structured syllabi ("Assignment 3 - Due: March 14") are parsed
+# with regexes first, and only go to Gemini when the rules aren't confident about the result
+RULE_PARSER_ENABLED = os.getenv("RULE_PARSER_ENABLED", "true").lower() == "true"
+RULE_PARSER_MIN_CONFIDENCE = float(os.getenv("RULE_PARSER_MIN_CONFIDENCE", "0.8"))
+# Same default as the parsing prompt: dates without a year fall in the 2025-2026 academic year
+DEFAULT_ACADEMIC_START_YEAR = 2025
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+MONTH_PATTERN = r'(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?'
+ISO_DATE_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+MONTH_DAY_RE = re.compile(MONTH_PATTERN + r'\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?', re.IGNORECASE)
+DAY_MONTH_RE = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+' + MONTH_PATTERN + r'(?:,?\s+(\d{4}))?', re.IGNORECASE)
+NUMERIC_DATE_RE = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b')
+TERM_RE = re.compile(r'\b(fall|autumn|spring|summer|winter)\s+(?:semester\s+|term\s+)?(\d{4})\b', re.IGNORECASE)
+# Schedule lines ("Week 5: Midterm Exam"), which are never section headings even when in capitals
+UNDATED_SCHEDULE_RE = re.compile(r'^\s*(?:week|session|lecture|class|day|module)\s*\d+\b', re.IGNORECASE)
+# Grade weights in section headings ("EXAMS (25% of final grade):")
+GRADE_WEIGHT_RE = re.compile(r'\d+(?:\.\d+)?\s*%')
+# Words around the date that aren't part of the item name
+DUE_WORDS_RE = re.compile(r'\b(?:due(?:\s+(?:date|on|by))?|deadline|on|by|date)\s*:?\s*$', re.IGNORECASE)
+
+
+def infer_academic_start_year(text: str) -> int:
+    """Work out which academic year a syllabus is for from a term heading like "Fall 2025"."""
+    match = TERM_RE.search(text)
+    if not match:
+        return DEFAULT_ACADEMIC_START_YEAR
+    term, year = match.group(1).lower(), int(match.group(2))
+    return year if term in ("fall", "autumn") else year - 1
+
+
+def syllabus_academic_start_year(syllabus_data: Optional[Dict]) -> Optional[int]:
+    """
+    Academic year a stored syllabus is for: from a term in its name ("CS101 Spring 2026.pdf"),
+    else from when it was uploaded. None if the document has neither.
+    """
+    if not syllabus_data:
+        return None
+    if TERM_RE.search(syllabus_data.get("name") or ""):
+        return infer_academic_start_year(syllabus_data["name"])
+    uploaded = syllabus_data.get("upload_date") or syllabus_data.get("created_at")
+    if uploaded is None:
+        return None
+    # Academic years start in August, like the month split in find_date
+    return uploaded.year if uploaded.month >= 8 else uploaded.year - 1
+
+
+def find_date(line: str, academic_start_year: Optional[int]) -> Optional[tuple]:
+    """
+    Find the first date in a line. Dates without a year are skipped if academic_start_year is None.
+    Returns (iso_date, start, end) with the match position, or None if there is no valid date.
+    """
+    candidates = []
+    for match in ISO_DATE_RE.finditer(line):
+        candidates.append((match.start(), match.end(), int(match.group(1)), int(match.group(2)), int(match.group(3))))
+    for match in MONTH_DAY_RE.finditer(line):
+        year = int(match.group(3)) if match.group(3) else None
+        candidates.append((match.start(), match.end(), year, MONTHS[match.group(1)[:3].lower()], int(match.group(2))))
+    for match in DAY_MONTH_RE.finditer(line):
+        year = int(match.group(3)) if match.group(3) else None
+        candidates.append((match.start(), match.end(), year, MONTHS[match.group(2)[:3].lower()], int(match.group(1))))
+    for match in NUMERIC_DATE_RE.finditer(line):
+        year = match.group(3)
+        if year and len(year) == 2:
+            year = f"20{year}"
+        candidates.append((match.start(), match.end(), int(year) if year else None, int(match.group(1)), int(match.group(2))))
+    
+    for start, end, year, month, day in sorted(candidates):
+        if year is None:
+            if academic_start_year is None:
+                continue
+            # Fall months belong to the start year, spring/summer months to the year after
+            year = academic_start_year if month >= 8 else academic_start_year + 1
+        try:
+            return datetime(year, month, day).strftime("%Y-%m-%d"), start, end
+        except ValueError:
+            continue
+    return None
+
+
+def clean_item_name(text: str) -> str:
+    """Strip bullets, separators and "Due:" wording from the text around a date."""
+    text = DUE_WORDS_RE.sub("", text.strip())
+    return text.strip(" \t-–—:;,|•*()[]").strip()
+
+
+def rule_category(text: str) -> str:
+    """
+    Categorize an item name for the rule parser.
+    The first keyword of each CATEGORY_MAPPING entry is the category's own noun ("quiz", "project"),
+    so when one appears the last one in the name wins ("Midterm Project" is a project, not an exam).
+    Otherwise this falls back to detect_category.
+    """
+    text_lower = text.lower()
+    best_category, best_position = None, -1
+    for category, keywords in CATEGORY_MAPPING.items():
+        if keywords:
+            position = text_lower.rfind(keywords[0])
+            if position > best_position:
+                best_category, best_position = category, position
+    if best_category:
+        return best_category.capitalize()
+    return detect_category(text)
+
+
+def extract_items_with_rules(text: str) -> tuple[List[Dict], float]:
+    """
+    Extract dated items from syllabus text with regexes, using CATEGORY_MAPPING for categories.
+    Returns (items, confidence). Confidence is the share of the assessments the rules saw that became
+    an item. Assessments are dated lines, undated lines naming a category ("Final Exam: TBD",
+    "Weekly quizzes every Friday") and grade-weighted section headings, which only count when
+    nothing under them became an item. So 1.0 means there was nothing the model could add.
+    """
+    academic_start_year = infer_academic_start_year(text)
+    items = []
+    dated_lines = 0
+    undated_item_lines = 0
+    empty_weighted_sections = 0
+    section_category = "Other"
+    section_weighted = False
+    section_start = 0
+    
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        
+        found = find_date(line, academic_start_year)
+        if found is None:
+            if not UNDATED_SCHEDULE_RE.match(line) and (line.endswith(":") or line.isupper()):
+                # Section headings like "QUIZZES (20% of final grade):" set the category for the lines below
+                if section_weighted and len(items) == section_start:
+                    empty_weighted_sections += 1
+                section_category = rule_category(re.sub(r'\(.*?\)', "", line))
+                section_weighted = section_category != "Other" and bool(GRADE_WEIGHT_RE.search(line))
+                section_start = len(items)
+            elif rule_category(line) != "Other":
+                # An assessment without a date the rules can read - the model might still find it
+                undated_item_lines += 1
+            continue
+        
+        dated_lines += 1
+        due_date, start, end = found
+        name = clean_item_name(line[:start]) or clean_item_name(line[end:])
+        if not name:
+            continue
+        
+        category = rule_category(name)
+        if category == "Other":
+            category = section_category
+        if category == "Other":
+            continue
+        
+        items.append({"category": category, "name": name, "due_date": due_date})
+    
+    if section_weighted and len(items) == section_start:
+        empty_weighted_sections += 1
+    
+    considered = dated_lines + undated_item_lines + empty_weighted_sections
+    confidence = len(items) / considered if considered else 0.0
+    return items, confidence
+
+
+async def parse_syllabus_with_ai(
+    syllabus_id: str,
+    file_bytes: bytes,
+    mime_type: str,
+    syllabus_name: str,
+    timings: Optional[Dict] = None,
+    replace_existing: bool = False,
+    syllabus_data: Optional[Dict] = None,
+    file_sha256: Optional[str] = None,
+    on_items=None
+) -> List[Dict]:
+    """
+    Parse syllabus using Gemini AI to extract structured items with dates.
+    Returns list of items with category, name, and due_date.
+    If a timings dict is passed, it is filled with model_ms, write_ms, the parse mode and token counts.
+    With replace_existing=True the syllabus's old items are swapped out once the new ones are parsed.
+    Passing the syllabus document as syllabus_data lets the parse create or reuse its context handle.
+    file_sha256 skips re-hashing the file when the upload already computed it.
+    on_items is an optional async callback, called with the running item count as a streamed response is parsed.
+    """
+    try:
+        print(f"🔍 Parsing syllabus: {syllabus_name}")
+        
+        # Results depend only on the file, its MIME type, the prompt and the model, so identical
+        # uploads and reparses are served from the parse cache without calling Gemini
+        cache_key = parse_cache_key(file_sha256 or hashlib.sha256(file_bytes).hexdigest(), mime_type)
+        items = await get_cached_parse(cache_key)
+        if items is not None:
+            print(f"⚡ Parse cache hit, skipping Gemini")
+            if timings is not None:
+                timings["parse_mode"] = "cache"
+        
+        text_units = None
+        if items is None and (PARSE_MODE != "single" or RULE_PARSER_ENABLED):
+            text_units = await run_io(extract_syllabus_text, file_bytes, mime_type)
+        
+        if items is None and RULE_PARSER_ENABLED and text_units:
+            # Try the regex pre-parser first - it takes microseconds and needs no model call
+            rules_start = time.perf_counter()
+            rule_items, confidence = extract_items_with_rules("\n\n".join(text_units))
+            rules_ms = (time.perf_counter() - rules_start) * 1000
+            print(f"📏 Rule parser found {len(rule_items)} items (confidence {confidence:.2f}) in {rules_ms:.1f}ms")
+            if timings is not None:
+                timings["rule_confidence"] = confidence
+                timings["rules_ms"] = rules_ms
+            if rule_items and confidence >= RULE_PARSER_MIN_CONFIDENCE:
+                items = rule_items
+                if timings is not None:
+                    timings["parse_mode"] = "rules"
+        
+        if items is None:
+            model_start = time.perf_counter()
+            
+            # Long documents have their text extracted locally and are parsed chunk by chunk;
+            # everything else goes to Gemini as a file in one call
+            use_chunks = PARSE_MODE != "single" and bool(text_units) and (
+                PARSE_MODE == "chunked" or sum(len(unit) for unit in text_units) >= PARSE_CHUNKED_MIN_CHARS
+            )
+            
+            failed_chunks = 0
+            if use_chunks:
+                items, failed_chunks = await parse_text_in_chunks(text_units, timings)
+            else:
+                # Call Gemini with file and parsing prompt, streaming the response so items
+                # are decoded while the rest of the JSON is still being generated
+                print(f"📤 Sending to Gemini for parsing...")
+                if syllabus_data is not None:
+                    async def load_file_bytes():
+                        return file_bytes
+                    
+                    response_stream = await generate_with_syllabus_context(
+                        syllabus_id,
+                        syllabus_data,
+                        mime_type,
+                        [SYLLABUS_PARSING_PROMPT],
+                        load_file_bytes,
+                        stream=True,
+                        **parsing_generation_kwargs()
+                    )
+                else:
+                    file_part = Part.from_data(
+                        data=file_bytes,
+                        mime_type=mime_type
+                    )
+                    response_stream = await generate_content_async(
+                        [file_part, SYLLABUS_PARSING_PROMPT],
+                        stream=True,
+                        **parsing_generation_kwargs()
+                    )
+                
+                extractor = IncrementalItemExtractor()
+                last_chunk = None
+                async with contextlib.aclosing(iterate_stream(response_stream)) as chunks:
+                    async for chunk in chunks:
+                        last_chunk = chunk
+                        if extractor.feed(chunk_text(chunk)) and on_items is not None:
+                            await on_items(len(extractor.items))
+                
+                # Usage metadata for the whole response arrives on the final chunk
+                record_token_usage(last_chunk, timings)
+                call_ms = (time.perf_counter() - model_start) * 1000
+                try:
+                    extractor.finish()
+                except json.JSONDecodeError:
+                    record_parse_output(call_ms, failed=True)
+                    raise
+                record_parse_output(call_ms, invalid_items=extractor.invalid)
+                items = extractor.items
+                
+                print(f"📥 Received response from Gemini")
+                if extractor.invalid:
+                    print(f"   Skipped {extractor.invalid} invalid item(s)")
+            
+            if timings is not None:
+                timings["parse_mode"] = "chunked" if use_chunks else "single"
+                timings["model_ms"] = (time.perf_counter() - model_start) * 1000
+            
+            # Partial and empty results are still stored, but not cached - a reparse should call Gemini again
+            if failed_chunks:
+                print(f"⚠️  {failed_chunks} chunk(s) failed, not caching the partial result")
+            elif not items:
+                print(f"⚠️  No items parsed, not caching the empty result")
+            else:
+                await set_cached_parse(cache_key, items)
+        
+        print(f"✅ Parsed {len(items)} items from syllabus")
+        
+        # Store items in Firestore
+        stored_items, write_ms = await store_syllabus_items(
+            syllabus_id,
+            items,
+            replace_existing=replace_existing,
+            user_id=(syllabus_data or {}).get("user_id"),
+            academic_start_year=syllabus_academic_start_year(syllabus_data)
+        )
+        if timings is not None:
+            timings["write_ms"] = write_ms
+        
+        print(f"💾 Stored {len(stored_items)} items in Firestore in {write_ms:.0f}ms")
+        return stored_items
+        
+    except json.JSONDecodeError as e:
+        print(f"❌ JSON parsing error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to parse AI response as JSON: {str(e)}"
+        )
+    except Exception as e:
+        print(f"❌ Error parsing syllabus: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error parsing syllabus: {str(e)}"
+        )
+
+
+# Parse jobs - syllabus parsing runs in the background so uploads return as soon as the file is stored
+# Each syllabus has one parse_jobs document (same ID as the syllabus) tracking status, progress and error
+PARSE_QUEUE_MODE = os.getenv("PARSE_QUEUE_MODE", "inprocess")  # "inprocess" or "external" (see parse_worker.py)
+PARSE_WORKER_CONCURRENCY = int(os.getenv("PARSE_WORKER_CONCURRENCY", "4"))
+PARSE_JOB_MAX_ATTEMPTS = int(os.getenv("PARSE_JOB_MAX_ATTEMPTS", "3"))
+PARSE_JOB_BACKOFF_SECONDS = float(os.getenv("PARSE_JOB_BACKOFF_SECONDS", "2"))
+# A running or retrying job is leased to its worker, which renews the lease while it's alive.
+# Jobs whose lease ran out (the process restarted or died) are claimed again by the next sweep.
+PARSE_JOB_LEASE_SECONDS = float(os.getenv("PARSE_JOB_LEASE_SECONDS", "120"))
+ACTIVE_PARSE_JOB_STATUSES = ["running", "retrying"]
+
+parse_job_stats = {"attempts": 0, "retries": 0, "succeeded": 0, "failed": 0, "recovered": 0}
+
+
+def new_parse_job(syllabus_id: str, syllabus_data: Dict, mime_type: str, replace_existing: bool = False) -> Dict:
+    """Build a queued parse_jobs document for a syllabus."""
+    return {
+        "syllabus_id": syllabus_id,
+        "user_id": syllabus_data.get("user_id"),
+        "syllabus_name": syllabus_data.get("name"),
+        "file_path": syllabus_data.get("file_path"),
+        "mime_type": mime_type,
+        "replace_existing": replace_existing,
+        "status": "queued",
+        "progress": 0,
+        "attempts": 0,
+        "error": None,
+        "items_count": None,
+        "lease_expires_at": None,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
+
+def new_parse_job_lease() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=PARSE_JOB_LEASE_SECONDS)
+
+
+def parse_job_lease_expired(job: Dict) -> bool:
+    """True if nobody holds a running/retrying job any more. Jobs from before leases use updated_at."""
+    expires_at = job.get("lease_expires_at")
+    if expires_at is None and job.get("updated_at") is not None:
+        expires_at = job["updated_at"] + timedelta(seconds=PARSE_JOB_LEASE_SECONDS)
+    if expires_at is None:
+        return True
+    if expires_at.tzinfo is None:
+        # Naive datetimes are stored (and read back) as UTC
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+def claim_parse_job(job_id: str) -> bool:
+    """
+    Atomically move a queued job - or a running/retrying job whose lease expired - to running,
+    so only one worker process picks it up. Returns True if this caller claimed the job.
+    """
+    job_ref = db.collection("parse_jobs").document(job_id)
+    
+    @firestore.transactional
+    def claim(transaction):
+        snapshot = job_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return False
+        job = snapshot.to_dict()
+        if job.get("status") != "queued":
+            if job.get("status") not in ACTIVE_PARSE_JOB_STATUSES or not parse_job_lease_expired(job):
+                return False
+            print(f"♻️  Reclaiming parse job {job_id} (was {job.get('status')}, lease expired)")
+            parse_job_stats["recovered"] += 1
+        transaction.update(job_ref, {
+            "status": "running",
+            "lease_expires_at": new_parse_job_lease(),
+            "updated_at": datetime.now()
+        })
+        return True
+    
+    return claim(db.transaction())
+
+
+def find_claimable_parse_jobs(limit: int) -> List[str]:
+    """
+    IDs of parse jobs a worker could claim: queued jobs, then running/retrying jobs whose lease expired.
+    Few jobs are active at once, so expired leases are filtered here rather than needing another index.
+    """
+    job_ids = [
+        doc.id for doc in
+        db.collection("parse_jobs").where("status", "==", "queued").limit(limit).stream()
+    ]
+    if len(job_ids) < limit:
+        active_jobs = db.collection("parse_jobs").where("status", "in", ACTIVE_PARSE_JOB_STATUSES).stream()
+        job_ids += [doc.id for doc in active_jobs if parse_job_lease_expired(doc.to_dict())]
+    return job_ids[:limit]
+
+
+async def run_parse_job(job_id: str) -> None:
+    """
+    Run a parse job to completion, retrying failed attempts with exponential backoff.
+    The file is read through the file cache, which the upload warmed when parsing runs in-process.
+    """
+    job_ref = db.collection("parse_jobs").document(job_id)
+    job_doc = await fetch_doc(job_ref)
+    if not job_doc.exists:
+        print(f"⚠️  Parse job {job_id} not found")
+        return
+    job = job_doc.to_dict()
+    
+    async def update_job(fields: Dict):
+        # Every write renews the lease
+        await run_io(job_ref.update, {**fields, "lease_expires_at": new_parse_job_lease(), "updated_at": datetime.now()})
+    
+    if job.get("attempts", 0) >= PARSE_JOB_MAX_ATTEMPTS:
+        # Reclaimed after its worker died during the last attempt
+        parse_job_stats["failed"] += 1
+        await update_job({
+            "status": "failed",
+            "error": job.get("error") or "Parse worker stopped during the last attempt",
+            "finished_at": datetime.now()
+        })
+        items_notifier.publish(job["syllabus_id"])
+        return
+    
+    async def renew_lease():
+        # Model calls and backoff sleeps can outlast the lease without any other job write
+        while True:
+            await asyncio.sleep(PARSE_JOB_LEASE_SECONDS / 3)
+            try:
+                await update_job({})
+            except Exception as e:
+                print(f"⚠️  Could not renew lease on parse job {job_id}: {e}")
+    
+    lease_task = asyncio.create_task(renew_lease())
+    try:
+        await attempt_parse_job(job_id, job, update_job)
+    finally:
+        lease_task.cancel()
+
+
+async def attempt_parse_job(job_id: str, job: Dict, update_job) -> None:
+    """The attempt loop of run_parse_job, run while the job's lease is being renewed."""
+    file_bytes = None
+    for attempt in range(job.get("attempts", 0) + 1, PARSE_JOB_MAX_ATTEMPTS + 1):
+        parse_job_stats["attempts"] += 1
+        await update_job({"status": "running", "attempts": attempt, "progress": 10, "items_found": 0, "started_at": datetime.now()})
+        try:
+            if file_bytes is None:
+                file_bytes = await load_syllabus_file(job["file_path"])
+            
+            syllabus_doc = await fetch_doc(db.collection("syllabi").document(job["syllabus_id"]))
+            if not syllabus_doc.exists:
+                # Syllabus was deleted while the job waited - nothing to parse into
+                await update_job({"status": "failed", "error": "Syllabus not found", "finished_at": datetime.now()})
+                items_notifier.publish(job["syllabus_id"])
+                return
+            await update_job({"progress": 30})
+            
+            syllabus_data = syllabus_doc.to_dict()
+            timings = {}
+            last_progress_update = 0.0
+            
+            async def report_items(items_found: int):
+                # Items stream in faster than it's worth writing the job doc, so report at most once a second
+                nonlocal last_progress_update
+                if time.monotonic() - last_progress_update >= 1:
+                    last_progress_update = time.monotonic()
+                    await update_job({"items_found": items_found})
+            
+            parsed_items = await parse_syllabus_with_ai(
+                syllabus_id=job["syllabus_id"],
+                file_bytes=file_bytes,
+                mime_type=job["mime_type"],
+                syllabus_name=job.get("syllabus_name"),
+                timings=timings,
+                replace_existing=job.get("replace_existing", False),
+                syllabus_data=syllabus_data,
+                file_sha256=syllabus_data.get("file_sha256"),
+                on_items=report_items
+            )
+            await update_job({
+                "status": "succeeded",
+                "progress": 100,
+                "error": None,
+                "items_count": len(parsed_items),
+                "timings": timings,
+                "finished_at": datetime.now()
+            })
+            parse_job_stats["succeeded"] += 1
+            print(f"✅ Parse job {job_id} complete: {len(parsed_items)} items extracted")
+            return
+            
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            if attempt >= PARSE_JOB_MAX_ATTEMPTS:
+                parse_job_stats["failed"] += 1
+                print(f"❌ Parse job {job_id} failed after {attempt} attempt(s): {error}")
+                await update_job({"status": "failed", "error": error, "finished_at": datetime.now()})
+                # Wake long polls so they report the failure instead of waiting out their timeout
+                items_notifier.publish(job["syllabus_id"])
+                return
+            
+            delay = PARSE_JOB_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            parse_job_stats["retries"] += 1
+            print(f"⚠️  Parse job {job_id} attempt {attempt} failed, retrying in {delay:.0f}s: {error}")
+            # "retrying" rather than "queued" so other workers don't claim it during the backoff,
+            # while the renewed lease still lets them reclaim it if this process dies
+            await update_job({"status": "retrying", "error": error})
+            await asyncio.sleep(delay)
+
+
+class ParseJobQueue:
+    """
+    In-process job queue with a bounded pool of asyncio workers.
+    Only job IDs are queued - a burst of uploads doesn't keep every file in memory while it waits.
+    """
+    
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self._queue = asyncio.Queue()
+        self._queued_ids = set()
+        self._workers = []
+    
+    def start(self):
+        for n in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(n)))
+        # Jobs left in Firestore by a previous process (or another instance) are picked up here
+        self._workers.append(asyncio.create_task(self._recover()))
+        print(f"👷 Started {self.concurrency} parse workers")
+    
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+    
+    async def enqueue(self, job_id: str):
+        if job_id in self._queued_ids:
+            return
+        self._queued_ids.add(job_id)
+        await self._queue.put(job_id)
+    
+    def pending(self) -> int:
+        return self._queue.qsize()
+    
+    async def recover_jobs(self) -> int:
+        """Queue unfinished jobs found in Firestore. Returns how many were queued."""
+        job_ids = await run_io(find_claimable_parse_jobs, self.concurrency * 25)
+        for job_id in job_ids:
+            await self.enqueue(job_id)
+        return len(job_ids)
+    
+    async def _recover(self):
+        while True:
+            try:
+                recovered = await self.recover_jobs()
+                if recovered:
+                    print(f"♻️  Queued {recovered} unfinished parse job(s) from Firestore")
+            except Exception as e:
+                print(f"⚠️  Error recovering parse jobs: {e}")
+            await asyncio.sleep(PARSE_JOB_LEASE_SECONDS)
+    
+    async def _worker(self, n: int):
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                # Claimed like in parse_worker.py, so a job queued here and by a recovery sweep
+                # (or by another instance) only runs once
+                if await run_io(claim_parse_job, job_id):
+                    await run_parse_job(job_id)
+            except Exception as e:
+                # run_parse_job records its own failures, this only guards the worker loop
+                print(f"❌ Parse worker {n} crashed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+parse_job_queue = ParseJobQueue(PARSE_WORKER_CONCURRENCY)
+
+
+async def submit_parse_job(job_id: str):
+    """Hand a stored parse job to the in-process queue, or leave it for parse_worker.py in external mode."""
+    if PARSE_QUEUE_MODE == "inprocess":
+        await parse_job_queue.enqueue(job_id)
+
+
+@app.on_event("startup")
+async def start_parse_workers():
+    if PARSE_QUEUE_MODE == "inprocess":
+        parse_job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_parse_workers():
+    await parse_job_queue.stop()
+
+
+async def store_syllabus_upload(file: UploadFile, user_id: str, file_size: int, file_sha256: str) -> tuple:
+    """
+    Upload a validated, scanned syllabus file to Storage and build its syllabus and parse job documents.
+    The documents are returned rather than written, so callers can commit them in one batch.
+    Returns (doc_ref, syllabus_data, parse_job).
+    """
+    # Get file extension
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    content_type = CONTENT_TYPE_MAP.get(file_extension, 'application/octet-stream')
+    
+    # Create unique filename to avoid collisions
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_filename = f"{timestamp}_{file.filename}"
+    storage_path = f"syllabi/{user_id}/{safe_filename}"
+    
+    # Upload to Firebase Storage straight from the spooled upload file
+    blob = bucket.blob(storage_path)
+    await upload_blob_from_file(blob, file.file, file_size, content_type)
+    
+    # In-process parse jobs read the file from the cache (which is size-bounded, unlike the job queue).
+    # External workers download it themselves, so skip the read.
+    if PARSE_QUEUE_MODE == "inprocess":
+        await file.seek(0)
+        file_content = await file.read()
+        # Warm the file cache so the first chat message doesn't download the file again
+        await run_io(file_cache.put, (storage_path, blob.generation), file_content)
+    
+    # Make the file publicly accessible (or use signed URLs for private access)
+    await run_io(blob.make_public)
+    
+    doc_ref = db.collection("syllabi").document()
+    syllabus_data = {
+        "user_id": user_id,
+        "name": file.filename,
+        "file_url": blob.public_url,
+        "file_type": file_extension,
+        "file_path": storage_path,
+        "file_size": file_size,
+        "file_sha256": file_sha256,
+        "items_version": 0,
+        "upload_date": datetime.now(),
+        "created_at": datetime.now()
+    }
+    parse_job = new_parse_job(doc_ref.id, syllabus_data, content_type)
+    return doc_ref, syllabus_data, parse_job
+
+
+# The 3 models use pydantic to validate data requests for each endpoint
+# FastAPI is used to automatically checks data requests and matches it to the right model
+
+
+
+# base model means json file, with the category field below
+class AuthRequest(BaseModel):
+   email: str
+   password: str
+
+
+
+
+class InventoryItem(BaseModel):
+   user_id: str
+   name: str
+   quantity: int
+   expiration_date: Optional[str] = None
+   category: Optional[str] = None
+
+
+
+
+class ChatRequest(BaseModel):
+   user_id: str
+   message: str
+   syllabus_id: Optional[str] = None
+
+
+class CalendarItem(BaseModel):
+   id: str
+   category: str
+   name: str
+   due_date: str
 
 
 class AddToCalendarRequest(BaseModel):
@@ -437,13 +2477,16 @@ def save_user_credentials(user_id: str, credentials):
             'token_uri': credentials.token_uri,
             'client_id': credentials.client_id,
             'client_secret': credentials.client_secret,
-            'scopes': credentials.scopes
+            'scopes': credentials.scopes,
+            'expiry': credentials.expiry.isoformat() if credentials.expiry else None
         }
         
         db.collection("user_tokens").document(user_id).set({
             "credentials": creds_dict,
             "updated_at": datetime.now()
         })
+        # A cached Calendar client may hold the old credentials
+        calendar_clients.invalidate(user_id)
         print(f"✅ Saved credentials for user {user_id}")
         return True
     except Exception as e:
@@ -455,23 +2498,124 @@ def credentials_from_dict(creds_dict):
     """Recreate credentials object from dictionary"""
     from google.oauth2.credentials import Credentials
     
+    # google-auth expects a naive UTC expiry
+    expiry = creds_dict.get('expiry')
     return Credentials(
         token=creds_dict.get('token'),
         refresh_token=creds_dict.get('refresh_token'),
         token_uri=creds_dict.get('token_uri'),
         client_id=creds_dict.get('client_id'),
         client_secret=creds_dict.get('client_secret'),
-        scopes=creds_dict.get('scopes')
+        scopes=creds_dict.get('scopes'),
+        expiry=datetime.fromisoformat(expiry) if expiry else None
     )
 
 
+# Per-user Google Calendar clients - live credentials and a built service are kept between requests,
+# and tokens close to expiry are refreshed in the background instead of on the request path
+CALENDAR_CLIENT_CACHE_SIZE = int(os.getenv("CALENDAR_CLIENT_CACHE_SIZE", "256"))
+CALENDAR_CLIENT_TTL_SECONDS = int(os.getenv("CALENDAR_CLIENT_TTL_SECONDS", "1800"))
+CALENDAR_REFRESH_AHEAD_SECONDS = 300
+CALENDAR_REFRESH_INTERVAL_SECONDS = 60
+
+calendar_clients = TTLCache(CALENDAR_CLIENT_CACHE_SIZE, CALENDAR_CLIENT_TTL_SECONDS)
+calendar_client_stats = {"builds": 0, "build_ms_total": 0.0, "background_refreshes": 0, "refresh_errors": 0}
+calendar_refresh_task = None
+
+
+@functools.lru_cache(maxsize=1)
+def calendar_discovery_document() -> Dict:
+    """The Calendar v3 discovery document bundled with googleapiclient, parsed once per process."""
+    return json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+
+
+def build_calendar_service(credentials):
+    """Build a Calendar service from the pre-parsed discovery document (no discovery fetch or parse)."""
+    return build_from_document(calendar_discovery_document(), credentials=credentials)
+
+
+async def get_calendar_client(user_id: str) -> tuple:
+    """
+    Return (credentials, calendar_service) for a user, from the client cache when possible.
+    Raises HTTPException 401 if the user hasn't connected Google Calendar.
+    """
+    client = calendar_clients.get(user_id)
+    if client is not None:
+        return client
+    
+    # Get user's OAuth credentials
+    creds_dict = await run_io(get_user_credentials, user_id)
+    if not creds_dict:
+        raise HTTPException(
+            status_code=401,
+            detail="Google Calendar not connected. Please connect your Google account first."
+        )
+    
+    # Convert to credentials object
+    credentials = credentials_from_dict(creds_dict)
+    
+    # Refresh token if expired
+    if credentials.expired and credentials.refresh_token:
+        print(f"🔄 Refreshing expired token for user {user_id}")
+        await run_io(credentials.refresh, Request())
+        # Save refreshed credentials
+        await run_io(save_user_credentials, user_id, credentials)
+    
+    # Build Google Calendar service with user's OAuth credentials
+    start = time.perf_counter()
+    calendar_service = await run_io(build_calendar_service, credentials)
+    build_ms = (time.perf_counter() - start) * 1000
+    calendar_client_stats["builds"] += 1
+    calendar_client_stats["build_ms_total"] += build_ms
+    print(f"🛠️  Built Calendar service for user {user_id} in {build_ms:.0f}ms")
+    
+    client = (credentials, calendar_service)
+    calendar_clients.set(user_id, client)
+    return client
+
+
+async def refresh_calendar_credentials():
+    """Background loop refreshing cached users' tokens that expire within CALENDAR_REFRESH_AHEAD_SECONDS."""
+    while True:
+        await asyncio.sleep(CALENDAR_REFRESH_INTERVAL_SECONDS)
+        refresh_before = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=CALENDAR_REFRESH_AHEAD_SECONDS)
+        for user_id, client in calendar_clients.items():
+            credentials = client[0]
+            if not credentials.refresh_token or credentials.expiry is None or credentials.expiry > refresh_before:
+                continue
+            try:
+                await run_io(credentials.refresh, Request())
+                await run_io(save_user_credentials, user_id, credentials)
+                # Saving invalidates the entry, but these are the credentials just saved
+                calendar_clients.set(user_id, client)
+                calendar_client_stats["background_refreshes"] += 1
+            except Exception as e:
+                # Drop the client so the next request loads and refreshes the credentials itself
+                print(f"⚠️  Background token refresh failed for user {user_id}: {e}")
+                calendar_client_stats["refresh_errors"] += 1
+                calendar_clients.invalidate(user_id)
+
+
+@app.on_event("startup")
+async def start_calendar_refresher():
+    global calendar_refresh_task
+    calendar_refresh_task = asyncio.create_task(refresh_calendar_credentials())
+
+
+@app.on_event("shutdown")
+async def stop_calendar_refresher():
+    if calendar_refresh_task is not None:
+        calendar_refresh_task.cancel()
+        await asyncio.gather(calendar_refresh_task, return_exceptions=True)
+
+
 # Auth Endpoints - Used for signing up and logging in users
 # The @app.post here responds to POST requests from "/auth/signup" in this case (getting data from the frontend)
 @app.post("/auth/signup")
 async def signup(req: AuthRequest):
    try:
        # Tries to create a new user for firbase auth
-       user = auth.create_user(email=req.email, password=req.password)
+       user = await run_io(auth.create_user, email=req.email, password=req.password)
        return {"user": {"uid": user.uid, "email": user.email}}
    except Exception as e:
        raise HTTPException(status_code=400, detail=str(e))
@@ -483,7 +2627,7 @@ async def signup(req: AuthRequest):
 async def login(req: AuthRequest):
    try:
        # Checks if user exists in firebase auth for now, but doesn't verify password(Probably ADD LATER )
-       user = auth.get_user_by_email(req.email)
+       user = await run_io(auth.get_user_by_email, req.email)
        return {"user": {"uid": user.uid, "email": user.email}}
    except Exception as e:
        # If DNE then the exception is raised and the user is informed of invalid credentials
@@ -535,7 +2679,7 @@ async def get_google_auth_url(user_id: str):
         )
         
         # Store state in Firestore temporarily
-        db.collection("oauth_states").document(state).set({
+        await run_io(db.collection("oauth_states").document(state).set, {
             "user_id": user_id,
             "created_at": datetime.now()
         })
@@ -563,7 +2707,7 @@ async def google_auth_callback(code: str, state: str):
     """
     try:
         # Get user_id from state
-        state_doc = db.collection("oauth_states").document(state).get()
+        state_doc = await fetch_doc(db.collection("oauth_states").document(state))
         if not state_doc.exists:
             raise HTTPException(
                 status_code=400,
@@ -573,7 +2717,7 @@ async def google_auth_callback(code: str, state: str):
         user_id = state_doc.to_dict().get("user_id")
         
         # Delete the state document
-        db.collection("oauth_states").document(state).delete()
+        await run_io(db.collection("oauth_states").document(state).delete)
         
         # Exchange code for credentials
         client_secrets_path = os.path.join(
@@ -606,11 +2750,11 @@ async def google_auth_callback(code: str, state: str):
                 state=state
             )
         
-        flow.fetch_token(code=code)
+        await run_io(flow.fetch_token, code=code)
         credentials = flow.credentials
         
         # Save credentials to Firestore
-        save_user_credentials(user_id, credentials)
+        await run_io(save_user_credentials, user_id, credentials)
         
         print(f"✅ OAuth completed for user {user_id}")
         
@@ -638,7 +2782,7 @@ async def check_google_auth_status(user_id: str):
     Check if user has connected their Google Calendar.
     """
     try:
-        creds_dict = get_user_credentials(user_id)
+        creds_dict = await run_io(get_user_credentials, user_id)
         
         if creds_dict:
             return {
@@ -683,68 +2827,36 @@ async def upload_syllabus(
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_message)
         
-        # Get file extension
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        
-        # Create unique filename to avoid collisions
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{file.filename}"
-        storage_path = f"syllabi/{user_id}/{safe_filename}"
-        
-        # Upload to Firebase Storage
-        blob = bucket.blob(storage_path)
-        
-        # Read file content
-        file_content = await file.read()
+        # Hash and size-check the upload in chunks without loading it into memory
+        file_size, file_sha256 = await scan_upload(file)
         
-        # Upload with proper content type
-        content_type_map = {
-            '.pdf': 'application/pdf',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.txt': 'text/plain'
-        }
-        blob.upload_from_string(
-            file_content,
-            content_type=content_type_map.get(file_extension, 'application/octet-stream')
+        doc_ref, syllabus_data, parse_job = await store_syllabus_upload(
+            file,
+            user_id,
+            file_size,
+            file_sha256
         )
         
-        # Make the file publicly accessible (or use signed URLs for private access)
-        blob.make_public()
-        file_url = blob.public_url
+        # Store metadata and the parse job together, so a syllabus never exists without its job
+        await run_io(commit_in_batches, [
+            ("set", doc_ref, syllabus_data),
+            ("set", db.collection("parse_jobs").document(doc_ref.id), parse_job),
+            syllabi_version_op(user_id)
+        ])
         
-        # Store metadata in Firestore
-        doc_ref = db.collection("syllabi").document()
-        syllabus_data = {
-            "user_id": user_id,
-            "name": file.filename,
-            "file_url": file_url,
-            "file_type": file_extension,
-            "file_path": storage_path,
-            "upload_date": datetime.now(),
-            "created_at": datetime.now()
-        }
-        doc_ref.set(syllabus_data)
+        syllabus_cache.invalidate(doc_ref.id)
         
-        # Automatically parse syllabus to extract items
-        print(f"🤖 Auto-parsing syllabus after upload...")
-        try:
-            parsed_items = await parse_syllabus_with_ai(
-                syllabus_id=doc_ref.id,
-                file_bytes=file_content,
-                mime_type=content_type_map.get(file_extension, 'application/octet-stream'),
-                syllabus_name=file.filename
-            )
-            print(f"✅ Auto-parsing complete: {len(parsed_items)} items extracted")
-        except Exception as parse_error:
-            print(f"⚠️  Auto-parsing failed (syllabus still uploaded): {str(parse_error)}")
-            # Don't fail the upload if parsing fails
+        # Parse in the background - the client can follow progress at /syllabi/{id}/parse-status
+        print(f"🤖 Queued parse job for syllabus {doc_ref.id}")
+        await submit_parse_job(doc_ref.id)
         
         return {
             "id": doc_ref.id,
             "message": "Syllabus uploaded successfully",
             "name": file.filename,
-            "file_url": file_url,
-            "file_type": file_extension
+            "file_url": syllabus_data["file_url"],
+            "file_type": syllabus_data["file_type"],
+            "parse_status": parse_job["status"]
         }
         
     except HTTPException:
@@ -757,28 +2869,199 @@ async def upload_syllabus(
         )
 
 
+@app.post("/syllabi/upload-batch")
+async def upload_syllabi_batch(
+    files: List[UploadFile] = File(...),
+    user_id: str = Form(...)
+):
+    """
+    Upload several syllabus files in one request.
+    Every file is validated before anything is stored, valid files are uploaded to Storage concurrently,
+    and all of their metadata is written in one Firestore batch. Returns a result for each file, in order.
+    """
+    try:
+        # Check if storage bucket is initialized
+        if bucket is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Firebase Storage is not enabled. Please enable Storage in Firebase Console."
+            )
+        
+        if len(files) > MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per upload"
+            )
+        
+        results = [{"name": file.filename, "status": "pending"} for file in files]
+        
+        # Validate everything up front so a bad file is reported without waiting on the others' uploads
+        scanned = {}
+        seen_names = set()
+        for index, file in enumerate(files):
+            is_valid, error_message = validate_syllabus_file(file)
+            if is_valid and file.filename in seen_names:
+                # Same name in one batch would map to the same Storage path
+                is_valid, error_message = False, "Duplicate file name in batch"
+            if is_valid:
+                try:
+                    scanned[index] = await scan_upload(file)
+                except HTTPException as e:
+                    is_valid, error_message = False, e.detail
+            if not is_valid:
+                results[index].update({"status": "rejected", "error": error_message})
+                continue
+            seen_names.add(file.filename)
+        
+        semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+        
+        async def upload_one(index: int):
+            async with semaphore:
+                file_size, file_sha256 = scanned[index]
+                return await store_syllabus_upload(files[index], user_id, file_size, file_sha256)
+        
+        indexes = list(scanned)
+        uploads = await asyncio.gather(*(upload_one(index) for index in indexes), return_exceptions=True)
+        
+        operations = []
+        stored = []
+        for index, upload in zip(indexes, uploads):
+            if isinstance(upload, Exception):
+                print(f"Upload error for {files[index].filename}: {str(upload)}")
+                results[index].update({"status": "failed", "error": f"Error uploading syllabus: {str(upload)}"})
+                continue
+            doc_ref, syllabus_data, parse_job = upload
+            operations.append(("set", doc_ref, syllabus_data))
+            operations.append(("set", db.collection("parse_jobs").document(doc_ref.id), parse_job))
+            stored.append((index, doc_ref, syllabus_data, parse_job))
+        
+        # All metadata and parse jobs in one commit (two writes per file, well under the batch limit)
+        if operations:
+            operations.append(syllabi_version_op(user_id))
+            await run_io(commit_in_batches, operations)
+        
+        for index, doc_ref, syllabus_data, parse_job in stored:
+            syllabus_cache.invalidate(doc_ref.id)
+            # Parse jobs go to the bounded worker pool like single uploads
+            await submit_parse_job(doc_ref.id)
+            results[index].update({
+                "id": doc_ref.id,
+                "status": "uploaded",
+                "file_url": syllabus_data["file_url"],
+                "file_type": syllabus_data["file_type"],
+                "parse_status": parse_job["status"]
+            })
+        
+        print(f"🤖 Batch upload stored {len(stored)} of {len(files)} syllabi and queued their parse jobs")
+        return {
+            "message": f"Uploaded {len(stored)} of {len(files)} syllabi",
+            "uploaded": len(stored),
+            "failed": len(files) - len(stored),
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Batch upload error: {str(e)}")  # Debug log
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error uploading syllabi: {str(e)}"
+        )
+
+
+# Syllabus list paging - pages are ordered newest first, which needs the (user_id, upload_date desc)
+# composite index in firestore.indexes.json
+SYLLABI_PAGE_SIZE = 50
+SYLLABI_MAX_PAGE_SIZE = 200
+SYLLABUS_LIST_FIELDS = {
+    "user_id", "name", "file_url", "file_type", "file_path",
+    "file_size", "file_sha256", "upload_date", "created_at"
+}
+# Backend bookkeeping on the syllabus document that isn't part of the list response (and doesn't
+# bump syllabi_version when it changes)
+INTERNAL_SYLLABUS_FIELDS = {"context_handle", "items_version", "items_updated_at"}
+
+
+def syllabus_to_response(doc) -> Dict:
+    """Syllabus snapshot as a JSON-ready dict with its ID."""
+    data = {key: value for key, value in doc.to_dict().items() if key not in INTERNAL_SYLLABUS_FIELDS}
+    data["id"] = doc.id
+    # Convert datetime to string for JSON serialization
+    if data.get("upload_date") is not None:
+        data["upload_date"] = data["upload_date"].isoformat()
+    if data.get("created_at") is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
 @app.get("/syllabi/{user_id}")
-async def get_syllabi(user_id: str):
+async def get_syllabi(
+    user_id: str,
+    request: FastAPIRequest,
+    response: Response,
+    limit: Optional[int] = None,
+    start_after: Optional[str] = None,
+    fields: Optional[str] = None
+):
     """
     Get all syllabi for a specific user.
     Returns list of syllabus metadata.
+    Pass limit (and start_after, the next_page_token from the previous page) to page through them
+    newest first; the response is then {"syllabi": [...], "next_page_token": ...}.
+    fields is an optional comma-separated list of metadata fields to return (id is always included).
+    Responses carry an ETag; a matching If-None-Match gets 304 after reading one document.
     """
     try:
-        syllabi = []
-        docs = db.collection("syllabi").where("user_id", "==", user_id).stream()
+        # The ETag covers the user's syllabi_version and the query parameters that shape the response
+        user_doc = await fetch_doc(db.collection("users").document(user_id))
+        syllabi_version = (user_doc.to_dict() or {}).get("syllabi_version", 0) if user_doc.exists else 0
+        params_hash = hashlib.sha256(f"{limit}|{start_after}|{fields}".encode("utf-8")).hexdigest()[:12]
+        not_modified = conditional_response("syllabi", request, response, f'W/"{user_id}-{syllabi_version}-{params_hash}"')
+        if not_modified is not None:
+            return not_modified
+        
+        query = db.collection("syllabi").where("user_id", "==", user_id)
         
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            # Convert datetime to string for JSON serialization
-            if "upload_date" in data:
-                data["upload_date"] = data["upload_date"].isoformat()
-            if "created_at" in data:
-                data["created_at"] = data["created_at"].isoformat()
-            syllabi.append(data)
+        if fields:
+            field_paths = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in field_paths if field not in SYLLABUS_LIST_FIELDS]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown field(s): {', '.join(unknown)}"
+                )
+            query = query.select(field_paths)
         
-        return syllabi
+        paged = limit is not None or start_after is not None
+        if not paged:
+            docs = await fetch_docs(query)
+            return [syllabus_to_response(doc) for doc in docs]
         
+        limit = limit if limit is not None else SYLLABI_PAGE_SIZE
+        if not 1 <= limit <= SYLLABI_MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"limit must be between 1 and {SYLLABI_MAX_PAGE_SIZE}"
+            )
+        
+        query = query.order_by("upload_date", direction=firestore.Query.DESCENDING)
+        if start_after:
+            cursor_doc = await fetch_doc(db.collection("syllabi").document(start_after))
+            if not cursor_doc.exists or cursor_doc.get("user_id") != user_id:
+                raise HTTPException(status_code=400, detail="Invalid start_after token")
+            query = query.start_after(cursor_doc)
+        
+        # One extra document tells us whether there is another page
+        docs = await fetch_docs(query.limit(limit + 1))
+        page = docs[:limit]
+        return {
+            "syllabi": [syllabus_to_response(doc) for doc in page],
+            "next_page_token": page[-1].id if len(docs) > limit else None
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching syllabi: {str(e)}")  # Debug log
         raise HTTPException(
@@ -787,32 +3070,54 @@ async def get_syllabi(user_id: str):
         )
 
 
+def item_to_response(doc) -> Dict:
+    """Syllabus item snapshot as a JSON-ready dict with its ID."""
+    data = doc.to_dict()
+    data["id"] = doc.id
+    # Convert datetime to string for JSON serialization
+    if data.get("created_at") is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    if data.get("due_at") is not None:
+        data["due_at"] = data["due_at"].isoformat()
+    return data
+
+
+async def fetch_syllabus_items(syllabus_id: str) -> List[Dict]:
+    """A syllabus's items as JSON-ready dicts with their IDs."""
+    items = []
+    docs = await fetch_docs(db.collection("syllabus_items").where("syllabus_id", "==", syllabus_id))
+    
+    for doc in docs:
+        items.append(item_to_response(doc))
+    return items
+
+
 @app.get("/syllabi/{syllabus_id}/items")
-async def get_syllabus_items(syllabus_id: str):
+async def get_syllabus_items(syllabus_id: str, request: FastAPIRequest, response: Response):
     """
     Get items (assignments, exams, etc.) from a syllabus.
     Returns parsed items from Firestore.
+    Responses carry an ETag from the syllabus's items_version, so pollers sending If-None-Match
+    get 304 after a single document read while the items are unchanged.
     """
     try:
-        items = []
-        docs = db.collection("syllabus_items").where("syllabus_id", "==", syllabus_id).stream()
+        # Read directly rather than through syllabus_cache - a stale version would hide new items
+        syllabus_doc = await fetch_doc(db.collection("syllabi").document(syllabus_id))
+        if syllabus_doc.exists:
+            items_version = (syllabus_doc.to_dict() or {}).get("items_version", 0)
+            not_modified = conditional_response("items", request, response, f'W/"{syllabus_id}-{items_version}"')
+            if not_modified is not None:
+                return not_modified
         
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            # Convert datetime to string for JSON serialization
-            if "created_at" in data:
-                data["created_at"] = data["created_at"].isoformat()
-            items.append(data)
+        items = await fetch_syllabus_items(syllabus_id)
         
         print(f"📋 Fetched {len(items)} items for syllabus {syllabus_id}")
         
         # If no items found, check if syllabus exists and trigger parsing
         if len(items) == 0:
             print(f"⚠️  No items found for syllabus {syllabus_id}, checking if parsing is needed...")
-            syllabus_doc = db.collection("syllabi").document(syllabus_id).get()
             if syllabus_doc.exists:
-                print(f"✨ Syllabus exists but no items - may need to re-parse or wait for parsing to complete")
+                print(f"✨ Syllabus exists but no items - may need to re-parse or wait for parsing to complete (see /syllabi/{syllabus_id}/parse-status)")
         
         return items
         
@@ -824,6 +3129,127 @@ async def get_syllabus_items(syllabus_id: str):
         )
 
 
+ITEMS_WAIT_DEFAULT_TIMEOUT = 25
+ITEMS_WAIT_MAX_TIMEOUT = 55  # Below the usual 60s proxy idle timeout
+items_wait_stats = {"waits": 0, "immediate": 0, "notified": 0, "timeouts": 0}
+
+
+@app.get("/syllabi/{syllabus_id}/items/wait")
+async def wait_for_syllabus_items(syllabus_id: str, timeout: float = ITEMS_WAIT_DEFAULT_TIMEOUT, since: Optional[int] = None):
+    """
+    Long poll for a syllabus's items, replacing client polling while a parse runs.
+    Without since, returns as soon as the syllabus has items or its parse job has finished.
+    With since (an items_version from an earlier response), returns once the items change again.
+    Returns {"changed", "items_version", "parse_status", "items"}; on timeout changed is false
+    and items is null, and the client just asks again.
+    """
+    try:
+        # FastAPI parses "nan" and "inf" as floats, and NaN would slip through min/max uncapped
+        if not math.isfinite(timeout):
+            raise HTTPException(
+                status_code=422,
+                detail="timeout must be a finite number of seconds"
+            )
+        timeout = min(max(timeout, 0), ITEMS_WAIT_MAX_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        items_wait_stats["waits"] += 1
+        
+        # Subscribe before the first check, so a commit between the check and the wait isn't missed
+        event = await items_notifier.subscribe(syllabus_id)
+        try:
+            woken = False
+            while True:
+                event.clear()
+                syllabus_doc, job_doc = await asyncio.gather(
+                    fetch_doc(db.collection("syllabi").document(syllabus_id)),
+                    fetch_doc(db.collection("parse_jobs").document(syllabus_id))
+                )
+                if not syllabus_doc.exists:
+                    raise HTTPException(
+                        status_code=404,
+                        detail="Syllabus not found"
+                    )
+                items_version = (syllabus_doc.to_dict() or {}).get("items_version", 0)
+                parse_status = job_doc.get("status") if job_doc.exists else None
+                
+                if since is not None:
+                    ready = items_version > since
+                else:
+                    ready = items_version > 0 or parse_status in ("succeeded", "failed")
+                if ready:
+                    items_wait_stats["notified" if woken else "immediate"] += 1
+                    return {
+                        "changed": True,
+                        "items_version": items_version,
+                        "parse_status": parse_status,
+                        "items": await fetch_syllabus_items(syllabus_id)
+                    }
+                
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    items_wait_stats["timeouts"] += 1
+                    return {
+                        "changed": False,
+                        "items_version": items_version,
+                        "parse_status": parse_status,
+                        "items": None
+                    }
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                    woken = True
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await items_notifier.unsubscribe(syllabus_id, event)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error waiting for syllabus items: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error waiting for syllabus items: {str(e)}"
+        )
+
+
+@app.get("/syllabi/{syllabus_id}/parse-status")
+async def get_parse_status(syllabus_id: str):
+    """
+    Get the status of the background parse job for a syllabus.
+    Status is one of queued, running, retrying, succeeded or failed.
+    """
+    try:
+        job_doc = await fetch_doc(db.collection("parse_jobs").document(syllabus_id))
+        
+        if not job_doc.exists:
+            raise HTTPException(
+                status_code=404,
+                detail="No parse job found for this syllabus"
+            )
+        
+        job = job_doc.to_dict()
+        return {
+            "syllabus_id": syllabus_id,
+            "status": job.get("status"),
+            "progress": job.get("progress", 0),
+            "attempts": job.get("attempts", 0),
+            "error": job.get("error"),
+            "items_count": job.get("items_count"),
+            "items_found": job.get("items_found"),
+            "updated_at": job["updated_at"].isoformat() if job.get("updated_at") else None
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching parse status: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching parse status: {str(e)}"
+        )
+
+
 @app.post("/syllabi/{syllabus_id}/reparse")
 async def reparse_syllabus(syllabus_id: str):
     """
@@ -832,38 +3258,28 @@ async def reparse_syllabus(syllabus_id: str):
     """
     try:
         # Get syllabus metadata
-        syllabus_doc = db.collection("syllabi").document(syllabus_id).get()
+        syllabus_data = await get_syllabus(syllabus_id)
         
-        if not syllabus_doc.exists:
+        if syllabus_data is None:
             raise HTTPException(
                 status_code=404,
                 detail="Syllabus not found"
             )
         
-        syllabus_data = syllabus_doc.to_dict()
         file_path = syllabus_data.get("file_path")
         syllabus_name = syllabus_data.get("name")
         file_type = syllabus_data.get("file_type", "")
         
-        if not file_path:
-            raise HTTPException(
-                status_code=404,
-                detail="Syllabus file path not found"
-            )
-        
-        # Get the file from Firebase Storage
-        blob = bucket.blob(file_path)
-        
-        if not blob.exists():
+        if not file_path:
             raise HTTPException(
                 status_code=404,
-                detail="Syllabus file not found in storage"
+                detail="Syllabus file path not found"
             )
         
         print(f"🔄 Re-parsing syllabus: {syllabus_name}")
         
-        # Download file
-        file_bytes = blob.download_as_bytes()
+        # Get the file from Firebase Storage (or the file cache)
+        file_bytes = await load_syllabus_file(file_path)
         
         # Determine MIME type
         mime_type_map = {
@@ -873,24 +3289,25 @@ async def reparse_syllabus(syllabus_id: str):
         }
         mime_type = mime_type_map.get(file_type, 'application/octet-stream')
         
-        # Delete existing items for this syllabus
-        existing_items = db.collection("syllabus_items").where("syllabus_id", "==", syllabus_id).stream()
-        for item_doc in existing_items:
-            item_doc.reference.delete()
-        print(f"🗑️  Deleted existing items for syllabus {syllabus_id}")
-        
-        # Parse the syllabus
+        # Parse the syllabus and swap the existing items for the new ones in batched commits
+        # (the old items stay in place if parsing fails)
+        timings = {}
         parsed_items = await parse_syllabus_with_ai(
             syllabus_id=syllabus_id,
             file_bytes=file_bytes,
             mime_type=mime_type,
-            syllabus_name=syllabus_name
+            syllabus_name=syllabus_name,
+            timings=timings,
+            replace_existing=True,
+            syllabus_data=syllabus_data
         )
+        syllabus_cache.invalidate(syllabus_id)
         
         return {
             "message": "Syllabus re-parsed successfully",
             "items_count": len(parsed_items),
-            "items": parsed_items
+            "items": parsed_items,
+            "timings": timings
         }
         
     except HTTPException:
@@ -905,6 +3322,94 @@ async def reparse_syllabus(syllabus_id: str):
         )
 
 
+# Deadlines Endpoint - Dated items across all of a user's syllabi in one range query on the
+# denormalized user_id and due_at fields (composite indexes in firestore.indexes.json)
+DEADLINES_DEFAULT_DAYS = 14
+DEADLINES_PAGE_SIZE = 50
+DEADLINES_MAX_PAGE_SIZE = 200
+
+
+@app.get("/users/{user_id}/deadlines")
+async def get_deadlines(
+    user_id: str,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    limit: int = DEADLINES_PAGE_SIZE,
+    start_after: Optional[str] = None
+):
+    """
+    Get a user's upcoming deadlines across all of their syllabi, soonest first.
+    from and to are YYYY-MM-DD dates, both inclusive (default: today through the next 14 days).
+    category optionally narrows to one category. Pages like GET /syllabi/{user_id}: pass the
+    returned next_page_token as start_after for the next page.
+    """
+    try:
+        start = parse_due_date(from_date) if from_date else datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if start is None:
+            raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD dates")
+        end = parse_due_date(to_date) if to_date else start + timedelta(days=DEADLINES_DEFAULT_DAYS)
+        if end is None:
+            raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD dates")
+        if end < start:
+            raise HTTPException(status_code=400, detail="to must not be before from")
+        if category is not None and category not in VALID_CATEGORIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}"
+            )
+        if not 1 <= limit <= DEADLINES_MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"limit must be between 1 and {DEADLINES_MAX_PAGE_SIZE}"
+            )
+        
+        query = db.collection("syllabus_items").where("user_id", "==", user_id)
+        if category is not None:
+            query = query.where("category", "==", category)
+        query = (
+            query.where("due_at", ">=", start)
+            .where("due_at", "<", end + timedelta(days=1))
+            .order_by("due_at")
+        )
+        if start_after:
+            cursor_doc = await fetch_doc(db.collection("syllabus_items").document(start_after))
+            if not cursor_doc.exists or cursor_doc.get("user_id") != user_id:
+                raise HTTPException(status_code=400, detail="Invalid start_after token")
+            query = query.start_after(cursor_doc)
+        
+        # One extra document tells us whether there is another page
+        docs = await fetch_docs(query.limit(limit + 1))
+        page = docs[:limit]
+        deadlines = [item_to_response(doc) for doc in page]
+        
+        # Attach syllabus names, one read per distinct syllabus (through the metadata cache)
+        syllabus_ids = list({item["syllabus_id"] for item in deadlines})
+        syllabi = await asyncio.gather(*(get_syllabus(syllabus_id) for syllabus_id in syllabus_ids))
+        names = {
+            syllabus_id: syllabus_data.get("name") if syllabus_data else None
+            for syllabus_id, syllabus_data in zip(syllabus_ids, syllabi)
+        }
+        for item in deadlines:
+            item["syllabus_name"] = names.get(item["syllabus_id"])
+        
+        return {
+            "deadlines": deadlines,
+            "next_page_token": page[-1].id if len(docs) > limit else None
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching deadlines: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching deadlines: {str(e)}"
+        )
+
+
 # Inventory Endpoints - Loads all the inventory items tied to the user
 
 
@@ -915,7 +3420,7 @@ async def get_inventory(user_id: str):
    # The items the user has in their inventory is stored locally in a list, and populated from the firestore database so we can fetch it for use at later times
    items = []
    # Getting the data from firestore where the user_id matches the user and putting it (streaming) in the items list
-   docs = db.collection("inventory").where("user_id", "==", user_id).stream()
+   docs = await fetch_docs(db.collection("inventory").where("user_id", "==", user_id))
    for doc in docs:
        data = doc.to_dict()
        data["id"] = doc.id
@@ -934,7 +3439,7 @@ async def add_inventory(item: InventoryItem):
 
    doc_ref = db.collection("inventory").document()
    # Each inventory item is a dictionary with these fields
-   doc_ref.set({
+   await run_io(doc_ref.set, {
        "user_id": item.user_id,
        "name": item.name,
        "quantity": item.quantity,
@@ -951,7 +3456,7 @@ async def add_inventory(item: InventoryItem):
 async def delete_inventory(req: DeleteItemRequest):
    try:
        # Permanently deletes the inventory item from Firestore using its document ID
-       db.collection("inventory").document(req.item_id).delete()
+       await run_io(db.collection("inventory").document(req.item_id).delete)
        return {"message": "Item deleted successfully"}
    except Exception as e:
        raise HTTPException(
@@ -977,14 +3482,14 @@ async def update_category(item_id: str, req: UpdateCategoryRequest):
 
        # Update the document
        doc_ref = db.collection("inventory").document(item_id)
-       doc = doc_ref.get()
+       doc = await fetch_doc(doc_ref)
 
 
        if not doc.exists:
            raise HTTPException(status_code=404, detail="Item not found")
 
 
-       doc_ref.update({"category": req.category})
+       await run_io(doc_ref.update, {"category": req.category})
        return {"message": "Category updated successfully", "category": req.category}
    except HTTPException:
        raise
@@ -995,82 +3500,66 @@ async def update_category(item_id: str, req: UpdateCategoryRequest):
 
 
 
-@app.post("/chat")
-async def chat(req: ChatRequest):
+async def prepare_chat(req: ChatRequest) -> tuple:
     """
-    Chat with AI assistant about the selected syllabus.
-    Uses Gemini's native file understanding (supports PDF, DOCX, TXT).
+    Validate a chat request and build everything needed to call the model.
+    Returns (syllabus_data, mime_type, text_prompt, load_file_bytes).
+    Raises HTTPException for a missing, unknown or foreign syllabus.
     """
-    try:
-        # Check if syllabus_id is provided
-        if not req.syllabus_id:
-            raise HTTPException(
-                status_code=400,
-                detail="Please select a syllabus to chat about"
-            )
-        
-        # Get syllabus metadata from Firestore
-        syllabus_doc = db.collection("syllabi").document(req.syllabus_id).get()
-        
-        if not syllabus_doc.exists:
-            raise HTTPException(
-                status_code=404,
-                detail="Syllabus not found"
-            )
-        
-        syllabus_data = syllabus_doc.to_dict()
-        
-        # Verify the syllabus belongs to the user
-        if syllabus_data.get("user_id") != req.user_id:
-            raise HTTPException(
-                status_code=403,
-                detail="Access denied to this syllabus"
-            )
-        
-        # Get file information
-        file_path = syllabus_data.get("file_path")
-        file_url = syllabus_data.get("file_url")
-        syllabus_name = syllabus_data.get("name", "syllabus")
-        file_type = syllabus_data.get("file_type", "")
-        
-        if not file_path or not file_url:
-            raise HTTPException(
-                status_code=404,
-                detail="Syllabus file information not found"
-            )
-        
-        # Get the blob
-        blob = bucket.blob(file_path)
-        
-        if not blob.exists():
-            raise HTTPException(
-                status_code=404,
-                detail="Syllabus file not found in storage"
-            )
-        
-        print(f"💬 Chat request for syllabus: {syllabus_name}")
-        print(f"   File type: {file_type}")
-        print(f"   Question: {req.message[:100]}...")
-        
-        # Download file as bytes
-        file_bytes = blob.download_as_bytes()
-        
-        # Determine MIME type
-        mime_type_map = {
-            '.pdf': 'application/pdf',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.txt': 'text/plain'
-        }
-        mime_type = mime_type_map.get(file_type, 'application/octet-stream')
-        
-        # Create Part object for Gemini (native file understanding)
-        file_part = Part.from_data(
-            data=file_bytes,
-            mime_type=mime_type
+    # Check if syllabus_id is provided
+    if not req.syllabus_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Please select a syllabus to chat about"
         )
-        
-        # Build prompt optimized for Gemini 2.5 Flash with file context
-        text_prompt = f"""You are Syllabus Buddy, an intelligent academic assistant helping students understand their course syllabus.
+    
+    # Get syllabus metadata (cached across the messages of a chat session)
+    syllabus_data = await get_syllabus(req.syllabus_id)
+    
+    if syllabus_data is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Syllabus not found"
+        )
+    
+    # Verify the syllabus belongs to the user
+    if syllabus_data.get("user_id") != req.user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied to this syllabus"
+        )
+    
+    # Get file information
+    file_path = syllabus_data.get("file_path")
+    file_url = syllabus_data.get("file_url")
+    syllabus_name = syllabus_data.get("name", "syllabus")
+    file_type = syllabus_data.get("file_type", "")
+    
+    if not file_path or not file_url:
+        raise HTTPException(
+            status_code=404,
+            detail="Syllabus file information not found"
+        )
+    
+    print(f"💬 Chat request for syllabus: {syllabus_name}")
+    print(f"   File type: {file_type}")
+    print(f"   Question: {req.message[:100]}...")
+    
+    # Determine MIME type
+    mime_type_map = {
+        '.pdf': 'application/pdf',
+        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        '.txt': 'text/plain'
+    }
+    mime_type = mime_type_map.get(file_type, 'application/octet-stream')
+    
+    # File bytes are only needed when there is no live context handle for this syllabus
+    # (they come from the file cache, downloading from Storage only on a miss)
+    async def load_file_bytes():
+        return await load_syllabus_file(file_path)
+    
+    # Build prompt optimized for Gemini 2.5 Flash with file context
+    text_prompt = f"""You are Syllabus Buddy, an intelligent academic assistant helping students understand their course syllabus.
 
 The student has uploaded a syllabus document named "{syllabus_name}". The document is attached to this conversation.
 
@@ -1092,19 +3581,31 @@ FORMATTING REQUIREMENTS:
 - Avoid using **, *, #, or other markdown formatting
 
 Provide your answer:"""
+    
+    return syllabus_data, mime_type, text_prompt, load_file_bytes
 
-        # Call Vertex AI with both the file and the prompt
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    """
+    Chat with AI assistant about the selected syllabus.
+    Uses Gemini's native file understanding (supports PDF, DOCX, TXT).
+    """
+    try:
+        syllabus_data, mime_type, text_prompt, load_file_bytes = await prepare_chat(req)
+        
+        # Call Vertex AI with the syllabus context (cached handle or inline file) and the prompt
         print(f"📤 Sending to Gemini with file attachment...")
-        response = model.generate_content([file_part, text_prompt])
+        response = await generate_with_syllabus_context(
+            req.syllabus_id,
+            syllabus_data,
+            mime_type,
+            [text_prompt],
+            load_file_bytes
+        )
 
         # Extract response text
-        if hasattr(response, 'text'):
-            response_text = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            response_text = response.candidates[0].content.parts[0].text
-        else:
-            print(f"⚠️  Unexpected response format: {response}")
-            response_text = str(response)
+        response_text = extract_response_text(response)
 
         print(f"✅ Response generated successfully")
         
@@ -1123,139 +3624,583 @@ Provide your answer:"""
         )
 
 
+def format_sse(data: Dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message with a JSON payload."""
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
+
+
+chat_stream_stats = {"streams": 0, "completed": 0, "cancelled": 0, "errors": 0, "first_chunks": 0, "ttfb_ms_total": 0.0}
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: FastAPIRequest):
+    """
+    Streaming version of /chat.
+    Sends the answer as Server-Sent Events while Gemini generates it:
+    "data: {"text": ...}" chunks, then an "event: done" message (or "event: error").
+    Generation stops when the client disconnects.
+    """
+    # Validation errors are raised before streaming starts, so they still return normal HTTP errors
+    syllabus_data, mime_type, text_prompt, load_file_bytes = await prepare_chat(req)
+    
+    async def event_stream():
+        started = time.perf_counter()
+        first_chunk = True
+        chat_stream_stats["streams"] += 1
+        
+        try:
+            print(f"📤 Streaming from Gemini...")
+            response_stream = await generate_with_syllabus_context(
+                req.syllabus_id,
+                syllabus_data,
+                mime_type,
+                [text_prompt],
+                load_file_bytes,
+                stream=True
+            )
+            
+            # aclosing stops the generation thread as soon as we leave the loop
+            async with contextlib.aclosing(iterate_stream(response_stream)) as chunks:
+                async for chunk in chunks:
+                    if await request.is_disconnected():
+                        chat_stream_stats["cancelled"] += 1
+                        print(f"🛑 Chat stream cancelled by client")
+                        return
+                    
+                    text = chunk_text(chunk)
+                    if not text:
+                        continue
+                    
+                    if first_chunk:
+                        first_chunk = False
+                        ttfb_ms = (time.perf_counter() - started) * 1000
+                        chat_stream_stats["first_chunks"] += 1
+                        chat_stream_stats["ttfb_ms_total"] += ttfb_ms
+                        print(f"⚡ First chunk after {ttfb_ms:.0f}ms")
+                    yield format_sse({"text": text})
+            
+            chat_stream_stats["completed"] += 1
+            print(f"✅ Stream completed")
+            yield format_sse({}, event="done")
+            
+        except asyncio.CancelledError:
+            # Starlette cancels the response when the client goes away mid-write
+            chat_stream_stats["cancelled"] += 1
+            print(f"🛑 Chat stream cancelled by client")
+            raise
+        except Exception as e:
+            chat_stream_stats["errors"] += 1
+            print(f"❌ Error in chat stream: {str(e)}")
+            yield format_sse({"detail": f"Chat error: {str(e)}"}, event="error")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Stop proxies from buffering the stream
+        }
+    )
+
+
+# Google Calendar batching - events are inserted through batch requests instead of one round trip each
+CALENDAR_BATCH_SIZE = 50  # The Calendar API allows at most 50 calls per batch request
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "8"))
+
+
+def calendar_event_summary(item: CalendarItem) -> str:
+    return f"{item.category}: {item.name}"
+
+
+def build_calendar_event(item: CalendarItem, syllabus_name: str) -> Dict:
+    """Calendar event body for a syllabus item (an all-day event on its due date)."""
+    return {
+        'summary': calendar_event_summary(item),
+        'description': f"From syllabus: {syllabus_name}\nCategory: {item.category}",
+        'start': {
+            'date': item.due_date,  # All-day event
+            'timeZone': 'America/New_York',
+        },
+        'end': {
+            'date': item.due_date,  # All-day event
+            'timeZone': 'America/New_York',
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 24 * 60},  # 1 day before
+                {'method': 'popup', 'minutes': 60},  # 1 hour before
+            ],
+        },
+    }
+
+
+def authorized_http(credentials):
+    """
+    A new authorized HTTP client. httplib2 connections aren't thread-safe,
+    so every request or batch running on the IO pool gets its own.
+    Without credentials (a fake service in tests) requests use the service's own HTTP client.
+    """
+    if credentials is None:
+        return None
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+
+def execute_calendar_batch(calendar_service, credentials, requests: List[tuple]) -> Dict[str, tuple]:
+    """
+    Send (key, request) pairs as one Calendar API batch request.
+    Returns {key: (response, exception)}; a failed call has response None.
+    """
+    results = {}
+    
+    def callback(request_id, response, exception):
+        results[request_id] = (response, exception)
+    
+    batch = calendar_service.new_batch_http_request(callback=callback)
+    for key, request in requests:
+        batch.add(request, request_id=key)
+    batch.execute(http=authorized_http(credentials))
+    return results
+
+
+def execute_calendar_request(request, credentials) -> tuple:
+    """Execute one Calendar API request on its own connection. Returns (response, exception)."""
+    try:
+        return request.execute(http=authorized_http(credentials)), None
+    except Exception as e:
+        return None, e
+
+
+async def run_calendar_requests(calendar_service, credentials, requests: List[tuple]) -> Dict[str, tuple]:
+    """
+    Execute (key, request) pairs against the Calendar API, CALENDAR_BATCH_SIZE per batch request.
+    If a batch request itself fails, its calls are retried individually with at most
+    CALENDAR_MAX_CONCURRENCY in flight. Returns {key: (response, exception)} for every key.
+    """
+    semaphore = asyncio.Semaphore(CALENDAR_MAX_CONCURRENCY)
+    
+    async def run_single(key, request):
+        async with semaphore:
+            return key, await run_io(execute_calendar_request, request, credentials)
+    
+    async def run_batch(batch_requests):
+        try:
+            return await run_io(execute_calendar_batch, calendar_service, credentials, batch_requests)
+        except Exception as e:
+            print(f"⚠️  Calendar batch request failed, sending {len(batch_requests)} calls individually: {e}")
+            return dict(await asyncio.gather(*(run_single(key, request) for key, request in batch_requests)))
+    
+    batches = [requests[i:i + CALENDAR_BATCH_SIZE] for i in range(0, len(requests), CALENDAR_BATCH_SIZE)]
+    results = {}
+    for batch_results in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+        results.update(batch_results)
+    return results
+
+
+# Calendar sync - calendar_events stores which Google event each syllabus item was added as
+# (doc ID f"{user_id}_{item_id}"), so adding twice or syncing after a reparse only sends the changes
+def calendar_name_key(name: str) -> str:
+    """Normalized item name for matching items across reparses (which give every item a new ID)."""
+    return " ".join(name.lower().split())
+
+
+def calendar_event_doc_id(user_id: str, item_id: str) -> str:
+    return f"{user_id}_{item_id}"
+
+
+def is_event_gone(error) -> bool:
+    """True if a Calendar API error means the event no longer exists (e.g. the user deleted it)."""
+    return isinstance(error, HttpError) and error.resp.status in (404, 410)
+
+
+def plan_calendar_sync(
+    items: List[CalendarItem],
+    mappings: List[Dict],
+    live_item_ids: set,
+    remove_missing: bool = False
+) -> Dict[str, list]:
+    """
+    Diff the items that should be on the calendar against their stored event mappings.
+    An item matches its mapping by item ID, or by normalized name when the mapped item no longer
+    exists. With remove_missing=True, mappings that no item matched are marked for deletion.
+    Returns {"insert": [item], "patch": [(item, mapping)], "unchanged": [(item, mapping)], "delete": [mapping]}.
+    """
+    by_item_id = {mapping["item_id"]: mapping for mapping in mappings}
+    orphans_by_name = {}
+    for mapping in mappings:
+        if mapping["item_id"] not in live_item_ids:
+            orphans_by_name.setdefault(mapping.get("name_key"), []).append(mapping)
+    
+    plan = {"insert": [], "patch": [], "unchanged": [], "delete": []}
+    matched = set()
+    for item in items:
+        mapping = by_item_id.get(item.id)
+        if mapping is None or mapping["doc_id"] in matched:
+            candidates = orphans_by_name.get(calendar_name_key(item.name), [])
+            mapping = next((m for m in candidates if m["doc_id"] not in matched), None)
+        if mapping is None:
+            plan["insert"].append(item)
+            continue
+        
+        matched.add(mapping["doc_id"])
+        if mapping.get("summary") == calendar_event_summary(item) and mapping.get("date") == item.due_date:
+            plan["unchanged"].append((item, mapping))
+        else:
+            plan["patch"].append((item, mapping))
+    
+    if remove_missing:
+        plan["delete"] = [mapping for mapping in mappings if mapping["doc_id"] not in matched]
+    return plan
+
+
+async def sync_calendar_events(
+    calendar_service,
+    credentials,
+    user_id: str,
+    syllabus_id: str,
+    syllabus_name: str,
+    items: List[CalendarItem],
+    remove_missing: bool = False
+) -> Dict[str, list]:
+    """
+    Bring a user's calendar in line with a syllabus's items: insert new items, patch items whose
+    name or date changed, and (with remove_missing=True) delete events for items that are gone.
+    calendar_service only needs the googleapiclient events()/new_batch_http_request interface,
+    so a fake service can stand in for Google (pass credentials=None with it).
+    Returns per-item results under "created", "updated", "unchanged", "deleted" and "failed".
+    """
+    mapping_docs, item_docs = await asyncio.gather(
+        fetch_docs(
+            db.collection("calendar_events")
+            .where("user_id", "==", user_id)
+            .where("syllabus_id", "==", syllabus_id)
+        ),
+        fetch_docs(db.collection("syllabus_items").where("syllabus_id", "==", syllabus_id))
+    )
+    mappings = [{**doc.to_dict(), "doc_id": doc.id} for doc in mapping_docs]
+    plan = plan_calendar_sync(items, mappings, {doc.id for doc in item_docs}, remove_missing)
+    print(
+        f"🔁 Calendar sync plan: {len(plan['insert'])} insert, {len(plan['patch'])} patch, "
+        f"{len(plan['unchanged'])} unchanged, {len(plan['delete'])} delete"
+    )
+    
+    events = calendar_service.events()
+    
+    def insert_request(item):
+        return events.insert(calendarId='primary', body=build_calendar_event(item, syllabus_name))
+    
+    calendar_requests = [(f"insert:{item.id}", insert_request(item)) for item in plan["insert"]]
+    calendar_requests += [
+        (
+            f"patch:{item.id}",
+            events.patch(
+                calendarId='primary',
+                eventId=mapping["event_id"],
+                body=build_calendar_event(item, syllabus_name)
+            )
+        )
+        for item, mapping in plan["patch"]
+    ]
+    calendar_requests += [
+        (f"delete:{mapping['doc_id']}", events.delete(calendarId='primary', eventId=mapping["event_id"]))
+        for mapping in plan["delete"]
+    ]
+    results = {}
+    if calendar_requests:
+        results = await run_calendar_requests(calendar_service, credentials, calendar_requests)
+    
+    # Events the user deleted by hand can't be patched, so they are inserted again
+    recreate = [
+        (item, mapping) for item, mapping in plan["patch"]
+        if is_event_gone(results[f"patch:{item.id}"][1])
+    ]
+    if recreate:
+        results.update(await run_calendar_requests(
+            calendar_service,
+            credentials,
+            [(f"insert:{item.id}", insert_request(item)) for item, _ in recreate]
+        ))
+    
+    outcome = {"created": [], "updated": [], "unchanged": [], "deleted": [], "failed": []}
+    operations = []
+    
+    def save_mapping(item, event_id: str, previous: Optional[Dict] = None):
+        doc_id = calendar_event_doc_id(user_id, item.id)
+        operations.append(("set", db.collection("calendar_events").document(doc_id), {
+            "user_id": user_id,
+            "syllabus_id": syllabus_id,
+            "item_id": item.id,
+            "event_id": event_id,
+            "name": item.name,
+            "name_key": calendar_name_key(item.name),
+            "summary": calendar_event_summary(item),
+            "date": item.due_date,
+            "updated_at": datetime.now()
+        }))
+        if previous is not None and previous["doc_id"] != doc_id:
+            # Matched by name after a reparse - the mapping moves to the new item ID
+            operations.append(("delete", db.collection("calendar_events").document(previous["doc_id"]), None))
+    
+    def record_event(kind: str, item, event: Dict, previous: Optional[Dict] = None):
+        save_mapping(item, event.get('id'), previous)
+        outcome[kind].append({
+            "item": item.name,
+            "event_id": event.get('id'),
+            "event_link": event.get('htmlLink')
+        })
+        print(f"✅ {kind.capitalize()} event: {item.name} on {item.due_date}")
+    
+    def record_failure(name: str, error):
+        print(f"❌ Failed to sync event for {name}: {str(error)}")
+        outcome["failed"].append({"item": name, "reason": str(error)})
+    
+    for item in plan["insert"]:
+        event, error = results[f"insert:{item.id}"]
+        if error is not None:
+            record_failure(item.name, error)
+        else:
+            record_event("created", item, event)
+    
+    for item, mapping in plan["patch"]:
+        event, error = results[f"patch:{item.id}"]
+        if is_event_gone(error):
+            event, error = results[f"insert:{item.id}"]
+            kind = "created"
+        else:
+            kind = "updated"
+        if error is not None:
+            record_failure(item.name, error)
+        else:
+            record_event(kind, item, event, mapping)
+    
+    for item, mapping in plan["unchanged"]:
+        if mapping["item_id"] != item.id:
+            save_mapping(item, mapping["event_id"], mapping)
+        outcome["unchanged"].append({"item": item.name, "event_id": mapping["event_id"]})
+    
+    for mapping in plan["delete"]:
+        _, error = results[f"delete:{mapping['doc_id']}"]
+        if error is not None and not is_event_gone(error):
+            record_failure(mapping.get("name", mapping["item_id"]), error)
+            continue
+        operations.append(("delete", db.collection("calendar_events").document(mapping["doc_id"]), None))
+        outcome["deleted"].append({"item": mapping.get("name"), "event_id": mapping["event_id"]})
+    
+    if operations:
+        await run_io(commit_in_batches, operations)
+    return outcome
+
+
+async def load_calendar_context(user_id: str, syllabus_id: str) -> tuple:
+    """
+    Load what a calendar endpoint needs: the user's OAuth credentials, a Calendar service built
+    with them, and the syllabus name (checking the syllabus belongs to the user).
+    Returns (credentials, calendar_service, syllabus_name).
+    """
+    credentials, calendar_service = await get_calendar_client(user_id)
+    
+    # Get syllabus information
+    syllabus_data = await get_syllabus(syllabus_id)
+    if syllabus_data is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Syllabus not found"
+        )
+    
+    # Verify syllabus belongs to user
+    if syllabus_data.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied to this syllabus"
+        )
+    
+    return credentials, calendar_service, syllabus_data.get("name", "Syllabus")
+
+
+def calendar_sync_summary(total_attempted: int, outcome: Dict[str, list], skipped: List[Dict]) -> Dict:
+    """Response body shared by /calendar/add and /calendar/sync."""
+    failed_events = skipped + outcome["failed"]
+    return {
+        "message": f"Successfully added {len(outcome['created'])} events to Google Calendar",
+        "created_events": outcome["created"],
+        "updated_events": outcome["updated"],
+        "unchanged_events": outcome["unchanged"],
+        "deleted_events": outcome["deleted"],
+        "failed_events": failed_events,
+        "total_attempted": total_attempted,
+        "total_created": len(outcome["created"]),
+        "total_updated": len(outcome["updated"]),
+        "total_unchanged": len(outcome["unchanged"]),
+        "total_deleted": len(outcome["deleted"]),
+        "total_failed": len(failed_events)
+    }
+
+
+def split_undated_items(items: List[CalendarItem]) -> tuple:
+    """Separate items that can go on the calendar from ones without a due date. Returns (dated_items, skipped)."""
+    dated_items = []
+    skipped = []
+    seen_ids = set()
+    for item in items:
+        # Parse the date
+        if item.due_date == "TBD" or not item.due_date:
+            print(f"⚠️  Skipping item with no date: {item.name}")
+            skipped.append({
+                "item": item.name,
+                "reason": "No due date specified"
+            })
+            continue
+        if item.id in seen_ids:
+            continue
+        seen_ids.add(item.id)
+        dated_items.append(item)
+    return dated_items, skipped
+
+
 # Google Calendar Endpoint
 @app.post("/calendar/add")
 async def add_to_calendar(req: AddToCalendarRequest):
     """
     Add selected syllabus items to user's personal Google Calendar using OAuth.
-    Creates calendar events for each selected item.
+    Creates calendar events for new items, updates events whose item changed since it was added,
+    and leaves items that are already on the calendar alone, so adding twice doesn't duplicate events.
     """
     try:
         print(f"📅 Adding {len(req.items)} items to Google Calendar for user {req.user_id}")
         
-        # Get user's OAuth credentials
-        creds_dict = get_user_credentials(req.user_id)
-        if not creds_dict:
-            raise HTTPException(
-                status_code=401,
-                detail="Google Calendar not connected. Please connect your Google account first."
-            )
-        
-        # Convert to credentials object
-        credentials = credentials_from_dict(creds_dict)
-        
-        # Refresh token if expired
-        if credentials.expired and credentials.refresh_token:
-            print(f"🔄 Refreshing expired token for user {req.user_id}")
-            credentials.refresh(Request())
-            # Save refreshed credentials
-            save_user_credentials(req.user_id, credentials)
-        
-        # Get syllabus information
-        syllabus_doc = db.collection("syllabi").document(req.syllabus_id).get()
-        if not syllabus_doc.exists:
-            raise HTTPException(
-                status_code=404,
-                detail="Syllabus not found"
-            )
+        credentials, calendar_service, syllabus_name = await load_calendar_context(req.user_id, req.syllabus_id)
         
-        syllabus_data = syllabus_doc.to_dict()
-        syllabus_name = syllabus_data.get("name", "Syllabus")
+        dated_items, skipped = split_undated_items(req.items)
+        outcome = await sync_calendar_events(
+            calendar_service,
+            credentials,
+            req.user_id,
+            req.syllabus_id,
+            syllabus_name,
+            dated_items
+        )
         
-        # Verify syllabus belongs to user
-        if syllabus_data.get("user_id") != req.user_id:
-            raise HTTPException(
-                status_code=403,
-                detail="Access denied to this syllabus"
-            )
+        # Return summary
+        return calendar_sync_summary(len(req.items), outcome, skipped)
         
-        # Build Google Calendar service with user's OAuth credentials
-        calendar_service = build('calendar', 'v3', credentials=credentials)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error adding to calendar: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error adding to calendar: {str(e)}"
+        )
+
+
+@app.post("/calendar/sync")
+async def sync_calendar(req: AddToCalendarRequest):
+    """
+    Make the user's calendar match exactly the given items of a syllabus.
+    Like /calendar/add, but events for items not in the request (removed by a reparse, deselected,
+    or now without a date) are deleted too.
+    """
+    try:
+        print(f"🔁 Syncing {len(req.items)} items to Google Calendar for user {req.user_id}")
         
-        # Create events for each selected item
-        created_events = []
-        failed_events = []
+        credentials, calendar_service, syllabus_name = await load_calendar_context(req.user_id, req.syllabus_id)
         
-        for item in req.items:
-            try:
-                # Parse the date
-                if item.due_date == "TBD" or not item.due_date:
-                    print(f"⚠️  Skipping item with no date: {item.name}")
-                    failed_events.append({
-                        "item": item.name,
-                        "reason": "No due date specified"
-                    })
-                    continue
-                
-                # Create event
-                event = {
-                    'summary': f"{item.category}: {item.name}",
-                    'description': f"From syllabus: {syllabus_name}\nCategory: {item.category}",
-                    'start': {
-                        'date': item.due_date,  # All-day event
-                        'timeZone': 'America/New_York',
-                    },
-                    'end': {
-                        'date': item.due_date,  # All-day event
-                        'timeZone': 'America/New_York',
-                    },
-                    'reminders': {
-                        'useDefault': False,
-                        'overrides': [
-                            {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                            {'method': 'popup', 'minutes': 60},  # 1 hour before
-                        ],
-                    },
-                }
-                
-                # Insert event into primary calendar
-                created_event = calendar_service.events().insert(
-                    calendarId='primary',
-                    body=event
-                ).execute()
-                
-                created_events.append({
-                    "item": item.name,
-                    "event_id": created_event.get('id'),
-                    "event_link": created_event.get('htmlLink')
-                })
-                print(f"✅ Created event: {item.name} on {item.due_date}")
-                
-            except HttpError as e:
-                print(f"❌ Failed to create event for {item.name}: {str(e)}")
-                failed_events.append({
-                    "item": item.name,
-                    "reason": str(e)
-                })
-            except Exception as e:
-                print(f"❌ Unexpected error for {item.name}: {str(e)}")
-                failed_events.append({
-                    "item": item.name,
-                    "reason": str(e)
-                })
+        dated_items, skipped = split_undated_items(req.items)
+        outcome = await sync_calendar_events(
+            calendar_service,
+            credentials,
+            req.user_id,
+            req.syllabus_id,
+            syllabus_name,
+            dated_items,
+            remove_missing=True
+        )
         
-        # Return summary
-        return {
-            "message": f"Successfully added {len(created_events)} events to Google Calendar",
-            "created_events": created_events,
-            "failed_events": failed_events,
-            "total_attempted": len(req.items),
-            "total_created": len(created_events),
-            "total_failed": len(failed_events)
-        }
+        return calendar_sync_summary(len(req.items), outcome, skipped)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error adding to calendar: {str(e)}")
+        print(f"❌ Error syncing calendar: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(
             status_code=500,
-            detail=f"Error adding to calendar: {str(e)}"
+            detail=f"Error syncing calendar: {str(e)}"
         )
 
 
+# Metrics Endpoint - Exposes cache and streaming counters for monitoring
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Return counters for the backend's caches and chat streaming.
+    """
+    return {
+        "parse_cache": {
+            "backend": PARSE_CACHE_BACKEND,
+            **parse_cache_stats
+        },
+        "file_cache": file_cache.snapshot(),
+        "syllabus_cache": {
+            **syllabus_cache.snapshot(),
+            # Every hit is a syllabi document read that didn't go to Firestore
+            "firestore_reads_saved": syllabus_cache.stats["hits"]
+        },
+        "context_handles": {
+            "enabled": CONTEXT_CACHE_ENABLED,
+            **context_handle_stats
+        },
+        "conditional_get": conditional_get_stats,
+        "item_extraction": item_extraction_stats,
+        "items_wait": {
+            "notifier": ITEMS_NOTIFIER,
+            "waiting": items_notifier.waiting(),
+            **items_wait_stats
+        },
+        "parse_output": {
+            "mode": PARSE_OUTPUT_MODE,
+            **{
+                mode: {
+                    **stats,
+                    "failure_rate": stats["failures"] / stats["calls"] if stats["calls"] else None,
+                    "avg_model_ms": stats["model_ms_total"] / stats["calls"] if stats["calls"] else None
+                }
+                for mode, stats in parse_output_stats.items()
+            }
+        },
+        "calendar_clients": {
+            **calendar_clients.snapshot(),
+            **calendar_client_stats,
+            "avg_build_ms": (
+                calendar_client_stats["build_ms_total"] / calendar_client_stats["builds"]
+                if calendar_client_stats["builds"] else None
+            )
+        },
+        "parse_jobs": {
+            "mode": PARSE_QUEUE_MODE,
+            "pending": parse_job_queue.pending(),
+            **parse_job_stats,
+            "retry_rate": (
+                parse_job_stats["retries"] / parse_job_stats["attempts"]
+                if parse_job_stats["attempts"] else None
+            )
+        },
+        "chat_stream": {
+            **chat_stream_stats,
+            "avg_ttfb_ms": (
+                chat_stream_stats["ttfb_ms_total"] / chat_stream_stats["first_chunks"]
+                if chat_stream_stats["first_chunks"] else None
+            )
+        }
+    }
+
+
 if __name__ == "__main__":
    import uvicorn
    uvicorn.run(app, host="0.0.0.0", port=PORT)
\ No newline at end of file
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+One-off migration for syllabus_items stored before due dates were normalized.
+Rewrites due_date to YYYY-MM-DD or "TBD" and backfills due_at, has_date and user_id, in batches.
+The original text is kept as due_date_raw. Dates without a year are placed in the academic year
+of their syllabus, and left as they are when that can't be told (the syllabus was deleted).
+Progress is checkpointed in Firestore (migrations/normalize_due_dates), so an interrupted run
+picks up where it stopped. Writes are rate-limited to spare the live API's Firestore quota.
+
+Usage:
+    python3 migrate_due_dates.py [--batch-size 200] [--max-writes-per-second 100] [--dry-run] [--restart]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from main import (
+    db,
+    commit_in_batches,
+    items_version_bump,
+    normalize_due_date,
+    syllabus_academic_start_year,
+    DEFAULT_ACADEMIC_START_YEAR,
+)
+
+CHECKPOINT_DOC = ("migrations", "normalize_due_dates")
+
+
+def load_checkpoint() -> dict:
+    doc = db.collection(CHECKPOINT_DOC[0]).document(CHECKPOINT_DOC[1]).get()
+    return doc.to_dict() if doc.exists else {}
+
+
+def save_checkpoint(checkpoint: dict):
+    db.collection(CHECKPOINT_DOC[0]).document(CHECKPOINT_DOC[1]).set({
+        **checkpoint,
+        "updated_at": datetime.now()
+    })
+
+
+def load_syllabi(syllabus_ids: set, syllabi: dict):
+    """
+    Fill syllabi with syllabus_id -> the fields the migration needs (None for deleted syllabi),
+    one batched read for the new IDs.
+    """
+    missing = [syllabus_id for syllabus_id in syllabus_ids if syllabus_id not in syllabi]
+    if not missing:
+        return
+    refs = [db.collection("syllabi").document(syllabus_id) for syllabus_id in missing]
+    for doc in db.get_all(refs, field_paths=["user_id", "name", "upload_date", "created_at"]):
+        syllabi[doc.id] = doc.to_dict() if doc.exists else None
+
+
+def migrated_fields(item: dict, syllabus) -> dict:
+    """Fields that need to change on one item (empty if it's already migrated)."""
+    raw_due_date = item.get("due_date")
+    academic_start_year = syllabus_academic_start_year(syllabus)
+    due_date, due_at = normalize_due_date(raw_due_date, academic_start_year)
+    
+    target = {}
+    if due_at is None and academic_start_year is None and normalize_due_date(raw_due_date, DEFAULT_ACADEMIC_START_YEAR)[1]:
+        # A date without a year and no syllabus to tell which one - leave it rather than guess
+        pass
+    else:
+        target.update({"due_date": due_date, "due_at": due_at, "has_date": due_at is not None})
+        if "due_date_raw" not in item:
+            target["due_date_raw"] = str(raw_due_date or "")
+    
+    owner = (syllabus or {}).get("user_id")
+    if owner and not item.get("user_id"):
+        target["user_id"] = owner
+    return {key: value for key, value in target.items() if key not in item or item[key] != value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize due dates on existing syllabus_items")
+    parser.add_argument("--batch-size", type=int, default=200, help="items read and written per batch")
+    parser.add_argument("--max-writes-per-second", type=float, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+    
+    checkpoint = {} if args.restart else load_checkpoint()
+    if checkpoint.get("done") and not args.restart:
+        print("✅ Migration already completed (use --restart to run it again)")
+        return
+    
+    last_doc_id = checkpoint.get("last_doc_id")
+    scanned = checkpoint.get("scanned", 0)
+    updated = checkpoint.get("updated", 0)
+    if last_doc_id:
+        print(f"↪️  Resuming after item {last_doc_id} ({scanned} scanned, {updated} updated so far)")
+    
+    syllabi = {}
+    while True:
+        # Document ID order needs no extra index and gives a stable cursor, even if the
+        # checkpointed item has since been deleted
+        query = db.collection("syllabus_items")
+        if last_doc_id:
+            query = query.where(FieldPath.document_id(), ">", db.collection("syllabus_items").document(last_doc_id))
+        query = query.order_by(FieldPath.document_id()).limit(args.batch_size)
+        docs = list(query.stream())
+        if not docs:
+            break
+        
+        started = time.monotonic()
+        load_syllabi({doc.get("syllabus_id") for doc in docs if doc.get("syllabus_id")}, syllabi)
+        
+        operations = []
+        changed_syllabi = set()
+        for doc in docs:
+            item = doc.to_dict()
+            syllabus = syllabi.get(item.get("syllabus_id"))
+            fields = migrated_fields(item, syllabus)
+            if fields:
+                operations.append(("update", doc.reference, fields))
+                if syllabus:
+                    changed_syllabi.add(item["syllabus_id"])
+        # Bump items_version so clients holding an ETag for these syllabi refetch the new dates
+        operations.extend(
+            ("update", db.collection("syllabi").document(syllabus_id), items_version_bump())
+            for syllabus_id in changed_syllabi
+        )
+        
+        item_updates = len(operations) - len(changed_syllabi)
+        if operations and not args.dry_run:
+            commit_in_batches(operations)
+        
+        scanned += len(docs)
+        updated += item_updates
+        last_doc_id = docs[-1].id
+        print(f"   {scanned} scanned, {updated} {'to update' if args.dry_run else 'updated'} (last item {last_doc_id})")
+        
+        if not args.dry_run:
+            save_checkpoint({"last_doc_id": last_doc_id, "scanned": scanned, "updated": updated, "done": False})
+        
+        # Rate limit: a batch of N writes takes at least N / max_writes_per_second seconds
+        min_duration = len(operations) / args.max_writes_per_second
+        elapsed = time.monotonic() - started
+        if elapsed < min_duration:
+            time.sleep(min_duration - elapsed)
+    
+    if not args.dry_run:
+        save_checkpoint({"last_doc_id": last_doc_id, "scanned": scanned, "updated": updated, "done": True})
+    print(f"✅ Migration finished: {scanned} items scanned, {updated} {'to update' if args.dry_run else 'updated'}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏸️  Migration interrupted - run again to resume from the last checkpoint")
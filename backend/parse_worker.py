@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Standalone parse worker.
+Run this alongside the API (started with PARSE_QUEUE_MODE=external) to parse uploaded syllabi
+in a separate process. Several workers can run at once - each job is claimed atomically.
+Jobs left running or retrying by a worker that died are reclaimed once their lease expires.
+"""
+
+import asyncio
+
+from main import (
+    run_io,
+    claim_parse_job,
+    find_claimable_parse_jobs,
+    run_parse_job,
+    PARSE_WORKER_CONCURRENCY,
+)
+
+POLL_INTERVAL_SECONDS = 2
+
+
+async def main():
+    print(f"👷 Parse worker started (concurrency {PARSE_WORKER_CONCURRENCY})")
+    running = set()
+    
+    while True:
+        free_slots = PARSE_WORKER_CONCURRENCY - len(running)
+        if free_slots > 0:
+            try:
+                job_ids = await run_io(find_claimable_parse_jobs, free_slots)
+                for job_id in job_ids:
+                    # Another worker may have claimed it since the query ran
+                    if not await run_io(claim_parse_job, job_id):
+                        continue
+                    print(f"📥 Claimed parse job {job_id}")
+                    task = asyncio.create_task(run_parse_job(job_id))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+            except Exception as e:
+                print(f"⚠️  Error polling parse jobs: {e}")
+        
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Parse worker stopped")
@@ -0,0 +1,492 @@
+"""
+Offline test harness for main.py.
+Firebase is replaced with in-memory fakes and Vertex AI is initialized with anonymous credentials
+before main is imported, so no test touches a real project. The Vertex SDK itself is real, so
+request building (e.g. generation configs) is checked against the pinned version.
+Models are faked per test by monkeypatching main.model or main.context_backend.
+Benchmarks are marked with @pytest.mark.benchmark (deselect them with -m "not benchmark") and
+record their numbers with the report fixture, which prints them at the end of the run.
+"""
+
+import contextlib
+import copy
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+
+# Fixed configuration, so a developer's .env can't change what the tests see
+os.environ.update({
+    "FIREBASE_CREDENTIALS_PATH": "unused-in-tests.json",
+    "FIREBASE_CREDENTIALS_JSON": "",
+    "FIREBASE_STORAGE_BUCKET": "test-bucket",
+    "GOOGLE_CLOUD_PROJECT": "test-project",
+    "VERTEX_AI_LOCATION": "us-central1",
+    "VERTEX_AI_MODEL": "gemini-1.5-flash-002",
+    "FRONTEND_URL": "",
+    "PARSE_CACHE_BACKEND": "memory",
+    "PARSE_QUEUE_MODE": "inprocess",
+    "ITEMS_NOTIFIER": "inprocess",
+    "CONTEXT_CACHE_ENABLED": "true",
+    "STRUCTURED_OUTPUT_ENABLED": "true",
+    "RULE_PARSER_ENABLED": "true",
+    "PARSE_MODE": "auto",
+    "FILE_CACHE_DISK_DIR": "",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import firebase_admin
+from firebase_admin import credentials, firestore, storage
+from google.api_core import exceptions as google_exceptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.cloud.firestore_v1.transforms import Increment
+from google.oauth2 import service_account
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = copy.deepcopy(data)
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeWatch:
+    """A snapshot listener. Remembers which threads started and stopped it."""
+
+    def __init__(self, db, key):
+        self._db = db
+        self._key = key
+        self.started_on = threading.current_thread().name
+        self.stopped_on = None
+
+    def unsubscribe(self):
+        self.stopped_on = threading.current_thread().name
+        self._db.watches.get(self._key, []).remove(self)
+
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self.collection = collection
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self.collection}/{self.id}"
+
+    def get(self, transaction=None):
+        self._db.round_trip()
+        with self._db.lock:
+            self._db.document_reads += 1
+            return FakeSnapshot(self, self._db.docs(self.collection).get(self.id))
+
+    def set(self, data, merge=False):
+        self._db.round_trip()
+        with self._db.lock:
+            docs = self._db.docs(self.collection)
+            current = docs.get(self.id) if merge else None
+            docs[self.id] = apply_fields(current or {}, data)
+
+    def update(self, data):
+        self._db.round_trip()
+        with self._db.lock:
+            docs = self._db.docs(self.collection)
+            if self.id not in docs:
+                raise google_exceptions.NotFound(f"No document to update: {self.path}")
+            docs[self.id] = apply_fields(docs[self.id], data)
+
+    def delete(self):
+        self._db.round_trip()
+        with self._db.lock:
+            self._db.docs(self.collection).pop(self.id, None)
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self._db, self.path)
+        watch.callback = callback
+        self._db.watches.setdefault(self.path, []).append(watch)
+        return watch
+
+
+def apply_fields(current, data):
+    """Merge update data into a document, resolving Increment transforms."""
+    merged = copy.deepcopy(current)
+    for key, value in data.items():
+        if isinstance(value, Increment):
+            value = merged.get(key, 0) + value.value
+        merged[key] = copy.deepcopy(value)
+    return merged
+
+
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+DOCUMENT_ID = FieldPath.document_id()
+
+
+def field_value(doc_id, data, field):
+    return doc_id if field == DOCUMENT_ID else data.get(field)
+
+
+class FakeQuery:
+    def __init__(self, db, collection, filters=(), order=None, max_results=None, projection=None, cursor=None):
+        self._db = db
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = order
+        self._limit = max_results
+        self._projection = projection
+        self._cursor = cursor
+
+    def _with(self, **changes):
+        state = {
+            "filters": self._filters, "order": self._order, "max_results": self._limit,
+            "projection": self._projection, "cursor": self._cursor,
+        }
+        return FakeQuery(self._db, self._collection, **{**state, **changes})
+
+    def where(self, field, op, value):
+        if isinstance(value, FakeDocument):
+            value = value.id  # Document ID filters compare against a reference
+        return self._with(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._with(order=(field, direction))
+
+    def limit(self, count):
+        return self._with(max_results=count)
+
+    def select(self, field_paths):
+        return self._with(projection=list(field_paths))
+
+    def start_after(self, snapshot):
+        return self._with(cursor=snapshot.id)
+
+    def stream(self):
+        self._db.round_trip()
+        with self._db.lock:
+            matches = [
+                (doc_id, data) for doc_id, data in self._db.docs(self._collection).items()
+                if all(OPERATORS[op](field_value(doc_id, data, field), value) for field, op, value in self._filters)
+            ]
+        if self._order is not None:
+            field, direction = self._order
+            # Firestore leaves documents without the order field out of ordered queries
+            matches = [match for match in matches if field == DOCUMENT_ID or field in match[1]]
+            matches.sort(key=lambda match: field_value(*match, field), reverse=direction == "DESCENDING")
+        if self._cursor is not None:
+            # Order values are unique in the tests, so the cursor document marks the position
+            position = [doc_id for doc_id, _ in matches].index(self._cursor)
+            matches = matches[position + 1:]
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        with self._db.lock:
+            # Firestore bills a query that matches nothing as one read
+            self._db.document_reads += max(len(matches), 1)
+        if self._projection is not None:
+            matches = [(doc_id, {key: data[key] for key in self._projection if key in data}) for doc_id, data in matches]
+        return iter([
+            FakeSnapshot(FakeDocument(self._db, self._collection, doc_id), data)
+            for doc_id, data in matches
+        ])
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id=None):
+        if doc_id is None:
+            doc_id = f"doc{next(self._db.ids):06d}"
+        return FakeDocument(self._db, self._collection, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self.operations = []
+
+    def set(self, doc_ref, data, merge=False):
+        self.operations.append(lambda: doc_ref.set(data, merge=merge))
+
+    def update(self, doc_ref, data):
+        self.operations.append(lambda: doc_ref.update(data))
+
+    def delete(self, doc_ref):
+        self.operations.append(doc_ref.delete)
+
+    def commit(self):
+        self._db.round_trip()
+        self._db.commits += 1
+        with self._db.latency_off():
+            for operation in self.operations:
+                operation()
+
+
+class FakeTransaction(FakeBatch):
+    """Applies writes immediately; tests don't need isolation between transactions."""
+
+    def set(self, doc_ref, data, merge=False):
+        doc_ref.set(data, merge=merge)
+
+    def update(self, doc_ref, data):
+        doc_ref.update(data)
+
+    def delete(self, doc_ref):
+        doc_ref.delete()
+
+
+class FakeFirestore:
+    """
+    Just enough of the Firestore client for main.py: documents, simple queries, batches.
+    round_trips counts network calls; setting latency makes each one sleep like a real request.
+    document_reads counts billed reads: one per document returned, and one for an empty query.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.data = {}
+        self.watches = {}
+        self.commits = 0
+        self.round_trips = 0
+        self.document_reads = 0
+        self.latency = 0.0
+        self.ids = itertools.count(1)
+        self._local = threading.local()
+
+    def round_trip(self):
+        """Count a call that would go over the network, and sleep for the simulated latency."""
+        if getattr(self._local, "batched", False):
+            return
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @contextlib.contextmanager
+    def latency_off(self):
+        """Writes applied by a batch commit are part of its one round trip."""
+        self._local.batched = True
+        try:
+            yield
+        finally:
+            self._local.batched = False
+
+    def docs(self, collection):
+        return self.data.setdefault(collection, {})
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def get_all(self, refs, field_paths=None):
+        self.round_trip()
+        with self.latency_off():
+            return [ref.get() for ref in refs]
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self._bucket = bucket
+        self.name = name
+        self.generation = None
+        self.chunk_size = None
+        self.public_url = f"https://storage.test/{name}"
+
+    def upload_from_file(self, file_obj, size=None, content_type=None, rewind=False):
+        if self._bucket.upload_latency:
+            time.sleep(self._bucket.upload_latency)
+        if rewind:
+            file_obj.seek(0)
+        if self.chunk_size:
+            # Resumable uploads send (and read) the file one chunk at a time
+            chunks = iter(lambda: file_obj.read(self.chunk_size), b"")
+            self._bucket.files[self.name] = self._bucket.store(chunks)
+        else:
+            self._bucket.files[self.name] = self._bucket.store([file_obj.read()])
+        self.generation = next(self._bucket.generations)
+        self._bucket.generation_of[self.name] = self.generation
+
+    def download_as_bytes(self):
+        self._bucket.downloads += 1
+        if self._bucket.download_latency:
+            time.sleep(self._bucket.download_latency)
+        return self._bucket.files[self.name]
+
+    def make_public(self):
+        pass
+
+
+class FakeBucket:
+    name = "test-bucket"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.files = {}
+        self.generations = itertools.count(1)
+        self.generation_of = {}
+        self.downloads = 0
+        self.download_latency = 0.0
+        self.upload_latency = 0.0
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def store(self, chunks):
+        """Bytes kept for an uploaded file. Benchmarks replace this to keep "remote" files out of RSS."""
+        return b"".join(chunks)
+
+    def get_blob(self, name):
+        if name not in self.files:
+            return None
+        blob = FakeBlob(self, name)
+        blob.generation = self.generation_of.get(name, 1)
+        return blob
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeModel:
+    """
+    Stands in for GenerativeModel. respond(contents) returns the response text; streamed calls
+    get it back in chunks of stream_chunk_size characters, waiting chunk_delay seconds before
+    each chunk after the first. chunks_sent counts the chunks actually pulled from streams.
+    """
+
+    def __init__(self, respond, stream_chunk_size=16, chunk_delay=0.0):
+        self.respond = respond
+        self.stream_chunk_size = stream_chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = []
+        self.chunks_sent = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.calls.append({"contents": contents, "stream": stream, **kwargs})
+        text = self.respond(contents)
+        if not stream:
+            return FakeResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        size = self.stream_chunk_size
+        for i in range(0, len(text), size):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            self.chunks_sent += 1
+            yield FakeResponse(text[i:i + size])
+
+
+fake_db = FakeFirestore()
+fake_bucket = FakeBucket()
+
+
+def fake_transactional(func):
+    return func
+
+
+credentials.Certificate = lambda *args, **kwargs: None
+firebase_admin.initialize_app = lambda *args, **kwargs: None
+firestore.client = lambda *args, **kwargs: fake_db
+firestore.transactional = fake_transactional
+storage.bucket = lambda *args, **kwargs: fake_bucket
+service_account.Credentials.from_service_account_file = classmethod(lambda cls, *args, **kwargs: AnonymousCredentials())
+
+import main as main_module
+
+
+@pytest.fixture
+def main():
+    return main_module
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    """Fresh fakes and caches for every test."""
+    fake_db.reset()
+    fake_bucket.reset()
+    monkeypatch.setattr(main_module, "syllabus_cache", main_module.TTLCache(64, 30))
+    monkeypatch.setattr(main_module, "parse_cache", main_module.InMemoryParseCache(16))
+    monkeypatch.setattr(main_module, "file_cache", main_module.FileBytesCache(max_bytes=1024 * 1024))
+    yield
+
+
+@pytest.fixture
+def db():
+    return fake_db
+
+
+@pytest.fixture
+def bucket():
+    return fake_bucket
+
+
+benchmark_results = []
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing comparisons that report numbers")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not benchmark_results:
+        return
+    terminalreporter.section("benchmarks")
+    for name, numbers in benchmark_results:
+        values = ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}" for key, value in numbers.items())
+        terminalreporter.write_line(f"{name}: {values}")
+
+
+@pytest.fixture
+def report():
+    """report(name, **numbers) records a benchmark result for the end-of-run summary."""
+    def add(name, **numbers):
+        benchmark_results.append((name, numbers))
+    return add
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def asgi_client(app):
+    """An async client calling the app in the current event loop (no startup/shutdown hooks)."""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
@@ -0,0 +1,92 @@
+"""/syllabi/upload-batch against the fakes, and against the same files sent to /syllabi/upload one at a time."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import asgi_client
+
+FILE_COUNT = 10
+
+
+def syllabus_files(count):
+    return [
+        ("files", (f"course{n}.txt", f"Course {n}\nMidterm Exam - Due: March {n + 1}, 2025\n".encode(), "text/plain"))
+        for n in range(count)
+    ]
+
+
+@pytest.fixture
+def queued_jobs(main, monkeypatch):
+    """Parse job IDs handed to the in-process queue (its workers aren't started, so nothing parses)."""
+    queue = main.ParseJobQueue(concurrency=1)
+    monkeypatch.setattr(main, "parse_job_queue", queue)
+    return queue._queued_ids
+
+
+def post(main, *requests):
+    """Send (path, files) requests one after another. Returns (responses, elapsed ms)."""
+    async def run():
+        async with asgi_client(main.app) as client:
+            started = time.perf_counter()
+            responses = [await client.post(path, files=files, data={"user_id": "u1"}) for path, files in requests]
+            return responses, (time.perf_counter() - started) * 1000
+    return asyncio.run(run())
+
+
+def test_batch_reports_each_file_in_order_and_stores_the_valid_ones(main, db, bucket, queued_jobs):
+    files = syllabus_files(3)
+    files.insert(1, ("files", ("notes.exe", b"MZ", "application/octet-stream")))
+    files.append(("files", ("course0.txt", b"again", "text/plain")))
+    commits = db.commits
+
+    [response], _ = post(main, ("/syllabi/upload-batch", files))
+
+    body = response.json()
+    assert response.status_code == 200
+    assert [result["status"] for result in body["results"]] == ["uploaded", "rejected", "uploaded", "uploaded", "rejected"]
+    assert body["results"][4]["error"] == "Duplicate file name in batch"
+    assert (body["uploaded"], body["failed"]) == (3, 2)
+    # Three syllabi, their three parse jobs and the syllabi_version bump, in one commit
+    assert db.commits - commits == 1
+    assert len(db.docs("syllabi")) == len(db.docs("parse_jobs")) == len(bucket.files) == 3
+    assert queued_jobs == {result["id"] for result in body["results"] if result["status"] == "uploaded"}
+    assert db.docs("users")["u1"]["syllabi_version"] == 1
+
+
+def test_batch_over_the_file_limit_is_rejected(main, db):
+    [response], _ = post(main, ("/syllabi/upload-batch", syllabus_files(main.MAX_BATCH_FILES + 1)))
+
+    assert response.status_code == 400
+    assert db.docs("syllabi") == {}
+
+
+@pytest.mark.benchmark
+def test_batch_upload_versus_sequential_uploads(main, db, bucket, queued_jobs, report):
+    db.latency = 0.005
+    bucket.upload_latency = 0.05
+
+    round_trips = db.round_trips
+    [batch], batch_ms = post(main, ("/syllabi/upload-batch", syllabus_files(FILE_COUNT)))
+    batch_round_trips = db.round_trips - round_trips
+    assert batch.json()["uploaded"] == FILE_COUNT
+
+    db.reset()
+    db.latency = 0.005
+    round_trips = db.round_trips
+    singles, sequential_ms = post(main, *(("/syllabi/upload", [("file", file)]) for _, file in syllabus_files(FILE_COUNT)))
+    sequential_round_trips = db.round_trips - round_trips
+    assert all(response.status_code == 200 for response in singles)
+
+    report(
+        f"user-016 {FILE_COUNT} files, 50ms Storage upload, 5ms Firestore round trip",
+        batch_ms=batch_ms,
+        sequential_ms=sequential_ms,
+        batch_requests=1,
+        sequential_requests=FILE_COUNT,
+        batch_round_trips=batch_round_trips,
+        sequential_round_trips=sequential_round_trips,
+    )
+    assert (batch_round_trips, sequential_round_trips) == (1, FILE_COUNT)
+    assert batch_ms < sequential_ms
@@ -0,0 +1,100 @@
+"""commit_in_batches and store_syllabus_items give the same documents as one write per document."""
+
+import asyncio
+import math
+import time
+
+import pytest
+
+ITEM_COUNT = 1234
+
+
+def parsed_items(count):
+    return [
+        {"category": ["Homework", "Exams", "Made Up"][n % 3], "name": f"Item {n}", "due_date": f"2025-{n % 12 + 1:02d}-15"}
+        for n in range(count)
+    ]
+
+
+def apply_one_by_one(operations):
+    """The per-document loop that batched commits replaced."""
+    for op, doc_ref, data in operations:
+        if op == "set":
+            doc_ref.set(data)
+        elif op == "merge":
+            doc_ref.set(data, merge=True)
+        elif op == "update":
+            doc_ref.update(data)
+        else:
+            doc_ref.delete()
+
+
+def mixed_operations(db, count):
+    """count operations of every kind, over documents that exist before the writes."""
+    for n in range(count):
+        db.collection("things").document(f"d{n}").set({"n": n, "keep": True})
+    db.collection("things").document("extra").set({"n": -1})
+    operations = []
+    for n in range(count):
+        doc_ref = db.collection("things").document(f"d{n}")
+        kind = ("set", "merge", "update", "delete")[n % 4]
+        operations.append((kind, doc_ref, None if kind == "delete" else {"n": n * 10, kind: True}))
+    return operations
+
+
+@pytest.mark.parametrize("count", [1, 499, 500, 501, 1001])
+def test_commit_in_batches_matches_one_write_per_document(main, db, count):
+    apply_one_by_one(mixed_operations(db, count))
+    expected = db.docs("things")
+
+    db.reset()
+    operations = mixed_operations(db, count)
+    commits_before = db.commits
+
+    assert main.commit_in_batches(operations) == math.ceil(count / 500)
+    assert db.commits - commits_before == math.ceil(count / 500)
+    assert db.docs("things") == expected
+
+
+def test_commit_in_batches_rejects_unknown_operations(main, db):
+    with pytest.raises(ValueError):
+        main.commit_in_batches([("upsert", db.collection("things").document("x"), {})])
+
+
+def test_stored_items_match_one_set_per_item(main, db):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "items_version": 0})
+
+    stored, _ = asyncio.run(main.store_syllabus_items("s1", parsed_items(ITEM_COUNT), user_id="u1"))
+
+    # Every item plus the items_version bump on the syllabus
+    assert db.commits == math.ceil((ITEM_COUNT + 1) / 500)
+    assert db.docs("syllabus_items") == {item["id"]: {k: v for k, v in item.items() if k != "id"} for item in stored}
+    assert db.docs("syllabi")["s1"]["items_version"] == 1
+    assert {item["category"] for item in stored} == {"Homework", "Exams", "Other"}
+
+
+@pytest.mark.benchmark
+def test_batched_item_write_time(main, db, monkeypatch, report):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "items_version": 0})
+    db.latency = 0.002
+    items = parsed_items(60)
+
+    round_trips = db.round_trips
+    stored, batched_ms = asyncio.run(main.store_syllabus_items("s1", items, user_id="u1"))
+    batched_round_trips = db.round_trips - round_trips
+
+    round_trips = db.round_trips
+    started = time.perf_counter()
+    apply_one_by_one([("set", db.collection("loop_items").document(item["id"]), item) for item in stored])
+    loop_ms = (time.perf_counter() - started) * 1000
+    loop_round_trips = db.round_trips - round_trips
+
+    report(
+        "user-003 60 items, 2ms per round trip",
+        batched_ms=batched_ms,
+        one_set_per_item_ms=loop_ms,
+        batched_round_trips=batched_round_trips,
+        one_set_per_item_round_trips=loop_round_trips,
+    )
+    assert (batched_round_trips, loop_round_trips) == (1, 60)
+    assert batched_ms < loop_ms
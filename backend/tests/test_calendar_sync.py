@@ -0,0 +1,320 @@
+"""Calendar sync: the diff between items and stored event mappings, and applying it to a fake service."""
+
+import asyncio
+import contextlib
+import threading
+import time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from main import CalendarItem, calendar_event_doc_id, calendar_name_key, plan_calendar_sync
+
+
+def item(item_id, name, due_date="2026-03-10", category="Exams"):
+    return CalendarItem(id=item_id, category=category, name=name, due_date=due_date)
+
+
+def mapping(item_id, name, due_date="2026-03-10", category="Exams", event_id=None):
+    return {
+        "doc_id": calendar_event_doc_id("u1", item_id),
+        "item_id": item_id,
+        "event_id": event_id or f"ev-{item_id}",
+        "name": name,
+        "name_key": calendar_name_key(name),
+        "summary": f"{category}: {name}",
+        "date": due_date,
+    }
+
+
+def summarize(plan):
+    """Plan as comparable (item ID, mapped item ID) pairs."""
+    return {
+        "insert": [i.id for i in plan["insert"]],
+        "patch": [(i.id, m["item_id"]) for i, m in plan["patch"]],
+        "unchanged": [(i.id, m["item_id"]) for i, m in plan["unchanged"]],
+        "delete": [m["item_id"] for m in plan["delete"]],
+    }
+
+
+PLAN_CASES = {
+    "new item is inserted": dict(
+        items=[item("a", "Midterm")], mappings=[], live={"a"},
+        expected={"insert": ["a"], "patch": [], "unchanged": [], "delete": []},
+    ),
+    "same item and date is unchanged": dict(
+        items=[item("a", "Midterm")], mappings=[mapping("a", "Midterm")], live={"a"},
+        expected={"insert": [], "patch": [], "unchanged": [("a", "a")], "delete": []},
+    ),
+    "moved date is patched": dict(
+        items=[item("a", "Midterm", "2026-03-12")], mappings=[mapping("a", "Midterm")], live={"a"},
+        expected={"insert": [], "patch": [("a", "a")], "unchanged": [], "delete": []},
+    ),
+    "renamed item is patched": dict(
+        items=[item("a", "Midterm Exam (30%)")], mappings=[mapping("a", "Midterm")], live={"a"},
+        expected={"insert": [], "patch": [("a", "a")], "unchanged": [], "delete": []},
+    ),
+    "reparse gives a new ID, matched by name": dict(
+        items=[item("new", "Midterm")], mappings=[mapping("old", "Midterm")], live={"new"},
+        expected={"insert": [], "patch": [], "unchanged": [("new", "old")], "delete": []},
+    ),
+    "reparse match ignores case and spacing, then patches the date": dict(
+        items=[item("new", "final  EXAM", "2026-05-15")], mappings=[mapping("old", "Final Exam", "2026-05-14")], live={"new"},
+        expected={"insert": [], "patch": [("new", "old")], "unchanged": [], "delete": []},
+    ),
+    "a live item's mapping is not taken by a same-named item": dict(
+        items=[item("b", "Quiz")], mappings=[mapping("a", "Quiz")], live={"a", "b"},
+        expected={"insert": ["b"], "patch": [], "unchanged": [], "delete": []},
+    ),
+    "duplicate names each take their own orphaned mapping": dict(
+        items=[item("n1", "Quiz", "2026-02-01"), item("n2", "Quiz", "2026-02-08"), item("n3", "Quiz", "2026-02-15")],
+        mappings=[mapping("o1", "Quiz", "2026-02-01"), mapping("o2", "Quiz", "2026-02-08")],
+        live={"n1", "n2", "n3"},
+        expected={"insert": ["n3"], "patch": [], "unchanged": [("n1", "o1"), ("n2", "o2")], "delete": []},
+    ),
+    "unmatched mappings are kept by default": dict(
+        items=[item("a", "Midterm")], mappings=[mapping("a", "Midterm"), mapping("gone", "Essay")], live={"a"},
+        expected={"insert": [], "patch": [], "unchanged": [("a", "a")], "delete": []},
+    ),
+    "remove_missing deletes unmatched mappings only": dict(
+        items=[item("a", "Midterm"), item("new", "Final")],
+        mappings=[mapping("a", "Midterm"), mapping("old", "Final"), mapping("gone", "Essay"), mapping("unselected", "Quiz")],
+        live={"a", "new", "unselected"}, remove_missing=True,
+        expected={"insert": [], "patch": [], "unchanged": [("a", "a"), ("new", "old")], "delete": ["gone", "unselected"]},
+    ),
+}
+
+
+@pytest.mark.parametrize("case", PLAN_CASES.values(), ids=PLAN_CASES.keys())
+def test_plan_calendar_sync(case):
+    plan = plan_calendar_sync(case["items"], case["mappings"], case["live"], case.get("remove_missing", False))
+    assert summarize(plan) == case["expected"]
+
+
+class FakeRequest:
+    def __init__(self, service, method, kwargs):
+        self.service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self, http=None):
+        """One request on its own round trip."""
+        with self.service.in_flight():
+            time.sleep(self.service.latency)
+        return self.respond()
+
+    def respond(self):
+        with self.service.lock:
+            self.service.calls.append((self.method, self.kwargs.get("eventId")))
+            call_number = len(self.service.calls)
+        event_id = self.kwargs.get("eventId")
+        if event_id in self.service.deleted_by_hand:
+            raise HttpError(httplib2.Response({"status": 404}), b"Not Found")
+        if self.method == "delete":
+            return ""
+        if self.method == "insert":
+            event_id = f"ev{call_number}"
+        return {"id": event_id, "htmlLink": f"https://calendar.test/{event_id}"}
+
+
+class FakeEvents:
+    def __init__(self, service):
+        self.service = service
+
+    def insert(self, **kwargs):
+        return FakeRequest(self.service, "insert", kwargs)
+
+    def patch(self, **kwargs):
+        return FakeRequest(self.service, "patch", kwargs)
+
+    def delete(self, **kwargs):
+        return FakeRequest(self.service, "delete", kwargs)
+
+
+class FakeBatchRequest:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        """All the requests in one round trip, unless the service fails batches as a whole."""
+        with self.service.in_flight():
+            time.sleep(self.service.latency)
+        if self.service.fail_batches:
+            raise HttpError(httplib2.Response({"status": 503}), b"Service Unavailable")
+        self.service.batches += 1
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.respond(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeCalendarService:
+    """
+    The events()/new_batch_http_request part of the Calendar API that sync_calendar_events uses.
+    Every request or batch request takes latency seconds; fail_batches makes batch requests fail
+    as a whole. max_in_flight is the most round trips that were open at once.
+    """
+
+    def __init__(self, deleted_by_hand=(), latency=0.0, fail_batches=False):
+        self.deleted_by_hand = set(deleted_by_hand)
+        self.latency = latency
+        self.fail_batches = fail_batches
+        self.calls = []
+        self.batches = 0
+        self.lock = threading.Lock()
+        self.open_round_trips = 0
+        self.max_in_flight = 0
+
+    @contextlib.contextmanager
+    def in_flight(self):
+        with self.lock:
+            self.open_round_trips += 1
+            self.max_in_flight = max(self.max_in_flight, self.open_round_trips)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.open_round_trips -= 1
+
+    def events(self):
+        return FakeEvents(self)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatchRequest(self, callback)
+
+
+def store_mapping(db, stored):
+    db.collection("calendar_events").document(stored["doc_id"]).set({
+        **{key: value for key, value in stored.items() if key != "doc_id"},
+        "user_id": "u1",
+        "syllabus_id": "s1",
+    })
+
+
+def sync(main, service, items, remove_missing=False):
+    return asyncio.run(main.sync_calendar_events(service, None, "u1", "s1", "s.txt", items, remove_missing))
+
+
+def mappings_in(db):
+    return {doc_id: (data["item_id"], data["event_id"]) for doc_id, data in db.docs("calendar_events").items()}
+
+
+@pytest.fixture
+def live_items(db):
+    def add(*item_ids):
+        for item_id in item_ids:
+            db.collection("syllabus_items").document(item_id).set({"syllabus_id": "s1"})
+    return add
+
+
+def test_sync_twice_sends_nothing_the_second_time(main, db, live_items):
+    live_items("a", "b")
+    service = FakeCalendarService()
+    items = [item("a", "Midterm"), item("b", "Final", "2026-05-15")]
+
+    first = sync(main, service, items)
+    assert len(first["created"]) == 2 and service.batches == 1
+
+    second = sync(main, service, items)
+    assert len(second["unchanged"]) == 2
+    assert service.batches == 1
+
+
+def test_event_deleted_by_hand_is_recreated(main, db, live_items):
+    live_items("a")
+    store_mapping(db, mapping("a", "Midterm", "2026-03-10", event_id="ev-deleted"))
+    service = FakeCalendarService(deleted_by_hand={"ev-deleted"})
+
+    outcome = sync(main, service, [item("a", "Midterm", "2026-03-12")])
+
+    assert [call[0] for call in service.calls] == ["patch", "insert"]
+    assert [created["item"] for created in outcome["created"]] == ["Midterm"]
+    assert outcome["failed"] == []
+    _, event_id = mappings_in(db)[calendar_event_doc_id("u1", "a")]
+    assert event_id != "ev-deleted"
+
+
+def test_reparse_moves_the_mapping_to_the_new_item(main, db, live_items):
+    live_items("new")
+    store_mapping(db, mapping("old", "Midterm"))
+
+    outcome = sync(main, FakeCalendarService(), [item("new", "Midterm")])
+
+    assert len(outcome["unchanged"]) == 1
+    assert mappings_in(db) == {calendar_event_doc_id("u1", "new"): ("new", "ev-old")}
+
+
+def test_remove_missing_deletes_events_and_tolerates_ones_already_gone(main, db, live_items):
+    live_items("a")
+    store_mapping(db, mapping("a", "Midterm"))
+    store_mapping(db, mapping("gone", "Essay"))
+    store_mapping(db, mapping("also-gone", "Quiz", event_id="ev-deleted"))
+    service = FakeCalendarService(deleted_by_hand={"ev-deleted"})
+
+    outcome = sync(main, service, [item("a", "Midterm")], remove_missing=True)
+
+    assert sorted(deleted["item"] for deleted in outcome["deleted"]) == ["Essay", "Quiz"]
+    assert outcome["failed"] == []
+    assert list(mappings_in(db)) == [calendar_event_doc_id("u1", "a")]
+
+
+def calendar_items(count):
+    return [item(f"i{n}", f"Quiz {n}", f"2026-03-{n % 28 + 1:02d}") for n in range(count)]
+
+
+def test_failed_batch_is_sent_as_concurrent_individual_requests(main, db, live_items):
+    items = calendar_items(20)
+    live_items(*(i.id for i in items))
+    service = FakeCalendarService(latency=0.05, fail_batches=True)
+
+    started = time.perf_counter()
+    outcome = sync(main, service, items)
+    elapsed = time.perf_counter() - started
+
+    assert len(outcome["created"]) == 20 and outcome["failed"] == []
+    assert len(set(mappings_in(db).values())) == 20
+    assert [call[0] for call in service.calls] == ["insert"] * 20
+    # One failed batch round trip, then the individual calls CALENDAR_MAX_CONCURRENCY at a time
+    assert service.max_in_flight == main.CALENDAR_MAX_CONCURRENCY
+    assert elapsed < 20 * service.latency
+
+
+def send_individually(service, items):
+    """The calls one after another, as the endpoint did before batching."""
+    for i in items:
+        service.events().insert(calendarId="primary", body={"summary": i.name}).execute()
+
+
+@pytest.mark.benchmark
+def test_batched_calendar_sync_versus_sequential_calls(main, db, live_items, report):
+    count = 120
+    latency = 0.02
+    items = calendar_items(count)
+    live_items(*(i.id for i in items))
+
+    timings = {}
+    for name, service in [("batched", FakeCalendarService(latency=latency)), ("batch_failed", FakeCalendarService(latency=latency, fail_batches=True))]:
+        db.docs("calendar_events").clear()
+        started = time.perf_counter()
+        outcome = sync(main, service, items)
+        timings[name] = (time.perf_counter() - started) * 1000
+        assert len(outcome["created"]) == count
+
+    started = time.perf_counter()
+    send_individually(FakeCalendarService(latency=latency), items)
+    timings["sequential"] = (time.perf_counter() - started) * 1000
+
+    report(
+        f"user-017 {count} calendar inserts, {latency * 1000:.0f}ms per round trip",
+        batched_ms=timings["batched"],
+        batch_failed_fallback_ms=timings["batch_failed"],
+        sequential_ms=timings["sequential"],
+    )
+    assert timings["batched"] < timings["batch_failed"] < timings["sequential"]
@@ -0,0 +1,83 @@
+"""CategoryClassifier must give the same category as the keyword-by-keyword loop it replaced."""
+
+import random
+from difflib import get_close_matches
+
+import pytest
+
+from main import CATEGORY_MAPPING, CategoryClassifier, detect_category, normalize_item_name
+
+
+def original_detect_category(item_name, mapping=CATEGORY_MAPPING):
+    """The detect_category loop before CategoryClassifier, kept here as the reference."""
+    if not item_name:
+        return "Other"
+    item_lower = normalize_item_name(item_name)
+    for category, keywords in mapping.items():
+        for keyword in keywords:
+            if keyword in item_lower:
+                return category.capitalize()
+            if get_close_matches(item_lower, keywords, n=1, cutoff=0.8):
+                return category.capitalize()
+    return "Other"
+
+
+NAMES = [
+    "", "Midterm Exam", "Final Project Presentation", "Quiz 3", "Quizzes", "HW 4", "Homework 2",
+    "Problem Set 5", "Research Paper", "Lab Report", "Essay 1", "Reading Response", "Tests",
+    "exam", "exams", "Exma", "quizz", "qiz", "projet", "homwork", "esay", "paper", "papers",
+    "Presentations", "Attendance", "Participation", "Final", "Midterm", "TEST", "hw", "hws",
+    "Group project: final report", "Quiz on the test material", "Contest entry", "Latest news",
+    "Showcase", "rest", "tes", "report", "Capstone", "Lab 2", "Peer review",
+]
+
+
+def random_names(seed, count=2000):
+    """Names built from keywords, near-miss typos and filler, at the lengths fuzzy matching cares about."""
+    rng = random.Random(seed)
+    keywords = sorted({k for ks in CATEGORY_MAPPING.values() for k in ks})
+    filler = ["week", "1", "unit", "lab", "reading", "the", "final", "group", "online", "in-class"]
+
+    def typo(word):
+        if len(word) < 2:
+            return word
+        i = rng.randrange(len(word))
+        return rng.choice([
+            word[:i] + word[i + 1:],
+            word[:i] + rng.choice("aeioutsr") + word[i:],
+            word[:i] + rng.choice("aeioutsr") + word[i + 1:],
+        ])
+
+    names = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 3)):
+            word = rng.choice(keywords + filler)
+            parts.append(typo(word) if rng.random() < 0.4 else word)
+        name = " ".join(parts)
+        names.append(name.upper() if rng.random() < 0.2 else name + rng.choice(["", "s", "es"]))
+    return names
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_matches_original_loop(name):
+    assert detect_category(name) == original_detect_category(name)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_original_loop_on_random_names(seed):
+    for name in random_names(seed):
+        assert detect_category(name) == original_detect_category(name), name
+
+
+def test_matches_original_loop_for_other_mappings():
+    # Overlapping keywords across categories and an empty category in the middle
+    mapping = {
+        "labs": ["lab", "laboratory"],
+        "other": [],
+        "reading": ["read", "reading response", "lab reading"],
+        "projects": ["project", "proj"],
+    }
+    classifier = CategoryClassifier(mapping)
+    for name in NAMES + random_names(99, 500) + ["Lab reading", "laboratry", "readng", "proj 1"]:
+        assert classifier.classify(normalize_item_name(name)) == original_detect_category(name, mapping), name
@@ -0,0 +1,97 @@
+"""/chat/stream against a slow fake streaming model: time to first byte and client disconnects."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from conftest import FakeModel
+
+ANSWER = "The midterm is on March 10. It covers units one to four."
+CHUNK_DELAY = 0.2
+
+
+@pytest.fixture
+def slow_model(main, db, bucket, monkeypatch):
+    monkeypatch.setattr(main, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(main, "chat_stream_stats", dict.fromkeys(main.chat_stream_stats, 0))
+    fake_model = FakeModel(lambda contents: ANSWER, stream_chunk_size=16, chunk_delay=CHUNK_DELAY)
+    monkeypatch.setattr(main, "model", fake_model)
+
+    file_path = "syllabi/u1/s.txt"
+    bucket.files[file_path] = b"Midterm: March 10"
+    db.collection("syllabi").document("s1").set({
+        "user_id": "u1",
+        "name": "s.txt",
+        "file_path": file_path,
+        "file_url": "https://storage.test/s.txt",
+        "file_type": ".txt",
+    })
+    return fake_model
+
+
+def call_chat_stream(main, disconnect_after_first_chunk=False):
+    """
+    Run the ASGI app directly, so each body message is timed as it is sent (test clients buffer
+    the whole response). Returns [(seconds since the request, body text)].
+    """
+    body = json.dumps({"user_id": "u1", "message": "When is the midterm?", "syllabus_id": "s1"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/chat/stream", "raw_path": b"/chat/stream", "root_path": "",
+        "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    async def run():
+        disconnected = asyncio.Event()
+        request_sent = False
+        received = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                received.append((time.perf_counter() - started, message["body"].decode()))
+                if disconnect_after_first_chunk:
+                    disconnected.set()
+
+        started = time.perf_counter()
+        await main.app(scope, receive, send)
+        return received
+
+    return asyncio.run(run())
+
+
+def test_first_chunk_is_sent_before_the_answer_is_complete(main, slow_model):
+    received = call_chat_stream(main)
+
+    texts = [json.loads(body.split("data: ", 1)[1])["text"] for _, body in received[:-1]]
+    assert "".join(texts) == ANSWER
+    assert received[-1][1].startswith("event: done")
+
+    # Each chunk is sent as the model produces it: a chunk delay apart, not all together at the end.
+    # Times are relative to the first chunk, since the request's setup time varies with the machine.
+    first_at, second_at, last_at = received[0][0], received[1][0], received[-1][0]
+    assert second_at - first_at >= CHUNK_DELAY * 0.9
+    assert last_at - first_at >= CHUNK_DELAY * 0.9 * (len(texts) - 1)
+    assert main.chat_stream_stats["first_chunks"] == 1
+    assert main.chat_stream_stats["ttfb_ms_total"] < CHUNK_DELAY * 1000
+
+
+def test_disconnect_stops_generation(main, slow_model):
+    received = call_chat_stream(main, disconnect_after_first_chunk=True)
+    time.sleep(CHUNK_DELAY * 2)  # Give the pulling thread time to notice
+
+    total_chunks = -(-len(ANSWER) // slow_model.stream_chunk_size)
+    assert len(received) == 1
+    assert main.chat_stream_stats["cancelled"] == 1
+    assert main.chat_stream_stats["completed"] == 0
+    assert slow_model.chunks_sent < total_chunks
@@ -0,0 +1,95 @@
+"""Single-call versus chunked parsing of a scaled-up test_syllabus_detailed.txt, against a token-costed fake model."""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from vertexai.generative_models import Part
+
+from conftest import FakeResponse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COPIES = 40
+INPUT_SECONDS_PER_TOKEN = 0.000002
+OUTPUT_SECONDS_PER_TOKEN = 0.00002
+
+
+def scaled_syllabus(copies=COPIES):
+    """The detailed syllabus repeated as weekly sections, with item names made unique per copy."""
+    with open(os.path.join(BACKEND_DIR, "test_syllabus_detailed.txt")) as f:
+        text = f.read()
+    return "\n\n".join(text.replace("\n- ", f"\n- Week {week} ") for week in range(1, copies + 1)).encode("utf-8")
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class ReadingModel:
+    """
+    Answers with the dated items in whatever text it was sent (found with the rule parser), and
+    takes time per input and output token the way a real model does, about 4 characters a token.
+    """
+
+    def __init__(self, main):
+        self.main = main
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.calls += 1
+        text = "".join(
+            part.inline_data.data.decode("utf-8") if isinstance(part, Part) else part
+            for part in contents
+        )
+        items, _ = self.main.extract_items_with_rules(text)
+        answer = json.dumps({"items": items})
+        usage = FakeUsage(len(text) // 4, len(answer) // 4)
+        time.sleep(usage.prompt_token_count * INPUT_SECONDS_PER_TOKEN + usage.candidates_token_count * OUTPUT_SECONDS_PER_TOKEN)
+        response = FakeResponse(answer)
+        response.usage_metadata = usage
+        return iter([response]) if stream else response
+
+
+def parse(main, db):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "name": "packet.txt", "items_version": 0})
+    timings = {}
+    started = time.perf_counter()
+    items = asyncio.run(main.parse_syllabus_with_ai(
+        syllabus_id="s1",
+        file_bytes=scaled_syllabus(),
+        mime_type="text/plain",
+        syllabus_name="packet.txt",
+        timings=timings,
+        replace_existing=True
+    ))
+    return items, timings, (time.perf_counter() - started) * 1000
+
+
+@pytest.mark.benchmark
+def test_chunked_parse_wall_time_and_tokens(main, db, monkeypatch, report):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    monkeypatch.setattr(main, "model", ReadingModel(main))
+
+    monkeypatch.setattr(main, "PARSE_MODE", "single")
+    single_items, single, single_ms = parse(main, db)
+    monkeypatch.setattr(main, "PARSE_MODE", "auto")
+    chunked_items, chunked, chunked_ms = parse(main, db)
+
+    assert (single["parse_mode"], chunked["parse_mode"]) == ("single", "chunked")
+    assert len(single_items) == 14 * COPIES
+    assert sorted((i["name"], i["due_date"]) for i in chunked_items) == sorted((i["name"], i["due_date"]) for i in single_items)
+
+    report(
+        f"user-011 test_syllabus_detailed.txt x{COPIES} ({len(scaled_syllabus()) // 1024}KB), {chunked['chunks']} chunks",
+        single_ms=single_ms,
+        chunked_ms=chunked_ms,
+        single_prompt_tokens=single["prompt_tokens"],
+        chunked_prompt_tokens=chunked["prompt_tokens"],
+        single_output_tokens=single["output_tokens"],
+        chunked_output_tokens=chunked["output_tokens"],
+    )
+    assert chunked_ms < single_ms
@@ -0,0 +1,112 @@
+"""ETags on the items and syllabus list endpoints, and what they save a client polling once a second."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from conftest import asgi_client
+
+ITEM_COUNT = 40
+SYLLABUS_COUNT = 20
+POLLS = 60
+
+
+@pytest.fixture
+def syllabus(db):
+    """SYLLABUS_COUNT syllabi for u1; s1 has ITEM_COUNT items."""
+    for n in range(1, SYLLABUS_COUNT + 1):
+        db.collection("syllabi").document(f"s{n}").set({
+            "user_id": "u1", "name": f"s{n}.pdf", "items_version": 1, "upload_date": datetime(2025, 1, n),
+        })
+    for n in range(ITEM_COUNT):
+        db.collection("syllabus_items").document(f"i{n}").set({
+            "syllabus_id": "s1", "user_id": "u1", "category": "Homework",
+            "name": f"Problem Set {n}", "due_date": f"2025-{n % 12 + 1:02d}-15",
+        })
+
+
+def bump_items_version(main, db):
+    db.collection("syllabi").document("s1").update({"items_version": main.firestore.Increment(1)})
+
+
+def request(main, *calls):
+    """Send (path, headers) GETs in turn and return the responses."""
+    async def run():
+        async with asgi_client(main.app) as client:
+            return [await client.get(path, headers=headers) for path, headers in calls]
+    return asyncio.run(run())
+
+
+def test_items_etag_gets_304_until_the_items_change(main, db, syllabus):
+    [first] = request(main, ("/syllabi/s1/items", {}))
+    etag = first.headers["etag"]
+    reads = db.document_reads
+
+    [unchanged] = request(main, ("/syllabi/s1/items", {"If-None-Match": etag}))
+    assert (unchanged.status_code, unchanged.content) == (304, b"")
+    assert db.document_reads - reads == 1
+
+    bump_items_version(main, db)
+    [changed] = request(main, ("/syllabi/s1/items", {"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert len(changed.json()) == ITEM_COUNT
+    assert changed.headers["etag"] != etag
+
+
+def test_list_etag_changes_with_syllabi_version_and_parameters(main, db, syllabus):
+    [first, paged] = request(main, ("/syllabi/u1", {}), ("/syllabi/u1?limit=10", {}))
+    etag = first.headers["etag"]
+    assert paged.headers["etag"] != etag
+
+    [unchanged] = request(main, ("/syllabi/u1", {"If-None-Match": etag}))
+    assert unchanged.status_code == 304
+
+    main.commit_in_batches([main.syllabi_version_op("u1")])
+    [changed] = request(main, ("/syllabi/u1", {"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def poll(main, db, path, conditional):
+    """
+    POLLS GETs of path, as a client polling once a second for a minute would send them; the data
+    changes halfway. Returns (response bytes, document reads, 304 count).
+    """
+    async def run():
+        received = not_modified = 0
+        etag = None
+        reads = db.document_reads
+        async with asgi_client(main.app) as client:
+            for n in range(POLLS):
+                if n == POLLS // 2:
+                    bump_items_version(main, db)
+                    main.commit_in_batches([main.syllabi_version_op("u1")])
+                headers = {"If-None-Match": etag} if conditional and etag else {}
+                response = await client.get(path, headers=headers)
+                assert response.status_code in (200, 304)
+                etag = response.headers["etag"]
+                received += len(response.content)
+                not_modified += response.status_code == 304
+        return received, db.document_reads - reads, not_modified
+    return asyncio.run(run())
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("path", ["/syllabi/s1/items", "/syllabi/u1"])
+def test_polling_bandwidth_and_reads(main, db, syllabus, path, report):
+    plain_bytes, plain_reads, _ = poll(main, db, path, conditional=False)
+    etag_bytes, etag_reads, not_modified = poll(main, db, path, conditional=True)
+
+    report(
+        f"user-022 {path} polled {POLLS} times, data changing once",
+        plain_kb=plain_bytes / 1024,
+        etag_kb=etag_bytes / 1024,
+        plain_reads=plain_reads,
+        etag_reads=etag_reads,
+        not_modified=not_modified,
+    )
+    # Only the first poll and the one after the change carry a body
+    assert not_modified == POLLS - 2
+    assert etag_bytes * (POLLS // 2) <= plain_bytes * 1.1
+    assert etag_reads < plain_reads / 5
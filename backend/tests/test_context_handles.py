@@ -0,0 +1,96 @@
+"""Syllabus context handles against a fake backend: reuse, expiry and back-off after failures."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from main import ContextHandleExpired, ContextHandleUnsupported
+
+
+class FakeContextBackend:
+    def __init__(self, create_error=None):
+        self.create_error = create_error
+        self.live_handles = set()
+        self.created = 0
+        self.with_handle = 0
+        self.inline = 0
+
+    def create_handle(self, file_bytes, mime_type, display_name, ttl):
+        self.created += 1
+        if self.create_error is not None:
+            raise self.create_error
+        handle = f"cachedContents/{self.created}"
+        self.live_handles.add(handle)
+        return handle
+
+    def generate_with_handle(self, handle, contents, **kwargs):
+        if handle not in self.live_handles:
+            raise ContextHandleExpired(handle)
+        self.with_handle += 1
+        return f"answer from {handle}"
+
+    def generate_inline(self, file_bytes, mime_type, contents, **kwargs):
+        self.inline += 1
+        return "inline answer"
+
+
+def ask(main, db):
+    """One chat turn, reading the syllabus the way /chat does. Returns (response, file loads)."""
+    loads = []
+
+    async def load_file_bytes():
+        loads.append(1)
+        return b"syllabus"
+
+    async def run():
+        syllabus_data = await main.get_syllabus("s1")
+        return await main.generate_with_syllabus_context("s1", syllabus_data, "text/plain", ["question"], load_file_bytes)
+
+    return asyncio.run(run()), len(loads)
+
+
+@pytest.fixture
+def syllabus(db):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "name": "s.txt"})
+
+
+def test_handle_is_created_once_and_reused(main, db, monkeypatch, syllabus):
+    backend = FakeContextBackend()
+    monkeypatch.setattr(main, "context_backend", backend)
+
+    assert ask(main, db) == ("answer from cachedContents/1", 1)
+    # Later turns don't touch the file at all
+    assert ask(main, db) == ("answer from cachedContents/1", 0)
+    assert ask(main, db) == ("answer from cachedContents/1", 0)
+    assert (backend.created, backend.with_handle, backend.inline) == (1, 3, 0)
+
+
+def test_expired_handle_falls_back_and_is_replaced(main, db, monkeypatch, syllabus):
+    backend = FakeContextBackend()
+    monkeypatch.setattr(main, "context_backend", backend)
+    ask(main, db)
+    backend.live_handles.clear()
+
+    assert ask(main, db) == ("answer from cachedContents/2", 1)
+    assert ask(main, db) == ("answer from cachedContents/2", 0)
+
+
+@pytest.mark.parametrize("error, backoff_minutes", [
+    (google_exceptions.PermissionDenied("no caching permission"), 5),
+    (google_exceptions.ResourceExhausted("quota"), 5),
+    (ContextHandleUnsupported("document too small"), 60),
+])
+def test_failed_creation_is_not_retried_every_message(main, db, monkeypatch, syllabus, error, backoff_minutes):
+    backend = FakeContextBackend(create_error=error)
+    monkeypatch.setattr(main, "context_backend", backend)
+
+    for _ in range(3):
+        assert ask(main, db) == ("inline answer", 1)
+    assert backend.created == 1
+
+    marker = db.collection("syllabi").document("s1").get().get("context_handle")
+    assert marker["name"] is None
+    remaining = marker["expire_at"] - datetime.now(timezone.utc)
+    assert timedelta(minutes=backoff_minutes - 1) < remaining <= timedelta(minutes=backoff_minutes)
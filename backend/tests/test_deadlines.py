@@ -0,0 +1,129 @@
+"""GET /users/{user_id}/deadlines against the N+1 requests a client made before it existed."""
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import asgi_client
+
+SYLLABUS_COUNT = 8
+ITEMS_PER_SYLLABUS = 30
+FROM, TO = "2026-03-02", "2026-03-15"
+
+
+@pytest.fixture
+def semester(main, db):
+    """SYLLABUS_COUNT syllabi for u1, each with an item due every few days from January to May."""
+    async def store():
+        for s in range(SYLLABUS_COUNT):
+            syllabus_id = f"s{s}"
+            db.collection("syllabi").document(syllabus_id).set({"user_id": "u1", "name": f"Course {s}.pdf", "items_version": 0})
+            items = [
+                {
+                    "category": ["Homework", "Exams", "Quizzes"][n % 3],
+                    "name": f"Course {s} item {n}",
+                    "due_date": (date(2026, 1, 12) + timedelta(days=n * 4 + s % 4)).isoformat(),
+                }
+                for n in range(ITEMS_PER_SYLLABUS)
+            ]
+            items.append({"category": "Projects", "name": f"Course {s} project", "due_date": "TBD"})
+            await main.store_syllabus_items(syllabus_id, items, user_id="u1")
+        db.collection("syllabi").document("other").set({"user_id": "u2", "name": "Other.pdf", "items_version": 0})
+        await main.store_syllabus_items("other", [{"category": "Exams", "name": "Not mine", "due_date": "2026-03-05"}], user_id="u2")
+    asyncio.run(store())
+
+
+def in_range(item, category=None):
+    return FROM <= item["due_date"] <= TO and item["due_date"] != "TBD" and category in (None, item["category"])
+
+
+async def n_plus_one(client, category=None):
+    """List the syllabi, fetch every syllabus's items, then filter and sort them on the client."""
+    syllabi = await client.get("/syllabi/u1")
+    responses = await asyncio.gather(*(client.get(f"/syllabi/{syllabus['id']}/items") for syllabus in syllabi.json()))
+    items = [item for response in responses for item in response.json() if in_range(item, category)]
+    return sorted(items, key=lambda item: item["due_date"]), [syllabi, *responses]
+
+
+async def deadlines(client, query=""):
+    """Follow the deadlines endpoint's pages. Returns (deadlines, responses)."""
+    found, responses, token = [], [], None
+    while True:
+        cursor = f"&start_after={token}" if token else ""
+        response = await client.get(f"/users/u1/deadlines?from={FROM}&to={TO}{query}{cursor}")
+        assert response.status_code == 200
+        responses.append(response)
+        found += response.json()["deadlines"]
+        token = response.json()["next_page_token"]
+        if token is None:
+            return found, responses
+
+
+def run(main, fetch, *args):
+    async def go():
+        async with asgi_client(main.app) as client:
+            return await fetch(client, *args)
+    return asyncio.run(go())
+
+
+def test_deadlines_match_what_the_client_assembled(main, semester):
+    expected, _ = run(main, n_plus_one)
+    found, responses = run(main, deadlines)
+
+    assert [(item["id"], item["due_date"]) for item in found] == [(item["id"], item["due_date"]) for item in expected]
+    assert len(responses) == 1
+    assert found[0]["syllabus_name"] == f"Course {found[0]['syllabus_id'][1:]}.pdf"
+
+
+def test_deadlines_by_category_across_pages(main, semester):
+    expected, _ = run(main, n_plus_one, "Exams")
+    found, responses = run(main, deadlines, "&category=Exams&limit=3")
+
+    assert [item["id"] for item in found] == [item["id"] for item in expected]
+    assert len(responses) == -(-len(expected) // 3)
+
+
+@pytest.mark.parametrize("query, detail", [
+    ("from=2026-03-10&to=2026-03-01", "to must not be before from"),
+    ("from=Week 5", "from and to must be YYYY-MM-DD dates"),
+    ("to=TBD", "from and to must be YYYY-MM-DD dates"),
+    ("category=Chores", "Invalid category"),
+    ("limit=0", "limit must be between 1 and 200"),
+    ("start_after=missing", "Invalid start_after token"),
+])
+def test_bad_parameters_are_rejected(main, semester, query, detail):
+    async def go():
+        async with asgi_client(main.app) as client:
+            return await client.get(f"/users/u1/deadlines?{query}")
+
+    response = asyncio.run(go())
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+
+
+@pytest.mark.benchmark
+def test_deadlines_versus_n_plus_one(main, db, semester, monkeypatch, report):
+    db.latency = 0.005
+    numbers = {}
+    for name, fetch in [("n_plus_one", n_plus_one), ("deadlines", deadlines)]:
+        monkeypatch.setattr(main, "syllabus_cache", main.TTLCache(64, 30))
+        round_trips, reads = db.round_trips, db.document_reads
+        started = time.perf_counter()
+        found, responses = run(main, fetch)
+        numbers[f"{name}_ms"] = (time.perf_counter() - started) * 1000
+        numbers[f"{name}_requests"] = len(responses)
+        numbers[f"{name}_round_trips"] = db.round_trips - round_trips
+        numbers[f"{name}_reads"] = db.document_reads - reads
+        numbers[f"{name}_kb"] = sum(len(response.content) for response in responses) / 1024
+        numbers[f"{name}_results"] = len(found)
+
+    report(
+        f"user-024 next 2 weeks for {SYLLABUS_COUNT} syllabi x {ITEMS_PER_SYLLABUS + 1} items, 5ms per Firestore call",
+        **numbers,
+    )
+    assert numbers["deadlines_results"] == numbers["n_plus_one_results"]
+    assert numbers["deadlines_requests"] == 1 and numbers["n_plus_one_requests"] == SYLLABUS_COUNT + 1
+    assert numbers["deadlines_reads"] < numbers["n_plus_one_reads"] / 4
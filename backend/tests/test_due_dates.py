@@ -0,0 +1,199 @@
+"""Due date normalization at parse time and in the stored-item migration."""
+
+import asyncio
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import migrate_due_dates
+from migrate_due_dates import migrated_fields
+
+SYLLABUS_COUNT = 8
+ITEMS_PER_SYLLABUS = 31
+
+
+def test_normalize_due_date(main):
+    assert main.normalize_due_date("2026-03-10")[0] == "2026-03-10"
+    assert main.normalize_due_date("March 10, 2026")[0] == "2026-03-10"
+    assert main.normalize_due_date("Week 5") == ("TBD", None)
+    # Without a year, a date only resolves inside a known academic year
+    assert main.normalize_due_date("3/10") == ("TBD", None)
+    assert main.normalize_due_date("3/10", 2026)[0] == "2027-03-10"
+    assert main.normalize_due_date("Oct 2", 2026)[0] == "2026-10-02"
+
+
+def test_syllabus_academic_start_year(main):
+    assert main.syllabus_academic_start_year({"name": "CS101 Spring 2027.pdf", "upload_date": datetime(2026, 9, 1)}) == 2026
+    assert main.syllabus_academic_start_year({"name": "cs101.pdf", "upload_date": datetime(2027, 1, 12)}) == 2026
+    assert main.syllabus_academic_start_year({"name": "cs101.pdf", "upload_date": datetime(2026, 8, 20)}) == 2026
+    assert main.syllabus_academic_start_year({"name": "cs101.pdf"}) is None
+    assert main.syllabus_academic_start_year(None) is None
+
+
+def test_stored_items_keep_the_original_text(main, db):
+    db.collection("syllabi").document("s1").set({"user_id": "u1"})
+    stored, _ = asyncio.run(main.store_syllabus_items("s1", [
+        {"category": "Quizzes", "name": "Weekly quiz", "due_date": "Every Friday"},
+        {"category": "Exams", "name": "Midterm", "due_date": "10/14"},
+    ], user_id="u1", academic_start_year=2026))
+
+    quiz, midterm = stored
+    assert (quiz["due_date"], quiz["due_date_raw"], quiz["has_date"]) == ("TBD", "Every Friday", False)
+    assert (midterm["due_date"], midterm["due_date_raw"]) == ("2026-10-14", "10/14")
+
+
+def test_migration_keeps_raw_text_and_uses_the_syllabus_year():
+    syllabus = {"user_id": "u1", "name": "cs101.pdf", "upload_date": datetime(2027, 1, 12)}
+
+    fields = migrated_fields({"due_date": "Week 5"}, syllabus)
+    assert fields == {"due_date": "TBD", "due_date_raw": "Week 5", "due_at": None, "has_date": False, "user_id": "u1"}
+
+    fields = migrated_fields({"due_date": "3/10", "user_id": "u1"}, syllabus)
+    assert (fields["due_date"], fields["due_date_raw"]) == ("2027-03-10", "3/10")
+
+
+def test_migration_leaves_yearless_dates_of_deleted_syllabi_alone():
+    assert migrated_fields({"due_date": "3/10"}, None) == {}
+    assert migrated_fields({"due_date": "Week 5"}, None)["due_date_raw"] == "Week 5"
+
+
+def test_migration_is_idempotent():
+    syllabus = {"user_id": "u1", "name": "cs101.pdf", "upload_date": datetime(2027, 1, 12)}
+    item = {"due_date": "March 3", "user_id": "u1"}
+    item.update(migrated_fields(item, syllabus))
+    assert migrated_fields(item, syllabus) == {}
+
+
+
+@pytest.fixture
+def legacy_items(db):
+    """
+    Items as stored before normalization: the model's free-form due_date, no user_id or due_at.
+    Each syllabus has ITEMS_PER_SYLLABUS items in a spring 2026 term, in several date formats.
+    """
+    formats = [
+        lambda day: day.strftime("%Y-%m-%d"),
+        lambda day: f"{day:%B} {day.day}, {day.year}",
+        lambda day: f"{day.month}/{day.day}",
+        lambda day: "TBD",
+        lambda day: "Week 5",
+    ]
+    for s in range(SYLLABUS_COUNT):
+        db.collection("syllabi").document(f"s{s}").set({
+            "user_id": "u1", "name": f"Course {s} Spring 2026.pdf", "items_version": 1,
+            "upload_date": datetime(2026, 1, 5),
+        })
+        for n in range(ITEMS_PER_SYLLABUS):
+            day = datetime(2026, 1, 12) + timedelta(days=n * 4 + s % 4)
+            db.collection("syllabus_items").document(f"s{s}i{n:02d}").set({
+                "syllabus_id": f"s{s}", "category": "Homework", "name": f"Item {n}",
+                "due_date": formats[n % len(formats)](day),
+            })
+
+
+def run_migration(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["migrate_due_dates.py", *args])
+    migrate_due_dates.main()
+
+
+def test_interrupted_migration_resumes_from_its_checkpoint(main, db, legacy_items, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(migrate_due_dates, "time", types.SimpleNamespace(monotonic=time.monotonic, sleep=sleeps.append))
+    commit = migrate_due_dates.commit_in_batches
+    commits = []
+
+    def commit_then_fail(operations):
+        if len(commits) == 2:
+            raise KeyboardInterrupt
+        commits.append(len(operations))
+        return commit(operations)
+
+    monkeypatch.setattr(migrate_due_dates, "commit_in_batches", commit_then_fail)
+    with pytest.raises(KeyboardInterrupt):
+        run_migration(monkeypatch, "--batch-size", "50")
+    checkpoint = db.docs("migrations")["normalize_due_dates"]
+    assert (checkpoint["scanned"], checkpoint["done"]) == (100, False)
+
+    monkeypatch.setattr(migrate_due_dates, "commit_in_batches", commit)
+    run_migration(monkeypatch, "--batch-size", "50")
+
+    items = db.docs("syllabus_items")
+    assert db.docs("migrations")["normalize_due_dates"]["done"] is True
+    assert all(item["user_id"] == "u1" for item in items.values())
+    assert {item["due_date_raw"] for item in items.values()} >= {"TBD", "Week 5", "1/20"}
+    assert items["s0i02"]["due_date"] == "2026-01-20"
+    # Three of every five date formats are readable
+    assert sum(item["has_date"] for item in items.values()) == SYLLABUS_COUNT * sum(n % 5 < 3 for n in range(ITEMS_PER_SYLLABUS))
+    # Every batch wrote items, and waited long enough to stay under 100 writes a second
+    assert len(sleeps) == -(-SYLLABUS_COUNT * ITEMS_PER_SYLLABUS // 50)
+    assert all(0 < pause <= 1 for pause in sleeps)
+
+    # A run after completion changes nothing
+    versions = {doc_id: doc["items_version"] for doc_id, doc in db.docs("syllabi").items()}
+    run_migration(monkeypatch, "--batch-size", "50", "--restart")
+    assert {doc_id: doc["items_version"] for doc_id, doc in db.docs("syllabi").items()} == versions
+
+
+def range_read_before(main, db, start, end):
+    """
+    What a reader had to do before: read every item of every one of the user's syllabi, then
+    parse the free-form due dates to filter and sort them itself.
+    """
+    syllabi = list(db.collection("syllabi").where("user_id", "==", "u1").stream())
+    with ThreadPoolExecutor(len(syllabi)) as pool:
+        item_lists = pool.map(
+            lambda syllabus: list(db.collection("syllabus_items").where("syllabus_id", "==", syllabus.id).stream()),
+            syllabi,
+        )
+    due = []
+    for syllabus, docs in zip(syllabi, item_lists):
+        year = main.syllabus_academic_start_year(syllabus.to_dict())
+        for doc in docs:
+            _, due_at = main.normalize_due_date(doc.get("due_date"), year)
+            if due_at is not None and start <= due_at < end:
+                due.append((due_at, doc.id))
+    return [doc_id for _, doc_id in sorted(due)]
+
+
+def range_read_after(db, start, end):
+    """One range query on the typed due_at, sorted by Firestore."""
+    query = (
+        db.collection("syllabus_items").where("user_id", "==", "u1")
+        .where("due_at", ">=", start).where("due_at", "<", end).order_by("due_at")
+    )
+    return [doc.id for doc in query.stream()]
+
+
+@pytest.mark.benchmark
+def test_sorted_range_read_before_and_after_migration(main, db, legacy_items, monkeypatch, report):
+    start = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    end = start + timedelta(days=14)
+    db.latency = 0.005
+    numbers = {}
+
+    for name, read in [("before", lambda: range_read_before(main, db, start, end)), ("after", lambda: range_read_after(db, start, end))]:
+        if name == "after":
+            db.latency = 0.0
+            run_migration(monkeypatch, "--max-writes-per-second", "1000000")
+            db.latency = 0.005
+        round_trips, reads = db.round_trips, db.document_reads
+        started = time.perf_counter()
+        numbers[f"{name}_ids"] = read()
+        numbers[f"{name}_ms"] = (time.perf_counter() - started) * 1000
+        numbers[f"{name}_round_trips"] = db.round_trips - round_trips
+        numbers[f"{name}_reads"] = db.document_reads - reads
+
+    before_ids, after_ids = numbers.pop("before_ids"), numbers.pop("after_ids")
+    report(
+        f"user-025 two-week sorted range read, {SYLLABUS_COUNT} syllabi x {ITEMS_PER_SYLLABUS} items, 5ms per Firestore call",
+        results=len(after_ids),
+        **numbers,
+    )
+    # The same items in the same order (Firestore breaks due_at ties by document ID)
+    assert after_ids == before_ids and after_ids
+    assert numbers["after_reads"] == len(after_ids)
+    assert numbers["after_reads"] < numbers["before_reads"] / 4
@@ -0,0 +1,116 @@
+"""FileBytesCache tiers and locking, and a chat conversation against the fake bucket."""
+
+import asyncio
+import builtins
+import threading
+import time
+
+import pytest
+
+from conftest import FakeModel, asgi_client
+
+MESSAGES = 20
+
+
+def test_spilled_entry_is_read_back_from_disk_and_promoted(main, tmp_path):
+    cache = main.FileBytesCache(max_bytes=10, disk_dir=str(tmp_path), disk_max_bytes=100)
+    cache.put(("a", 1), b"aaaaaaaa")
+    cache.put(("b", 1), b"bbbbbbbb")  # Pushes a to disk
+
+    assert len(list(tmp_path.iterdir())) == 1
+    assert cache.get(("a", 1)) == b"aaaaaaaa"  # Promoting a pushes b to disk
+    assert cache.get(("b", 1)) == b"bbbbbbbb"
+    assert cache.get(("c", 1)) is None
+    stats = cache.snapshot()
+    assert (stats["disk_hits"], stats["spills"], stats["misses"], stats["disk_entries"]) == (2, 3, 1, 1)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_entries_too_big_for_either_tier_are_dropped(main, tmp_path):
+    cache = main.FileBytesCache(max_bytes=4, disk_dir=str(tmp_path), disk_max_bytes=8)
+    cache.put(("big", 1), b"x" * 9)
+    assert cache.get(("big", 1)) is None
+    assert cache.snapshot()["evictions"] == 1
+
+    memory_only = main.FileBytesCache(max_bytes=4)
+    memory_only.put(("a", 1), b"")
+    memory_only.put(("b", 1), b"x" * 5)
+    assert memory_only.get(("a", 1)) == b""
+    assert memory_only.get(("b", 1)) is None
+
+
+def test_disk_reads_do_not_block_memory_hits(main, tmp_path, monkeypatch):
+    cache = main.FileBytesCache(max_bytes=10, disk_dir=str(tmp_path), disk_max_bytes=100)
+    cache.put(("cold", 1), b"cccccccc")
+    cache.put(("hot", 1), b"hhhhhhhh")
+    reading = threading.Event()
+    release = threading.Event()
+
+    def slow_open(*args, **kwargs):
+        reading.set()
+        release.wait(5)
+        return builtins.open(*args, **kwargs)
+
+    monkeypatch.setattr(main, "open", slow_open, raising=False)
+    cold_read = threading.Thread(target=cache.get, args=(("cold", 1),))
+    cold_read.start()
+    try:
+        assert reading.wait(5)
+        started = time.perf_counter()
+        assert cache.get(("hot", 1)) == b"hhhhhhhh"
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        cold_read.join()
+    monkeypatch.delattr(main, "open")
+    assert cache.get(("cold", 1)) == b"cccccccc"
+
+
+@pytest.fixture
+def conversation(main, db, bucket, monkeypatch):
+    monkeypatch.setattr(main, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(main, "model", FakeModel(lambda contents: "The midterm is on March 10."))
+    monkeypatch.setattr(main, "file_cache", main.FileBytesCache(max_bytes=8 * 1024 * 1024))
+    file_path = "syllabi/u1/s.pdf"
+    bucket.files[file_path] = b"%PDF-1.4 " + b"x" * (2 * 1024 * 1024)
+    bucket.download_latency = 0.02
+    db.collection("syllabi").document("s1").set({
+        "user_id": "u1",
+        "name": "s.pdf",
+        "file_path": file_path,
+        "file_url": "https://storage.test/s.pdf",
+        "file_type": ".pdf",
+    })
+
+    def chat():
+        async def run():
+            async with asgi_client(main.app) as client:
+                started = time.perf_counter()
+                for n in range(MESSAGES):
+                    response = await client.post("/chat", json={"user_id": "u1", "message": f"Question {n}", "syllabus_id": "s1"})
+                    assert response.status_code == 200
+                return (time.perf_counter() - started) * 1000 / MESSAGES
+        return asyncio.run(run())
+
+    return chat
+
+
+@pytest.mark.benchmark
+def test_conversation_downloads_the_file_once(main, bucket, conversation, monkeypatch, report):
+    cached_ms = conversation()
+    cached_downloads = bucket.downloads
+    assert cached_downloads == 1
+    assert main.file_cache.snapshot()["memory_hits"] == MESSAGES - 1
+
+    bucket.downloads = 0
+    monkeypatch.setattr(main, "file_cache", main.FileBytesCache(max_bytes=0))
+    uncached_ms = conversation()
+
+    report(
+        "user-006 20-message chat, 2MB file, 20ms download",
+        cached_ms_per_message=cached_ms,
+        uncached_ms_per_message=uncached_ms,
+        cached_downloads=cached_downloads,
+        uncached_downloads=bucket.downloads,
+    )
+    assert bucket.downloads == MESSAGES
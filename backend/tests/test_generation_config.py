@@ -0,0 +1,57 @@
+"""Parsing generation config, checked by building requests with the real (pinned) Vertex SDK offline."""
+
+from vertexai.generative_models import GenerativeModel
+from vertexai.preview.generative_models import GenerativeModel as PreviewGenerativeModel
+
+
+def type_name(schema) -> str:
+    # The GA and preview models build requests from different proto versions, so compare enum names
+    return schema.type_.name
+
+
+def assert_syllabus_schema(request, main):
+    config = request.generation_config
+    assert config.response_mime_type == "application/json"
+    assert type_name(config.response_schema) == "OBJECT"
+    assert list(config.response_schema.required) == ["items"]
+
+    items = config.response_schema.properties["items"]
+    assert type_name(items) == "ARRAY"
+    assert type_name(items.items) == "OBJECT"
+    assert sorted(items.items.required) == ["category", "due_date", "name"]
+
+    category = items.items.properties["category"]
+    assert type_name(category) == "STRING"
+    assert list(category.enum) == main.VALID_CATEGORIES
+
+
+def test_single_call_request_builds(main):
+    request = main.model._prepare_request(
+        contents=[main.SYLLABUS_PARSING_PROMPT],
+        **main.parsing_generation_kwargs()
+    )
+    assert_syllabus_schema(request, main)
+
+
+def test_cached_content_model_request_builds(main):
+    # Handle-backed parses go through the preview model class
+    request = PreviewGenerativeModel(main.MODEL_NAME)._prepare_request(
+        contents=[main.SYLLABUS_PARSING_PROMPT],
+        **main.parsing_generation_kwargs()
+    )
+    assert_syllabus_schema(request, main)
+
+
+def test_plain_dict_config_is_rejected_by_the_sdk(main):
+    # Guards the reason parsing_generation_kwargs builds a GenerationConfig
+    config = {"response_mime_type": "application/json", "response_schema": main.SYLLABUS_RESPONSE_SCHEMA}
+    try:
+        GenerativeModel(main.MODEL_NAME)._prepare_request(contents=["x"], generation_config=config)
+    except KeyError:
+        return
+    raise AssertionError("plain dict schemas are accepted now; parsing_generation_kwargs could be simplified")
+
+
+def test_free_text_mode_sends_no_config(main, monkeypatch):
+    monkeypatch.setattr(main, "STRUCTURED_OUTPUT_ENABLED", False)
+    assert main.parsing_generation_kwargs() == {}
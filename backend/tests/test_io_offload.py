@@ -0,0 +1,57 @@
+"""Concurrent request throughput on one worker with Firestore calls on the I/O pool versus on the event loop."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import asgi_client
+
+REQUESTS = 100
+LATENCY = 0.005
+
+
+def inline_run_io(func, *args, **kwargs):
+    """run_io as it was before the I/O pool: the blocking call runs on the event loop."""
+    async def call():
+        return func(*args, **kwargs)
+    return call()
+
+
+@pytest.fixture
+def slow_firestore(main, db):
+    for n in range(10):
+        db.collection("syllabi").document(f"s{n}").set({"user_id": "u1", "name": f"s{n}.txt", "items_version": 1})
+        for i in range(5):
+            db.collection("syllabus_items").document(f"s{n}-{i}").set({"syllabus_id": f"s{n}", "name": f"HW {i}"})
+    db.latency = LATENCY
+    return db
+
+
+def requests_per_second(main):
+    async def run():
+        async with asgi_client(main.app) as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.get(f"/syllabi/s{n % 10}/items") for n in range(REQUESTS)
+            ))
+            elapsed = time.perf_counter() - started
+        assert all(response.status_code == 200 and len(response.json()) == 5 for response in responses)
+        return REQUESTS / elapsed
+
+    return asyncio.run(run())
+
+
+@pytest.mark.benchmark
+def test_io_pool_raises_concurrent_throughput(main, slow_firestore, monkeypatch, report):
+    offloaded = requests_per_second(main)
+    monkeypatch.setattr(main, "run_io", inline_run_io)
+    inline = requests_per_second(main)
+
+    report(
+        "user-002 GET /syllabi/{id}/items req/s, 100 concurrent, 5ms per Firestore call",
+        io_pool=offloaded,
+        on_event_loop=inline,
+        speedup=offloaded / inline,
+    )
+    assert offloaded > inline * 3
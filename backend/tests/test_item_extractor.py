@@ -0,0 +1,105 @@
+"""IncrementalItemExtractor fuzzed with random responses split into random chunks."""
+
+import json
+import random
+
+import pytest
+
+from main import IncrementalItemExtractor, ParsedSyllabusItem, extract_items
+
+NAME_PIECES = [
+    "Quiz 1", "Midterm", 'The "Big" Essay', "Lab {3}", "Problem set [4]", "C:\\path\\hw",
+    "Unit 2: \\\"escaped\\\"", "Résumé draft", "Final ] exam", "Project } report", "tab\there", "新しい課題",
+]
+PREAMBLES = ["", "Here are the items:\n", "```json\n", "Sure! {not json} here you go:\n```\n"]
+TRAILERS = ["", "\n```", "\n```\nLet me know if you need {anything} else [ever].", "\nNote: dates are estimates."]
+
+
+def random_item(rng):
+    item = {
+        "category": rng.choice(["Exams", "Homework", "Quizzes", "Essays", "Made Up"]),
+        "name": rng.choice(NAME_PIECES) + rng.choice(["", " (graded)", "  "]),
+        "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+    if rng.random() < 0.2:
+        item["notes"] = {"weight": [rng.randint(1, 30), "}"], "text": "a [nested] {value}"}
+    return item
+
+
+def random_response(rng):
+    """A response in one of the shapes the model produces, with the items it should yield."""
+    parts = []
+    expected = []
+    for _ in range(rng.randint(0, 8)):
+        kind = rng.random()
+        if kind < 0.7:
+            item = random_item(rng)
+            parts.append(json.dumps(item, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2])))
+            expected.append(ParsedSyllabusItem.model_validate(item).model_dump())
+        elif kind < 0.8:
+            # Missing comma: balanced, but not JSON
+            parts.append('{"category": "Homework", "name": "bad" "due_date": "2025-01-01"}')
+        elif kind < 0.9:
+            parts.append(json.dumps({"category": "Exams", "name": "   ", "due_date": "2025-01-01"}))
+        else:
+            parts.append(json.dumps({"category": "Exams", "name": "No date"}))
+    separator = rng.choice([",", ", ", ",\n  "])
+    body = json.dumps({"course": "CS {101} [fall]"})[:-1] + ', "items": [' + separator.join(parts) + "]}"
+    return rng.choice(PREAMBLES) + body + rng.choice(TRAILERS), expected
+
+
+def split_randomly(rng, text):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 40))))
+    if rng.random() < 0.1:
+        cuts = list(range(1, len(text)))  # One character at a time
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def stream(chunks):
+    extractor = IncrementalItemExtractor()
+    returned = []
+    for chunk in chunks:
+        returned.extend(extractor.feed(chunk))
+    returned.extend(extractor.finish())
+    return extractor, returned
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_random_splits_yield_the_same_items(seed):
+    rng = random.Random(seed)
+    text, expected = random_response(rng)
+
+    extractor, returned = stream(split_randomly(rng, text))
+
+    assert extractor.items == expected
+    assert returned == expected
+    assert extract_items(text) == expected
+
+
+def test_items_are_returned_as_soon_as_they_close():
+    first = {"category": "Quizzes", "name": "Quiz 1", "due_date": "2025-02-10"}
+    second = {"category": "Exams", "name": "Midterm", "due_date": "2025-03-10"}
+    extractor = IncrementalItemExtractor()
+
+    assert extractor.feed('{"items": [' + json.dumps(first)) == [first]
+    assert extractor.feed(", " + json.dumps(second)[:-1]) == []
+    assert extractor.feed("}]}") == [second]
+
+
+def test_escape_split_across_chunks():
+    item = {"category": "Homework", "name": 'Read "Dune" \\ ch. 1}', "due_date": "2025-04-01"}
+    text = '{"items": [' + json.dumps(item) + "]}"
+    backslash = text.index("\\")
+    assert stream([text[:backslash + 1], text[backslash + 1:]])[1] == [item]
+
+
+def test_truncated_response_keeps_the_complete_items():
+    item = {"category": "Homework", "name": "HW 1", "due_date": "2025-04-01"}
+    extractor, returned = stream(['{"items": [' + json.dumps(item) + ', {"category": "Exams", "na'])
+    assert returned == [item]
+
+
+def test_response_without_an_items_array_falls_back_to_a_full_parse():
+    assert stream(['```json\n{"message": "No dated items found."}\n```'])[1] == []
+    with pytest.raises(json.JSONDecodeError):
+        stream(["I could not find any assignments."])
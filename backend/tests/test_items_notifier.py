@@ -0,0 +1,45 @@
+"""Item change notifiers behind the /syllabi/{id}/items/wait long poll."""
+
+import asyncio
+import threading
+
+
+def test_in_process_notifier_wakes_waiters(main):
+    async def run():
+        notifier = main.InProcessItemsNotifier()
+        event = await notifier.subscribe("s1")
+        notifier.publish("s2")
+        assert not event.is_set()
+        notifier.publish("s1")
+        assert event.is_set()
+        await notifier.unsubscribe("s1", event)
+        assert notifier.waiting() == 0
+
+    asyncio.run(run())
+
+
+def test_firestore_watches_start_and_stop_off_the_event_loop(main, db):
+    async def run():
+        notifier = main.FirestoreItemsNotifier()
+        first, second = await asyncio.gather(notifier.subscribe("s1"), notifier.subscribe("s1"))
+        watches = [watch for path in ("syllabi/s1", "parse_jobs/s1") for watch in db.watches[path]]
+        # Concurrent waiters share one watch per document
+        assert len(watches) == 2
+
+        # A write elsewhere fires the snapshot callback on a listener thread
+        listener = threading.Thread(target=watches[0].callback, args=([], [], None))
+        listener.start()
+        listener.join()
+        await asyncio.wait_for(first.wait(), 1)
+        assert second.is_set()
+
+        await notifier.unsubscribe("s1", first)
+        assert all(watch.stopped_on is None for watch in watches)
+        await notifier.unsubscribe("s1", second)
+        return watches, threading.current_thread().name
+
+    watches, loop_thread = asyncio.run(run())
+    for watch in watches:
+        assert watch.started_on != loop_thread
+        assert watch.stopped_on is not None and watch.stopped_on != loop_thread
+    assert db.watches == {"syllabi/s1": [], "parse_jobs/s1": []}
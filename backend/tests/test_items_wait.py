@@ -0,0 +1,105 @@
+"""The /syllabi/{id}/items/wait long poll, and how many requests it saves over polling /items."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import asgi_client
+
+PARSE_SECONDS = 1.5
+POLL_INTERVAL = 0.1  # Polling once a second against a 15 second parse, a tenth of the scale
+
+
+@pytest.fixture
+def parsing(main, db):
+    """A syllabus whose parse job is running; finish() stores its items."""
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "name": "s.pdf", "items_version": 0})
+    db.collection("parse_jobs").document("s1").set({"syllabus_id": "s1", "status": "running"})
+
+    async def finish(delay):
+        await asyncio.sleep(delay)
+        items = [{"category": "Exams", "name": "Midterm Exam", "due_date": "2025-03-17"}]
+        await main.store_syllabus_items("s1", items, user_id="u1")
+        return time.perf_counter()
+
+    return finish
+
+
+@pytest.mark.parametrize("timeout", ["nan", "NaN", "inf", "-inf"])
+def test_non_finite_timeout_is_rejected(main, parsing, timeout):
+    async def run():
+        async with asgi_client(main.app) as client:
+            return await asyncio.wait_for(client.get(f"/syllabi/s1/items/wait?timeout={timeout}"), 1)
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "timeout must be a finite number of seconds"
+
+
+def test_wait_returns_when_the_items_are_stored(main, parsing):
+    async def run():
+        async with asgi_client(main.app) as client:
+            response, _ = await asyncio.gather(client.get("/syllabi/s1/items/wait?timeout=5"), parsing(0.05))
+            return response.json()
+
+    body = asyncio.run(run())
+
+    assert (body["changed"], body["items_version"]) == (True, 1)
+    assert [item["name"] for item in body["items"]] == ["Midterm Exam"]
+
+
+def test_wait_times_out_without_a_change(main, parsing):
+    async def run():
+        async with asgi_client(main.app) as client:
+            return (await client.get("/syllabi/s1/items/wait?timeout=0.05")).json()
+
+    assert asyncio.run(run()) == {"changed": False, "items_version": 0, "parse_status": "running", "items": None}
+
+
+async def poll_items(client):
+    """Poll /items until it has items. Returns (requests, time the items arrived)."""
+    requests = 0
+    while True:
+        requests += 1
+        response = await client.get("/syllabi/s1/items")
+        if response.json():
+            return requests, time.perf_counter()
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def long_poll_items(client):
+    """Call /items/wait until it reports the items. Returns (requests, time the items arrived)."""
+    requests = 0
+    while True:
+        requests += 1
+        response = await client.get("/syllabi/s1/items/wait")
+        if response.json()["changed"]:
+            return requests, time.perf_counter()
+
+
+@pytest.mark.benchmark
+def test_long_poll_versus_polling(main, db, parsing, report):
+    numbers = {}
+    for name, follow in [("polling", poll_items), ("long_poll", long_poll_items)]:
+        db.collection("syllabi").document("s1").update({"items_version": 0})
+        db.docs("syllabus_items").clear()
+        reads = db.document_reads
+
+        async def run():
+            async with asgi_client(main.app) as client:
+                return await asyncio.gather(follow(client), parsing(PARSE_SECONDS))
+
+        (requests, seen_at), stored_at = asyncio.run(run())
+        numbers[f"{name}_requests"] = requests
+        numbers[f"{name}_reads"] = db.document_reads - reads
+        numbers[f"{name}_delay_ms"] = (seen_at - stored_at) * 1000
+
+    report(
+        f"user-023 following a {PARSE_SECONDS}s parse, polling every {POLL_INTERVAL * 1000:.0f}ms vs long poll",
+        **numbers,
+    )
+    assert numbers["long_poll_requests"] == 1
+    assert numbers["polling_requests"] >= PARSE_SECONDS / POLL_INTERVAL * 0.8
+    assert numbers["long_poll_delay_ms"] < POLL_INTERVAL * 1000
@@ -0,0 +1,89 @@
+"""Read latency while parses wait on a slow model, with model calls on the LLM pool versus on the event loop."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from conftest import FakeModel, asgi_client, percentile
+
+PARSES = 50
+CHUNK_DELAY = 0.02
+RESPONSE = json.dumps({"items": [
+    {"category": "Homework", "name": "HW 1", "due_date": "2025-10-01"},
+    {"category": "Exams", "name": "Midterm", "due_date": "2025-10-15"},
+]})
+
+
+@pytest.fixture
+def slow_parses(main, db, monkeypatch):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    monkeypatch.setattr(main, "PARSE_MODE", "single")
+    fake_model = FakeModel(lambda contents: RESPONSE, stream_chunk_size=64, chunk_delay=CHUNK_DELAY)
+    monkeypatch.setattr(main, "model", fake_model)
+    for n in range(PARSES):
+        db.collection("syllabi").document(f"s{n}").set({"user_id": "u1", "name": f"s{n}.txt", "items_version": 0})
+    return fake_model
+
+
+def blocking_generate_content(main):
+    """generate_content_async as it was before the LLM pool: the whole call runs on the event loop."""
+    async def generate(contents, **kwargs):
+        return list(main.model.generate_content(contents, **kwargs))
+    return generate
+
+
+def read_latencies(main, with_parses):
+    """
+    Latencies (ms) of back-to-back GET /syllabi/u1 calls, for as long as the parses are running.
+    Parses arrive a millisecond apart, so up to all 50 are waiting on the model at once.
+    """
+    async def start_parses():
+        parses = []
+        for n in range(PARSES if with_parses else 0):
+            parses.append(asyncio.create_task(main.parse_syllabus_with_ai(
+                syllabus_id=f"s{n}",
+                file_bytes=f"syllabus {n}".encode(),
+                mime_type="text/plain",
+                syllabus_name=f"s{n}.txt"
+            )))
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*parses)
+
+    async def run():
+        latencies = []
+        parses = asyncio.create_task(start_parses())
+        async with asgi_client(main.app) as client:
+            while len(latencies) < 20 or not parses.done():
+                started = time.perf_counter()
+                response = await client.get("/syllabi/u1")
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+        await parses
+        return latencies
+
+    return asyncio.run(run())
+
+
+@pytest.mark.benchmark
+def test_reads_stay_fast_while_50_parses_are_in_flight(main, slow_parses, monkeypatch, report):
+    model_call_ms = CHUNK_DELAY * 2 * 1000  # Three chunks, a delay before each after the first
+    idle = read_latencies(main, with_parses=False)
+    offloaded = read_latencies(main, with_parses=True)
+    assert len(slow_parses.calls) == PARSES
+
+    monkeypatch.setattr(main, "generate_content_async", blocking_generate_content(main))
+    monkeypatch.setattr(main, "parse_cache", main.InMemoryParseCache(16))
+    blocking = read_latencies(main, with_parses=True)
+
+    report(
+        "user-001 GET /syllabi/{user_id} p99 ms",
+        idle=percentile(idle, 99),
+        llm_pool=percentile(offloaded, 99),
+        on_event_loop=percentile(blocking, 99),
+        reads_llm_pool=len(offloaded),
+        reads_on_event_loop=len(blocking),
+    )
+    assert percentile(offloaded, 99) < model_call_ms
+    assert percentile(blocking, 99) >= model_call_ms
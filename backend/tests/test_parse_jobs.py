@@ -0,0 +1,100 @@
+"""Parse job claiming, leases and recovery of jobs left behind by a previous process."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+
+def store_job(main, db, job_id, **fields):
+    job = main.new_parse_job(job_id, {"user_id": "u1", "name": "s.txt", "file_path": f"syllabi/u1/{job_id}.txt"}, "text/plain")
+    job.update(fields)
+    db.collection("parse_jobs").document(job_id).set(job)
+    return job
+
+
+def job_status(db, job_id):
+    return db.collection("parse_jobs").document(job_id).get().get("status")
+
+
+def expired():
+    return datetime.now(timezone.utc) - timedelta(seconds=1)
+
+
+def test_queued_job_is_claimed_once(main, db):
+    store_job(main, db, "j1")
+    assert main.claim_parse_job("j1")
+    assert job_status(db, "j1") == "running"
+    assert not main.claim_parse_job("j1")
+
+
+def test_only_expired_leases_are_reclaimed(main, db):
+    store_job(main, db, "live", status="running", lease_expires_at=main.new_parse_job_lease())
+    store_job(main, db, "dead", status="running", lease_expires_at=expired())
+    store_job(main, db, "backoff", status="retrying", lease_expires_at=expired(), attempts=1)
+    store_job(main, db, "done", status="succeeded", lease_expires_at=expired())
+
+    assert sorted(main.find_claimable_parse_jobs(10)) == ["backoff", "dead"]
+    assert not main.claim_parse_job("live")
+    assert not main.claim_parse_job("done")
+    assert main.claim_parse_job("dead")
+    assert main.claim_parse_job("backoff")
+
+
+def test_jobs_without_a_lease_fall_back_to_updated_at(main, db):
+    store_job(main, db, "old", status="running", lease_expires_at=None, updated_at=datetime.now(timezone.utc) - timedelta(hours=1))
+    store_job(main, db, "recent", status="running", lease_expires_at=None, updated_at=datetime.now(timezone.utc))
+    assert main.find_claimable_parse_jobs(10) == ["old"]
+
+
+def test_startup_recovery_runs_orphaned_jobs(main, db, monkeypatch):
+    parsed = []
+
+    async def fake_parse(**kwargs):
+        parsed.append(kwargs["syllabus_id"])
+        return [{"name": "Quiz 1"}]
+
+    async def fake_load(file_path):
+        return b"syllabus"
+
+    monkeypatch.setattr(main, "parse_syllabus_with_ai", fake_parse)
+    monkeypatch.setattr(main, "load_syllabus_file", fake_load)
+    for syllabus_id in ("queued", "orphaned"):
+        db.collection("syllabi").document(syllabus_id).set({"user_id": "u1", "name": "s.txt"})
+    store_job(main, db, "queued")
+    store_job(main, db, "orphaned", status="retrying", attempts=1, lease_expires_at=expired())
+
+    async def run():
+        queue = main.ParseJobQueue(concurrency=2)
+        queue.start()
+        try:
+            for _ in range(100):
+                if all(job_status(db, job_id) == "succeeded" for job_id in ("queued", "orphaned")):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+    assert sorted(parsed) == ["orphaned", "queued"]
+    assert db.collection("parse_jobs").document("orphaned").get().get("attempts") == 2
+
+
+def test_reclaimed_job_without_attempts_left_fails(main, db, monkeypatch):
+    async def fake_parse(**kwargs):
+        raise AssertionError("no attempts should be left")
+
+    monkeypatch.setattr(main, "parse_syllabus_with_ai", fake_parse)
+    store_job(main, db, "j1", status="running", attempts=main.PARSE_JOB_MAX_ATTEMPTS, lease_expires_at=expired())
+
+    assert main.claim_parse_job("j1")
+    asyncio.run(main.run_parse_job("j1"))
+    assert job_status(db, "j1") == "failed"
+
+
+def test_queue_holds_each_job_id_once(main):
+    async def run():
+        queue = main.ParseJobQueue(concurrency=1)
+        await queue.enqueue("j1")
+        await queue.enqueue("j1")
+        return queue.pending()
+
+    assert asyncio.run(run()) == 1
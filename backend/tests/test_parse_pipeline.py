@@ -0,0 +1,150 @@
+"""parse_syllabus_with_ai end to end against a fake model: caching, chunking and storing items."""
+
+import asyncio
+import hashlib
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import FakeModel
+
+SYLLABUS_TEXT = "\n\n".join(
+    f"Unit {n}: reading and discussion for the week, with problem sets and lab work" * 3
+    for n in range(1, 9)
+).encode("utf-8")
+
+
+def items_json(*names):
+    return json.dumps({"items": [{"category": "Homework", "name": name, "due_date": "2025-10-01"} for name in names]})
+
+
+@pytest.fixture
+def chunked(main, monkeypatch):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    monkeypatch.setattr(main, "PARSE_MODE", "chunked")
+    monkeypatch.setattr(main, "PARSE_CHUNK_CHARS", 600)
+
+
+def parse(main, db, file_bytes=SYLLABUS_TEXT, **kwargs):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "name": "s.txt", "items_version": 0})
+    return asyncio.run(main.parse_syllabus_with_ai(
+        syllabus_id="s1",
+        file_bytes=file_bytes,
+        mime_type="text/plain",
+        syllabus_name="s.txt",
+        **kwargs
+    ))
+
+
+def cache_key(main, file_bytes=SYLLABUS_TEXT):
+    return main.parse_cache_key(hashlib.sha256(file_bytes).hexdigest(), "text/plain")
+
+
+def test_failed_chunk_is_stored_but_not_cached(main, db, monkeypatch, chunked):
+    responses = iter([items_json("HW 1"), "not json at all", items_json("HW 2")])
+    monkeypatch.setattr(main, "model", FakeModel(lambda contents: next(responses, items_json("HW 3"))))
+    timings = {}
+
+    items = parse(main, db, timings=timings)
+
+    assert timings["chunks"] > 2
+    assert timings["failed_chunks"] == 1
+    assert len(items) >= 2
+    assert main.parse_cache.get(cache_key(main)) is None
+
+
+def test_every_chunk_failing_fails_the_parse(main, db, monkeypatch, chunked):
+    monkeypatch.setattr(main, "model", FakeModel(lambda contents: "Sorry, I can't help with that."))
+
+    with pytest.raises(main.HTTPException):
+        parse(main, db)
+    assert main.parse_cache.get(cache_key(main)) is None
+    assert db.docs("syllabus_items") == {}
+
+
+def test_complete_chunked_parse_is_cached(main, db, monkeypatch, chunked):
+    monkeypatch.setattr(main, "model", FakeModel(lambda contents: items_json("HW 1")))
+
+    parse(main, db)
+
+    assert main.parse_cache.get(cache_key(main)) == [{"category": "Homework", "name": "HW 1", "due_date": "2025-10-01"}]
+
+
+def test_empty_result_is_not_cached(main, db, monkeypatch):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    fake_model = FakeModel(lambda contents: json.dumps({"items": []}))
+    monkeypatch.setattr(main, "model", fake_model)
+
+    assert parse(main, db) == []
+    assert main.parse_cache.get(cache_key(main)) is None
+
+    # A second parse of the same file asks the model again
+    parse(main, db)
+    assert len(fake_model.calls) == 2
+
+
+@pytest.mark.parametrize("setting, value", [
+    ("PARSE_MODE", "chunked"),
+    ("RULE_PARSER_ENABLED", False),
+    ("RULE_PARSER_MIN_CONFIDENCE", 0.5),
+])
+def test_parse_settings_change_the_cache_key(main, monkeypatch, setting, value):
+    before = cache_key(main)
+    monkeypatch.setattr(main, setting, value)
+    assert cache_key(main) != before
+
+
+def test_result_cached_under_another_parse_mode_is_not_served(main, db, monkeypatch):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    monkeypatch.setattr(main, "PARSE_MODE", "single")
+    fake_model = FakeModel(lambda contents: items_json("HW 1"))
+    monkeypatch.setattr(main, "model", fake_model)
+    parse(main, db)
+
+    monkeypatch.setattr(main, "PARSE_MODE", "chunked")
+    parse(main, db)
+    assert len(fake_model.calls) > 1
+
+
+def upload(client, filename, file_bytes=SYLLABUS_TEXT):
+    response = client.post(
+        "/syllabi/upload",
+        files={"file": (filename, file_bytes, "text/plain")},
+        data={"user_id": "u1"}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def wait_for_parse(client, syllabus_id):
+    for _ in range(200):
+        status = client.get(f"/syllabi/{syllabus_id}/parse-status").json()["status"]
+        if status in ("succeeded", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"parse of {syllabus_id} did not finish")
+
+
+def test_second_upload_of_the_same_file_makes_no_model_calls(main, db, bucket, monkeypatch):
+    monkeypatch.setattr(main, "RULE_PARSER_ENABLED", False)
+    monkeypatch.setattr(main, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(main, "PARSE_MODE", "single")
+    monkeypatch.setattr(main, "parse_job_queue", main.ParseJobQueue(concurrency=1))
+    fake_model = FakeModel(lambda contents: items_json("HW 1", "HW 2"))
+    monkeypatch.setattr(main, "model", fake_model)
+
+    with TestClient(main.app) as client:
+        first = upload(client, "first.txt")
+        assert wait_for_parse(client, first) == "succeeded"
+        second = upload(client, "second.txt")
+        assert wait_for_parse(client, second) == "succeeded"
+
+    assert len(fake_model.calls) == 1
+    stored = {}
+    for data in db.docs("syllabus_items").values():
+        stored.setdefault(data["syllabus_id"], set()).add(data["name"])
+    assert stored == {first: {"HW 1", "HW 2"}, second: {"HW 1", "HW 2"}}
+    # Workers read the uploads from the file cache warmed at upload time
+    assert bucket.downloads == 0
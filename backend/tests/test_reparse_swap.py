@@ -0,0 +1,67 @@
+"""Reparsed items replace the old set in batched commits instead of a per-document delete loop."""
+
+import asyncio
+import time
+
+import pytest
+
+
+def seed(main, db, old_count):
+    db.collection("syllabi").document("s1").set({"user_id": "u1", "items_version": 0})
+    old = [{"category": "Homework", "name": f"Old {n}", "due_date": "2025-09-01"} for n in range(old_count)]
+    asyncio.run(main.store_syllabus_items("s1", old, user_id="u1"))
+
+
+def new_items(count):
+    return [{"category": "Exams", "name": f"New {n}", "due_date": "2025-10-01"} for n in range(count)]
+
+
+def item_names(db):
+    return sorted(data["name"] for data in db.docs("syllabus_items").values() if data["syllabus_id"] == "s1")
+
+
+def delete_loop_then_store(main, db, items):
+    """The reparse path before batched swaps: delete each old item, then store the new ones."""
+    for item_doc in db.collection("syllabus_items").where("syllabus_id", "==", "s1").stream():
+        item_doc.reference.delete()
+    asyncio.run(main.store_syllabus_items("s1", items, user_id="u1"))
+
+
+def test_replace_swaps_the_whole_item_set(main, db):
+    seed(main, db, 30)
+    asyncio.run(main.store_syllabus_items("s1", new_items(20), replace_existing=True, user_id="u1"))
+    assert item_names(db) == sorted(f"New {n}" for n in range(20))
+    assert db.docs("syllabi")["s1"]["items_version"] == 2
+
+
+@pytest.mark.benchmark
+def test_batched_swap_against_delete_loop(main, db, report):
+    seed(main, db, 200)
+    db.latency = 0.002
+    round_trips = db.round_trips
+    started = time.perf_counter()
+    delete_loop_then_store(main, db, new_items(200))
+    loop_ms = (time.perf_counter() - started) * 1000
+    loop_round_trips = db.round_trips - round_trips
+    assert item_names(db) == sorted(f"New {n}" for n in range(200))
+
+    db.reset()
+    seed(main, db, 200)
+    db.latency = 0.002
+    round_trips = db.round_trips
+    started = time.perf_counter()
+    asyncio.run(main.store_syllabus_items("s1", new_items(200), replace_existing=True, user_id="u1"))
+    swap_ms = (time.perf_counter() - started) * 1000
+    swap_round_trips = db.round_trips - round_trips
+    assert item_names(db) == sorted(f"New {n}" for n in range(200))
+
+    report(
+        "user-004 replace 200 items with 200, 2ms per round trip",
+        batched_swap_ms=swap_ms,
+        delete_loop_ms=loop_ms,
+        batched_swap_round_trips=swap_round_trips,
+        delete_loop_round_trips=loop_round_trips,
+    )
+    # Stream + commit, against stream + a delete per item + commit
+    assert (swap_round_trips, loop_round_trips) == (2, 202)
+    assert swap_ms < loop_ms
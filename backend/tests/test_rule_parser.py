@@ -0,0 +1,60 @@
+"""Rule-based pre-parser and the confidence that decides whether Gemini is skipped."""
+
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_well_structured_syllabus_skips_the_model(main):
+    with open(os.path.join(BACKEND_DIR, "test_syllabus_detailed.txt")) as f:
+        items, confidence = main.extract_items_with_rules(f.read())
+    assert len(items) == 14
+    assert confidence >= main.RULE_PARSER_MIN_CONFIDENCE
+    assert {"category": "Quizzes", "name": "Quiz 1: Python Basics", "due_date": "2025-02-10"} in items
+
+
+def test_undated_assessments_send_the_syllabus_to_the_model(main):
+    items, confidence = main.extract_items_with_rules(
+        "Fall 2025\n"
+        "Essay 1: due September 20\n"
+        "Essay 2: due October 18\n"
+        "Final Exam: TBD (finals week)\n"
+        "Weekly quizzes every Friday\n"
+    )
+    assert [item["name"] for item in items] == ["Essay 1", "Essay 2"]
+    assert confidence < main.RULE_PARSER_MIN_CONFIDENCE
+
+
+def test_undated_schedule_lines_count_against_confidence(main):
+    _, confidence = main.extract_items_with_rules(
+        "Quiz 1 - March 3, 2026\n"
+        "WEEK 9: FINAL EXAM\n"
+    )
+    assert confidence == 0.5
+
+
+def test_weighted_section_without_items_counts_against_confidence(main):
+    text = (
+        "ASSIGNMENTS (40% of final grade):\n"
+        "- Assignment 1 - Due: February 3, 2026\n"
+        "PROJECTS (30% of final grade):\n"
+        "- Announced in class\n"
+    )
+    items, confidence = main.extract_items_with_rules(text)
+    assert len(items) == 1
+    assert confidence == 0.5
+
+
+def test_unweighted_headings_and_prose_without_categories_are_ignored(main):
+    _, confidence = main.extract_items_with_rules(
+        "Course Schedule and Assignments:\n"
+        "Office hours are on Mondays.\n"
+        "HOMEWORK (Pass/Fail):\n"
+        "- Problem Set 1 - Due: 9/15/2025\n"
+    )
+    assert confidence == 1.0
+
+
+def test_no_dates_means_no_confidence(main):
+    with open(os.path.join(BACKEND_DIR, "test_syllabus.txt")) as f:
+        assert main.extract_items_with_rules(f.read()) == ([], 0.0)
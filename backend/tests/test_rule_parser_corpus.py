@@ -0,0 +1,122 @@
+"""Rule parser precision, recall and latency on a corpus built from the bundled test syllabi."""
+
+import os
+import re
+import statistics
+import time
+from datetime import date
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DETAILED_ITEMS = [
+    ("Assignment 1: Hello World Program", "2025-01-20"),
+    ("Assignment 2: Variables and Data Types", "2025-02-03"),
+    ("Assignment 3: Control Flow", "2025-02-17"),
+    ("Assignment 4: Functions and Modules", "2025-03-10"),
+    ("Assignment 5: Object-Oriented Programming", "2025-04-07"),
+    ("Quiz 1: Python Basics", "2025-02-10"),
+    ("Quiz 2: Data Structures", "2025-03-24"),
+    ("Quiz 3: Advanced Concepts", "2025-04-21"),
+    ("Midterm Project: Build a Calculator App", "2025-03-15"),
+    ("Final Project: Personal Portfolio Website", "2025-05-10"),
+    ("Midterm Exam", "2025-03-17"),
+    ("Final Exam", "2025-05-15"),
+    ("Weekly Coding Exercises", "2025-01-17"),
+    ("Research Paper: History of Computing", "2025-04-28"),
+]
+SCHEDULE_ITEMS = [
+    ("Midterm Exam", "2025-10-06"),
+    ("Final Project", "2025-11-03"),
+    ("Final Exam", "2025-11-10"),
+]
+LONG_DATE_RE = re.compile(r"(January|February|March|April|May) (\d{1,2}), (2025)")
+
+
+def read(name):
+    with open(os.path.join(BACKEND_DIR, name)) as f:
+        return f.read()
+
+
+def reformat_dates(text, fmt):
+    def replace(match):
+        month = ["January", "February", "March", "April", "May"].index(match.group(1)) + 1
+        return date(int(match.group(3)), month, int(match.group(2))).strftime(fmt).replace(" 0", " ").lstrip("0")
+    return LONG_DATE_RE.sub(replace, text)
+
+
+def corpus():
+    """
+    (name, text, expected (name, due_date) pairs, whether the rules should answer without the model).
+    The dated outline still lists undated assessments in its grading table, so it goes to the model.
+    """
+    detailed = read("test_syllabus_detailed.txt")
+    outline = read("test_syllabus.txt")
+    dated_schedule = (
+        outline.replace("Course Syllabus", "Fall 2025 Course Syllabus")
+        .replace("Week 5: Midterm Exam", "Week 5: Midterm Exam - October 6")
+        .replace("Week 8: Final Project", "Week 8: Final Project - Due: November 3")
+        .replace("Week 9: Final Exam", "Week 9: Final Exam - November 10")
+    )
+    return [
+        ("detailed", detailed, DETAILED_ITEMS, True),
+        ("detailed, numeric dates", reformat_dates(detailed, "%m/%d/%Y"), DETAILED_ITEMS, True),
+        ("detailed, ISO dates", reformat_dates(detailed, "%Y-%m-%d"), DETAILED_ITEMS, True),
+        ("detailed, day month year", reformat_dates(detailed, "%d %B %Y"), DETAILED_ITEMS, True),
+        ("detailed, no years (spring term)", LONG_DATE_RE.sub(r"\1 \2", detailed).replace("FALL 2025", "SPRING 2025"), DETAILED_ITEMS, True),
+        ("outline without dates", outline, [], False),
+        ("outline with dated schedule", dated_schedule, SCHEDULE_ITEMS, False),
+    ]
+
+
+def matches(found, expected):
+    """A found item matches when the date is right and the name contains the expected name."""
+    name, due_date = expected
+    return found["due_date"] == due_date and name.lower() in found["name"].lower()
+
+
+def score(found, expected):
+    correct = [item for item in found if any(matches(item, e) for e in expected)]
+    recalled = [e for e in expected if any(matches(item, e) for item in found)]
+    precision = len(correct) / len(found) if found else 1.0
+    recall = len(recalled) / len(expected) if expected else 1.0
+    return precision, recall
+
+
+def latency_us(main, text, runs=200):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        main.extract_items_with_rules(text)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def skips_model(main, items, confidence):
+    return bool(items) and confidence >= main.RULE_PARSER_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("name, text, expected, trusted", corpus(), ids=[doc[0] for doc in corpus()])
+def test_corpus_document(main, name, text, expected, trusted):
+    items, confidence = main.extract_items_with_rules(text)
+
+    assert score(items, expected) == (1.0, 1.0)
+    assert skips_model(main, items, confidence) == trusted
+
+
+@pytest.mark.benchmark
+def test_corpus_report(main, report):
+    for name, text, expected, _ in corpus():
+        items, confidence = main.extract_items_with_rules(text)
+        precision, recall = score(items, expected)
+        report(
+            f"user-012 rule parser: {name}",
+            items=len(items),
+            expected=len(expected),
+            precision=precision,
+            recall=recall,
+            confidence=confidence,
+            skips_model=skips_model(main, items, confidence),
+            median_us=latency_us(main, text),
+        )
@@ -0,0 +1,18 @@
+"""Syllabus metadata cache used by chat, calendar and reparse."""
+
+import asyncio
+
+
+def test_callers_cannot_change_the_cached_entry(main, db):
+    db.collection("syllabi").document("s1").set({"name": "s.txt", "context_handle": {"name": "cachedContents/1"}})
+
+    first = asyncio.run(main.get_syllabus("s1"))
+    first["name"] = "changed.txt"
+    first["context_handle"]["name"] = None
+
+    assert asyncio.run(main.get_syllabus("s1")) == {"name": "s.txt", "context_handle": {"name": "cachedContents/1"}}
+    assert main.syllabus_cache.stats["hits"] == 1
+
+
+def test_missing_syllabus_is_none(main):
+    assert asyncio.run(main.get_syllabus("missing")) is None
@@ -0,0 +1,124 @@
+"""GET /syllabi/{user_id} paging and field projection, on a user with 1,000 syllabi."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import asgi_client
+
+SYLLABUS_COUNT = 1000
+
+
+@pytest.fixture
+def syllabi(db):
+    """SYLLABUS_COUNT syllabi for u1, uploaded a minute apart, plus one for another user."""
+    first_upload = datetime(2025, 1, 6, 9, 0)
+    for n in range(SYLLABUS_COUNT):
+        uploaded = first_upload + timedelta(minutes=n)
+        db.collection("syllabi").document(f"s{n:04d}").set({
+            "user_id": "u1",
+            "name": f"Course {n} Syllabus.pdf",
+            "file_url": f"https://storage.test/syllabi/u1/{n}.pdf",
+            "file_type": ".pdf",
+            "file_path": f"syllabi/u1/20250106_{n}.pdf",
+            "file_size": 250_000 + n,
+            "file_sha256": f"{n:064x}",
+            "items_version": 3,
+            "upload_date": uploaded,
+            "created_at": uploaded,
+        })
+    db.collection("syllabi").document("other").set({"user_id": "u2", "name": "Other.pdf", "upload_date": first_upload})
+    # Newest first
+    return [f"s{n:04d}" for n in reversed(range(SYLLABUS_COUNT))]
+
+
+def get_all(main, *paths):
+    """GET each path in turn. Returns (responses, elapsed ms)."""
+    async def run():
+        async with asgi_client(main.app) as client:
+            started = time.perf_counter()
+            responses = [await client.get(path) for path in paths]
+            return responses, (time.perf_counter() - started) * 1000
+    return asyncio.run(run())
+
+
+def walk_pages(main, query=""):
+    """Follow next_page_token from the first page to the last. Returns (pages, elapsed ms)."""
+    async def run():
+        pages = []
+        async with asgi_client(main.app) as client:
+            started = time.perf_counter()
+            token = None
+            while True:
+                cursor = f"&start_after={token}" if token else ""
+                response = await client.get(f"/syllabi/u1?limit=200{query}{cursor}")
+                assert response.status_code == 200
+                pages.append(response)
+                token = response.json()["next_page_token"]
+                if token is None:
+                    return pages, (time.perf_counter() - started) * 1000
+    return asyncio.run(run())
+
+
+def test_pages_cover_every_syllabus_once_newest_first(main, syllabi):
+    pages, _ = walk_pages(main)
+
+    ids = [syllabus["id"] for page in pages for syllabus in page.json()["syllabi"]]
+    assert ids == syllabi
+    assert len(pages) == SYLLABUS_COUNT // 200
+
+
+def test_unpaged_request_returns_the_plain_list(main, syllabi):
+    [response], _ = get_all(main, "/syllabi/u1")
+
+    body = response.json()
+    assert isinstance(body, list)
+    assert sorted(syllabus["id"] for syllabus in body) == sorted(syllabi)
+    assert "items_version" not in body[0]
+
+
+def test_fields_limit_the_response_to_those_fields(main, syllabi):
+    [response], _ = get_all(main, "/syllabi/u1?limit=2&fields=name,upload_date")
+
+    assert response.json()["syllabi"] == [
+        {"id": "s0999", "name": "Course 999 Syllabus.pdf", "upload_date": "2025-01-07T01:39:00"},
+        {"id": "s0998", "name": "Course 998 Syllabus.pdf", "upload_date": "2025-01-07T01:38:00"},
+    ]
+
+
+@pytest.mark.parametrize("query, detail", [
+    ("fields=name,items_version", "Unknown field(s): items_version"),
+    ("limit=0", "limit must be between 1 and 200"),
+    ("limit=201", "limit must be between 1 and 200"),
+    ("limit=10&start_after=other", "Invalid start_after token"),
+    ("limit=10&start_after=missing", "Invalid start_after token"),
+])
+def test_bad_parameters_are_rejected(main, syllabi, query, detail):
+    [response], _ = get_all(main, f"/syllabi/u1?{query}")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+@pytest.mark.benchmark
+def test_list_response_size_and_time(main, db, syllabi, report):
+    db.latency = 0.005
+    requests = {
+        "full_list": "/syllabi/u1",
+        "first_page": "/syllabi/u1?limit=50",
+        "first_page_name_and_date": "/syllabi/u1?limit=50&fields=name,upload_date",
+    }
+    numbers = {}
+    for name, path in requests.items():
+        [response], elapsed_ms = get_all(main, path)
+        assert response.status_code == 200
+        numbers[f"{name}_kb"] = len(response.content) / 1024
+        numbers[f"{name}_ms"] = elapsed_ms
+    pages, numbers["all_pages_name_and_date_ms"] = walk_pages(main, "&fields=name,upload_date")
+    numbers["all_pages_name_and_date_kb"] = sum(len(page.content) for page in pages) / 1024
+
+    report(f"user-020 GET /syllabi/{{user_id}} with {SYLLABUS_COUNT} syllabi, 5ms per Firestore call", **numbers)
+    assert numbers["first_page_kb"] < numbers["full_list_kb"] / 10
+    assert numbers["first_page_name_and_date_kb"] < numbers["first_page_kb"] / 2
@@ -0,0 +1,146 @@
+"""The upload path reads files in bounded chunks, and the in-process parser shares the one full copy."""
+
+import asyncio
+import ctypes
+import ctypes.util
+import gc
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+FILE_SIZE = 9 * 1024 * 1024
+
+try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    libc.malloc_trim
+except (OSError, AttributeError):
+    libc = None
+
+
+def upload_file(size=FILE_SIZE, name="packet.pdf"):
+    """An UploadFile spooled the way Starlette spools multipart parts (to disk past 1MB)."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(b"%PDF-1.4 " + os.urandom(size - 9))
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=name, size=size, headers=Headers({"content-type": "application/pdf"}))
+
+
+@pytest.fixture
+def read_sizes(monkeypatch):
+    """Sizes passed to UploadFile.read; -1 means the whole file."""
+    sizes = []
+    original_read = UploadFile.read
+
+    async def spy(self, size=-1):
+        sizes.append(size)
+        return await original_read(self, size)
+
+    monkeypatch.setattr(UploadFile, "read", spy)
+    return sizes
+
+
+@pytest.fixture
+def uploads(main, monkeypatch):
+    monkeypatch.setattr(main, "parse_job_queue", main.ParseJobQueue(concurrency=1))
+
+    def run(count, mode, files=None):
+        monkeypatch.setattr(main, "PARSE_QUEUE_MODE", mode)
+        files = files or [upload_file(name=f"packet{n}.pdf") for n in range(count)]
+
+        async def upload_all():
+            return await asyncio.gather(*(main.upload_syllabus(file=file, user_id="u1") for file in files))
+
+        return files, asyncio.run(upload_all())
+
+    return run
+
+
+def test_external_mode_never_reads_the_whole_file(main, bucket, read_sizes, uploads):
+    files, _ = uploads(1, "external")
+
+    assert read_sizes and all(0 < size <= main.UPLOAD_READ_CHUNK_SIZE for size in read_sizes)
+    [(path, stored)] = bucket.files.items()
+    files[0].file.seek(0)
+    assert stored == files[0].file.read()
+    assert main.file_cache.snapshot()["memory_entries"] == 0
+
+
+def test_inprocess_mode_reads_one_copy_and_shares_it_with_the_parser(main, db, bucket, read_sizes, uploads, monkeypatch):
+    monkeypatch.setattr(main, "file_cache", main.FileBytesCache(max_bytes=32 * 1024 * 1024))
+    _, responses = uploads(1, "inprocess")
+
+    whole_reads = [size for size in read_sizes if size == -1]
+    assert len(whole_reads) == 1
+    assert all(0 < size <= main.UPLOAD_READ_CHUNK_SIZE for size in read_sizes if size != -1)
+
+    # The parse job gets the cached buffer itself, not another download or copy
+    syllabus = db.docs("syllabi")[responses[0]["id"]]
+    cached = main.file_cache.get((syllabus["file_path"], bucket.generation_of[syllabus["file_path"]]))
+    loaded = asyncio.run(main.load_syllabus_file(syllabus["file_path"]))
+    assert loaded is cached
+    assert hashlib.sha256(loaded).hexdigest() == syllabus["file_sha256"]
+    assert bucket.downloads == 0
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_delta(run):
+    """Peak RSS above the starting level while run() executes, sampled every millisecond."""
+    # Hand memory freed by earlier tests back to the OS, or it would be reused without raising RSS
+    gc.collect()
+    if libc is not None:
+        libc.malloc_trim(0)
+    baseline = rss_bytes()
+    peak = baseline
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_bytes())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        run()
+    finally:
+        done.set()
+        sampler.join()
+    return max(peak, rss_bytes()) - baseline
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="RSS is read from /proc")
+def test_peak_rss_for_concurrent_uploads(main, bucket, uploads, monkeypatch, report):
+    # Uploaded bytes live in Storage, not in this process
+    monkeypatch.setattr(bucket, "store", lambda chunks: sum(len(chunk) for chunk in chunks) and b"")
+    monkeypatch.setattr(main, "file_cache", main.FileBytesCache(max_bytes=256 * 1024 * 1024))
+    count = 8
+    mb = 1024 * 1024
+
+    # Files are spooled to disk before measuring, as Starlette has done by the time the handler runs
+    files = [upload_file(name=f"packet{n}.pdf") for n in range(count)]
+    external = peak_rss_delta(lambda: uploads(count, "external", files))
+    files = [upload_file(name=f"packet{n}.pdf") for n in range(count)]
+    inprocess = peak_rss_delta(lambda: uploads(count, "inprocess", files))
+
+    report(
+        f"user-010 peak RSS over baseline, {count} concurrent {FILE_SIZE // mb}MB uploads (MB)",
+        external_workers=external / mb,
+        inprocess_workers=inprocess / mb,
+        uploaded=count * FILE_SIZE / mb,
+    )
+    # Each upload holds a read chunk and a resumable upload chunk at a time, plus (in-process) the
+    # one copy kept for the parser - well under the old path's whole-file read plus copies
+    assert external < count * FILE_SIZE
+    assert inprocess < count * FILE_SIZE * 2
@@ -17,6 +17,7 @@ function App() {
  const [syllabi, setSyllabi] = useState([]);
  const [selectedSyllabus, setSelectedSyllabus] = useState("");
  const [syllabusItems, setSyllabusItems] = useState([]);
+ const [parseStatus, setParseStatus] = useState(null);
  const [uploadedFile, setUploadedFile] = useState(null);
  const [filePreview, setFilePreview] = useState(null);
 
@@ -155,14 +156,38 @@ function App() {
  };
 
  //function that fetches the items from a selected syllabus
- const fetchSyllabusItems = async (syllabusId) => {
+ //Uploads are parsed in the background, so while a syllabus has no items yet this long polls the
+ //items/wait endpoint, which returns once the items are stored or the parse job has finished
+ const fetchSyllabusItems = async (syllabusId, signal) => {
+   // Initialize items with selected property
+   const showItems = (items) =>
+     setSyllabusItems(items.map(item => ({ ...item, selected: item.selected || false })));
+
    try {
-     const res = await fetch(`${API_URL}/syllabi/${syllabusId}/items`);
+     setParseStatus(null);
+     const res = await fetch(`${API_URL}/syllabi/${syllabusId}/items`, { signal });
      const data = await res.json();
-     // Initialize items with selected property
-     setSyllabusItems(data.map(item => ({ ...item, selected: item.selected || false })));
+     showItems(data);
+     if (data.length > 0) return;
+
+     // No parse job (e.g. an old syllabus) means there is nothing to wait for
+     const statusRes = await fetch(`${API_URL}/syllabi/${syllabusId}/parse-status`, { signal });
+     if (!statusRes.ok) return;
+     setParseStatus((await statusRes.json()).status);
+
+     while (!signal.aborted) {
+       const waitRes = await fetch(`${API_URL}/syllabi/${syllabusId}/items/wait`, { signal });
+       if (!waitRes.ok) return;
+       const result = await waitRes.json();
+       setParseStatus(result.parse_status);
+       if (result.changed) {
+         showItems(result.items);
+         return;
+       }
+       if (!result.parse_status) return;
+     }
    } catch (err) {
-     console.error(err);
+     if (err.name !== 'AbortError') console.error(err);
    }
  };
 
@@ -189,7 +214,9 @@ function App() {
      const data = await res.json();
      if (res.ok) {
        await fetchSyllabi();
-       showAlert('Syllabus uploaded successfully!', 'success');
+       // Show the new syllabus, whose items appear once the background parse finishes
+       setSelectedSyllabus(data.id);
+       showAlert('Syllabus uploaded! Extracting items...', 'success');
      } else {
        showAlert(data.detail || 'Upload failed', 'error');
      }
@@ -199,12 +226,15 @@ function App() {
    setLoading(false);
  };
 
- // Handle syllabus selection
+ // Handle syllabus selection - switching syllabus (or unmounting) stops waiting on the previous one
  useEffect(() => {
    if (selectedSyllabus) {
-     fetchSyllabusItems(selectedSyllabus);
+     const controller = new AbortController();
+     fetchSyllabusItems(selectedSyllabus, controller.signal);
+     return () => controller.abort();
    } else {
      setSyllabusItems([]);
+     setParseStatus(null);
    }
  }, [selectedSyllabus]);
 
@@ -241,7 +271,10 @@ function App() {
 
      const data = await res.json();
      if (res.ok) {
-       const successMessage = `Successfully added ${data.total_created} event(s) to your Google Calendar!`;
+       let successMessage = `Successfully added ${data.total_created} event(s) to your Google Calendar!`;
+       if (data.total_updated > 0 || data.total_unchanged > 0) {
+         successMessage += ` (${data.total_updated} updated, ${data.total_unchanged} already added)`;
+       }
        showAlert(successMessage, "success");
        
        if (data.failed_events && data.failed_events.length > 0) {
@@ -589,7 +622,13 @@ return (
                   Select a syllabus to view items
                 </p>
               ) : syllabusItems.length === 0 ? (
-                <p className="text-gray-500 text-center py-8">No items found</p>
+                <p className="text-gray-500 text-center py-8">
+                  {["queued", "running", "retrying"].includes(parseStatus)
+                    ? "Extracting items from your syllabus..."
+                    : parseStatus === "failed"
+                    ? "Couldn't extract items from this syllabus"
+                    : "No items found"}
+                </p>
               ) : (
                 <div className="space-y-4 max-h-96 overflow-y-auto">
                   {Object.entries(groupSyllabusItemsByCategory(syllabusItems)).map(